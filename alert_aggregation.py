@@ -0,0 +1,92 @@
+from correlation import event_time
+from ingestion.templating import template_message
+
+AGGREGATION_WINDOW_SECONDS = 3600
+MAX_EXEMPLARS = 3
+EXPIRE_EVERY = 10000
+
+
+def aggregation_key(result: dict):
+    """(classification, rule, source IP, templated URL) of a triage result; non-web logs use their message."""
+    log = result["log_context"]
+    target = log.get("url.original") or log.get("message") or log.get("raw", "")
+    return result["classification"], result["rule_name"], log.get("source.ip"), template_message(target)
+
+
+class AlertAggregator:
+    """
+    Groups triage results that share an aggregation key within a time window (starting at the
+    first result of the group) into one aggregate result. An aggregate looks like a single
+    result (classification, rule_name, confidence_score, log_context = first exemplar) plus
+    count, first/last seen, the templated target and up to max_exemplars example logs, so the
+    report and the Tier 2/3 stages can work on aggregates instead of individual lines.
+
+    With on_close, expire() hands each closed aggregate to on_close (e.g. ReportBuilder.add)
+    and drops it, so a long run keeps only the aggregates that can still change. An aggregate
+    whose "pending_judgements" counter (kept by the caller for Tier 2 / sequence results still
+    in flight) is non-zero is kept until a later expire().
+    """
+
+    def __init__(self, window_seconds=AGGREGATION_WINDOW_SECONDS, max_exemplars=MAX_EXEMPLARS,
+                 expire_every=EXPIRE_EVERY, on_close=None):
+        self.window_seconds = window_seconds
+        self.max_exemplars = max_exemplars
+        self.expire_every = expire_every
+        self.on_close = on_close
+        self.open = {}  # key -> aggregate of the current window
+        self.aggregates = []  # every aggregate not yet handed to on_close, in creation order
+        self.results = 0
+        self.closed = 0
+
+    def add(self, result: dict):
+        """Folds a result into its aggregate; returns (aggregate, True if the aggregate is new)."""
+        self.results += 1
+        log = result["log_context"]
+        ts = event_time(log)
+        key = aggregation_key(result)
+        if self.results % self.expire_every == 0:
+            self.expire(ts)
+        aggregate = self.open.get(key)
+        if aggregate is not None and ts - aggregate["first_seen_ts"] < self.window_seconds:
+            aggregate["count"] += 1
+            aggregate["last_seen"] = log.get("@timestamp")
+            aggregate["confidence_score"] = max(aggregate["confidence_score"], result["confidence_score"])
+            if len(aggregate["exemplars"]) < self.max_exemplars:
+                aggregate["exemplars"].append(log)
+            return aggregate, False
+
+        aggregate = {
+            **result,
+            "count": 1,
+            "target_template": key[3],
+            "first_seen": log.get("@timestamp"),
+            "last_seen": log.get("@timestamp"),
+            "first_seen_ts": ts,
+            "exemplars": [log],
+        }
+        self.open[key] = aggregate
+        self.aggregates.append(aggregate)
+        return aggregate, True
+
+    def expire(self, now):
+        """
+        Drops windows that can no longer grow from the open set. Without on_close they stay in
+        aggregates; with it, settled closed aggregates are passed to on_close and dropped.
+        """
+        for key in [k for k, a in self.open.items() if now - a["first_seen_ts"] >= self.window_seconds]:
+            del self.open[key]
+        if self.on_close is None:
+            return
+        open_ids = {id(a) for a in self.open.values()}
+        kept = []
+        for aggregate in self.aggregates:
+            if id(aggregate) in open_ids or aggregate.get("pending_judgements"):
+                kept.append(aggregate)
+            else:
+                self.on_close(aggregate)
+                self.closed += 1
+        self.aggregates = kept
+
+    def stats(self):
+        return {"results": self.results, "aggregates": len(self.aggregates) + self.closed,
+                "open": len(self.open), "closed": self.closed}
@@ -0,0 +1,160 @@
+from correlation import DEFAULT_MAX_ENTITIES, SlidingWindowCounter, event_time
+
+WINDOW_SECONDS = 600
+N_BUCKETS = 10
+PAIR_THRESHOLD = 10  # failures for one user from one IP: targeted brute force
+SOURCE_THRESHOLD = 20  # failures from one IP, whatever the users
+SPRAY_MIN_USERS = 5  # distinct users tried by one IP that make it a password spray
+USER_THRESHOLD = 20  # failures for one user, whatever the IPs
+DISTRIBUTED_MIN_SOURCES = 5  # distinct IPs failing on one user that make it a distributed attack
+CAMPAIGN_GAP_SECONDS = 1800  # a campaign ends after this long without failures
+MAX_CAMPAIGN_SAMPLES = 1000  # distinct users / IPs remembered per campaign
+EXPIRE_EVERY = 10000
+
+BRUTE_FORCE = "SSH Brute Force"
+PASSWORD_SPRAY = "SSH Password Spray"
+DISTRIBUTED_BRUTE_FORCE = "Distributed SSH Brute Force"
+
+
+class BruteForceDetector:
+    """
+    Stateful brute-force / password-spray detection over normalized authentication_failure
+    events. Failures are counted per source IP, per user and per (IP, user) pair in
+    time-bucketed sliding windows, together with the distinct users per IP and distinct IPs
+    per user. Crossing a threshold opens a campaign; further failures from the same IP (or
+    against the same user) are folded into it until it has been quiet for gap_seconds, so
+    each campaign produces a single alert.
+    """
+
+    def __init__(self, window_seconds=WINDOW_SECONDS, n_buckets=N_BUCKETS, pair_threshold=PAIR_THRESHOLD,
+                 source_threshold=SOURCE_THRESHOLD, spray_min_users=SPRAY_MIN_USERS, user_threshold=USER_THRESHOLD,
+                 distributed_min_sources=DISTRIBUTED_MIN_SOURCES, gap_seconds=CAMPAIGN_GAP_SECONDS,
+                 max_entities=DEFAULT_MAX_ENTITIES, expire_every=EXPIRE_EVERY):
+        self.window_seconds = window_seconds
+        self.pair_threshold = pair_threshold
+        self.source_threshold = source_threshold
+        self.spray_min_users = spray_min_users
+        self.user_threshold = user_threshold
+        self.distributed_min_sources = distributed_min_sources
+        self.gap_seconds = gap_seconds
+        self.expire_every = expire_every
+
+        def counter():
+            return SlidingWindowCounter(window_seconds, n_buckets, max_entities)
+
+        self.by_source = counter()
+        self.by_user = counter()
+        self.by_pair = counter()
+        self.users_per_source = counter()  # +1 when a pair first appears in the window
+        self.sources_per_user = counter()
+        self.open_campaigns = {}  # ("source.ip" | "user.name", value) -> campaign
+        self.campaigns = []
+        self.events = 0
+        self.folded = 0  # failures absorbed by an already open campaign
+        self.last_campaigns = []  # campaigns the last processed log opened or was folded into
+
+    def _campaign(self, key, ts):
+        campaign = self.open_campaigns.get(key)
+        if campaign is not None and ts - campaign["last_seen_ts"] > self.gap_seconds:
+            del self.open_campaigns[key]
+            return None
+        return campaign
+
+    def _open(self, key, rule_name, failures, log, ts):
+        campaign = {
+            "rule_name": rule_name,
+            "entity_field": key[0],
+            "entity": key[1],
+            "failures": failures,
+            "users": set(),
+            "source_ips": set(),
+            "first_seen": log.get("@timestamp"),
+            "last_seen": log.get("@timestamp"),
+            "last_seen_ts": ts,
+            "window_seconds": self.window_seconds,
+        }
+        self.open_campaigns[key] = campaign
+        self.campaigns.append(campaign)
+        return campaign
+
+    @staticmethod
+    def _record(campaign, source_ip, user, log, ts):
+        if user and len(campaign["users"]) < MAX_CAMPAIGN_SAMPLES:
+            campaign["users"].add(user)
+        if source_ip and len(campaign["source_ips"]) < MAX_CAMPAIGN_SAMPLES:
+            campaign["source_ips"].add(source_ip)
+        campaign["last_seen"] = log.get("@timestamp")
+        campaign["last_seen_ts"] = ts
+
+    def process(self, log: dict):
+        """
+        Feeds one log; returns the campaigns it opened (a list, usually empty). Returned campaign
+        dicts keep being updated in place while the campaign lasts. Logs that are not
+        authentication failures are ignored.
+        """
+        self.last_campaigns = []
+        if log.get("event.type") != "authentication_failure":
+            return []
+        source_ip = log.get("source.ip")
+        user = log.get("user.name")
+        if not source_ip and not user:
+            return []
+        ts = event_time(log)
+        self.events += 1
+        opened = []
+
+        source_campaign = user_campaign = None
+        if source_ip:
+            _, source_count = self.by_source.add(source_ip, ts)
+            if user:
+                _, pair_count = self.by_pair.add((source_ip, user), ts)
+                if pair_count == 1:
+                    self.users_per_source.add(source_ip, ts)
+            else:
+                pair_count = 0
+            source_users = self.users_per_source.count(source_ip, ts)
+
+            source_campaign = self._campaign(("source.ip", source_ip), ts)
+            if source_campaign is None and (source_count >= self.source_threshold or pair_count >= self.pair_threshold):
+                rule_name = PASSWORD_SPRAY if source_users >= self.spray_min_users else BRUTE_FORCE
+                source_campaign = self._open(("source.ip", source_ip), rule_name, source_count, log, ts)
+                opened.append(source_campaign)
+            elif source_campaign is not None:
+                source_campaign["failures"] += 1
+                if source_users >= self.spray_min_users:
+                    source_campaign["rule_name"] = PASSWORD_SPRAY
+
+        if user:
+            _, user_count = self.by_user.add(user, ts)
+            if source_ip and pair_count == 1:
+                self.sources_per_user.add(user, ts)
+            user_sources = self.sources_per_user.count(user, ts)
+
+            user_campaign = self._campaign(("user.name", user), ts)
+            if (user_campaign is None and user_count >= self.user_threshold
+                    and user_sources >= self.distributed_min_sources):
+                user_campaign = self._open(("user.name", user), DISTRIBUTED_BRUTE_FORCE, user_count, log, ts)
+                opened.append(user_campaign)
+            elif user_campaign is not None:
+                user_campaign["failures"] += 1
+
+        if (source_campaign or user_campaign) and not opened:
+            self.folded += 1
+        self.last_campaigns = list({id(c): c for c in (source_campaign, user_campaign) if c is not None}.values())
+        for campaign in self.last_campaigns:
+            self._record(campaign, source_ip, user, log, ts)
+
+        if self.events % self.expire_every == 0:
+            self.expire(ts)
+        return opened
+
+    def expire(self, now):
+        """Closes campaigns that have been quiet for gap_seconds and frees idle counters."""
+        for key in [k for k, c in self.open_campaigns.items() if now - c["last_seen_ts"] > self.gap_seconds]:
+            del self.open_campaigns[key]
+        for counter in (self.by_source, self.by_user, self.by_pair, self.users_per_source, self.sources_per_user):
+            counter.expire(now)
+
+    def stats(self):
+        return {"events": self.events, "campaigns": len(self.campaigns), "open_campaigns": len(self.open_campaigns),
+                "folded": self.folded}
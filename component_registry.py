@@ -0,0 +1,62 @@
+import importlib
+import threading
+import time
+
+
+class ComponentRegistry:
+    """
+    Named, lazily-constructed heavy components (ML libraries, models, API clients).
+
+    Modules register a factory at import time, which is cheap; the factory runs once, on the
+    first get(), so a Tier 1-only run or a pool worker that never reaches Tier 2/3 never pays
+    for torch, hdbscan or the Groq SDK.
+    """
+
+    def __init__(self):
+        self._factories = {}
+        self._instances = {}
+        self._load_seconds = {}
+        self._lock = threading.RLock()
+
+    def register(self, name, factory):
+        """Registers (or replaces) the factory for name; an already-built instance is dropped."""
+        with self._lock:
+            self._factories[name] = factory
+            self._instances.pop(name, None)
+
+    def register_module(self, name, module_name=None):
+        """Registers a lazily imported module, e.g. register_module("hdbscan")."""
+        self.register(name, lambda: importlib.import_module(module_name or name))
+
+    def get(self, name):
+        instance = self._instances.get(name)
+        if instance is not None or name in self._instances:
+            return instance
+        with self._lock:
+            if name not in self._instances:
+                if name not in self._factories:
+                    raise KeyError(f"No component registered under '{name}'")
+                start = time.perf_counter()
+                self._instances[name] = self._factories[name]()
+                self._load_seconds[name] = time.perf_counter() - start
+            return self._instances[name]
+
+    def is_loaded(self, name):
+        return name in self._instances
+
+    def load_times(self):
+        """Seconds spent constructing each component that has been loaded."""
+        return dict(self._load_seconds)
+
+    def reset(self, name=None):
+        """Forgets built instances (all, or just name) so the next get() rebuilds them."""
+        with self._lock:
+            if name is None:
+                self._instances.clear()
+                self._load_seconds.clear()
+            else:
+                self._instances.pop(name, None)
+                self._load_seconds.pop(name, None)
+
+
+registry = ComponentRegistry()
@@ -0,0 +1,189 @@
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime
+from functools import lru_cache
+
+import numpy as np
+
+from tier1_rules import CORRELATION_RULES
+
+DEFAULT_BUCKETS = 12
+DEFAULT_MAX_ENTITIES = 1000000
+INITIAL_CAPACITY = 4096
+EXPIRE_EVERY = 10000  # events between idle-entity sweeps
+
+
+@lru_cache(maxsize=8192)
+def _parse_timestamp(value):
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+def event_time(log: dict) -> float:
+    """Epoch seconds of a normalized log's @timestamp (now if it is missing or unparsable)."""
+    value = log.get("@timestamp")
+    ts = _parse_timestamp(value) if isinstance(value, str) else None
+    return time.time() if ts is None else ts
+
+
+class SlidingWindowCounter:
+    """
+    Per-entity event counts over the last window_seconds, kept as a ring of n_buckets time
+    buckets per entity in shared numpy arrays (grown by doubling up to max_entities).
+
+    Entities are kept in least-recently-seen order: idle ones are expired from the front, and
+    when max_entities is reached the least recently seen entity is evicted, so memory stays
+    bounded however many distinct IPs arrive.
+    """
+
+    def __init__(self, window_seconds, n_buckets=DEFAULT_BUCKETS, max_entities=DEFAULT_MAX_ENTITIES,
+                 idle_seconds=None, initial_capacity=INITIAL_CAPACITY):
+        self.window_seconds = window_seconds
+        self.n_buckets = n_buckets
+        self.bucket_seconds = window_seconds / n_buckets
+        self.max_entities = max_entities
+        self.idle_seconds = idle_seconds if idle_seconds is not None else window_seconds
+        capacity = min(initial_capacity, max_entities)
+        self.counts = np.zeros((capacity, n_buckets), dtype=np.uint32)
+        self.last_bucket = np.zeros(capacity, dtype=np.int64)
+        self.fired_until = np.zeros(capacity, dtype=np.int64)
+        self.slots = OrderedDict()  # entity -> slot, least recently seen first
+        self.free = list(range(capacity - 1, -1, -1))
+        self.evictions = 0
+        self.expired = 0
+
+    def __len__(self):
+        return len(self.slots)
+
+    def _grow(self):
+        old = len(self.counts)
+        new = min(old * 2, self.max_entities)
+        self.counts = np.concatenate([self.counts, np.zeros((new - old, self.n_buckets), dtype=np.uint32)])
+        self.last_bucket = np.concatenate([self.last_bucket, np.zeros(new - old, dtype=np.int64)])
+        self.fired_until = np.concatenate([self.fired_until, np.zeros(new - old, dtype=np.int64)])
+        self.free.extend(range(new - 1, old - 1, -1))
+
+    def _slot(self, entity, bucket):
+        slot = self.slots.get(entity)
+        if slot is not None:
+            self.slots.move_to_end(entity)
+            return slot
+        if not self.free:
+            if len(self.counts) < self.max_entities:
+                self._grow()
+            else:
+                self.expire(bucket * self.bucket_seconds)
+                if not self.free:
+                    _, evicted = self.slots.popitem(last=False)
+                    self.free.append(evicted)
+                    self.evictions += 1
+        slot = self.free.pop()
+        self.counts[slot] = 0
+        self.last_bucket[slot] = bucket
+        self.fired_until[slot] = bucket
+        self.slots[entity] = slot
+        return slot
+
+    def add(self, entity, ts):
+        """Counts one event for entity at ts; returns (slot, events in the window ending at ts)."""
+        bucket = int(ts // self.bucket_seconds)
+        slot = self._slot(entity, bucket)
+        last = self.last_bucket[slot]
+        if bucket > last:
+            # Clear the buckets the ring skipped over since the entity's last event
+            gap = bucket - last
+            if gap >= self.n_buckets:
+                self.counts[slot] = 0
+            else:
+                self.counts[slot, (last + 1 + np.arange(gap)) % self.n_buckets] = 0
+            self.last_bucket[slot] = bucket
+        elif last - bucket >= self.n_buckets:
+            # Late event older than the window
+            return slot, int(self.counts[slot].sum())
+        self.counts[slot, bucket % self.n_buckets] += 1
+        return slot, int(self.counts[slot].sum())
+
+    def count(self, entity, ts):
+        """Events of entity in the window ending at ts, without counting a new one."""
+        slot = self.slots.get(entity)
+        if slot is None:
+            return 0
+        bucket = int(ts // self.bucket_seconds)
+        last = int(self.last_bucket[slot])
+        live = range(max(last, bucket) - self.n_buckets + 1, last + 1)
+        return int(self.counts[slot, [b % self.n_buckets for b in live]].sum()) if len(live) else 0
+
+    def try_fire(self, slot, ts):
+        """True at most once per window per entity, so a sustained burst raises one alert per window."""
+        bucket = int(ts // self.bucket_seconds)
+        if bucket < self.fired_until[slot]:
+            return False
+        self.fired_until[slot] = bucket + self.n_buckets
+        return True
+
+    def expire(self, now):
+        """Frees entities with no events in the last idle_seconds."""
+        cutoff = (now - self.idle_seconds) // self.bucket_seconds
+        while self.slots:
+            entity, slot = next(iter(self.slots.items()))
+            if self.last_bucket[slot] >= cutoff:
+                break
+            del self.slots[entity]
+            self.free.append(slot)
+            self.expired += 1
+
+
+class CorrelationEngine:
+    """Stateful threshold rules (CORRELATION_RULES) evaluated over the stream of normalized logs."""
+
+    def __init__(self, rules=None, n_buckets=DEFAULT_BUCKETS, max_entities=DEFAULT_MAX_ENTITIES,
+                 expire_every=EXPIRE_EVERY):
+        rules = CORRELATION_RULES if rules is None else rules
+        self.rules = {}
+        for name, rule in rules.items():
+            self.rules[name] = {
+                **rule,
+                "regex": re.compile(rule["pattern"]),
+                "counter": SlidingWindowCounter(rule["window_seconds"], n_buckets, max_entities),
+            }
+        self.expire_every = expire_every
+        self.events = 0
+        self.alerts = 0
+
+    def process(self, log: dict):
+        """Feeds one log through every rule; returns the alerts it triggered."""
+        ts = event_time(log)
+        self.events += 1
+        alerts = []
+        for name, rule in self.rules.items():
+            value = log.get(rule["field"])
+            entity = log.get(rule["entity"])
+            if value is None or not entity or not rule["regex"].search(str(value)):
+                continue
+            counter = rule["counter"]
+            slot, count = counter.add(entity, ts)
+            if count >= rule["threshold"] and counter.try_fire(slot, ts):
+                alerts.append({
+                    "rule_name": name,
+                    "entity_field": rule["entity"],
+                    "entity": entity,
+                    "count": count,
+                    "window_seconds": rule["window_seconds"],
+                    "@timestamp": log.get("@timestamp"),
+                })
+        if self.events % self.expire_every == 0:
+            for rule in self.rules.values():
+                rule["counter"].expire(ts)
+        self.alerts += len(alerts)
+        return alerts
+
+    def stats(self):
+        return {
+            "events": self.events,
+            "alerts": self.alerts,
+            "entities": {name: len(rule["counter"]) for name, rule in self.rules.items()},
+            "evictions": sum(rule["counter"].evictions for rule in self.rules.values()),
+        }
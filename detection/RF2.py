@@ -1,6 +1,7 @@
 import pandas as pd
 import numpy as np
 import os
+from dataset_loader import load_cicids_dataset, dataset_memory_mb
 from sklearn.preprocessing import LabelEncoder
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestClassifier
@@ -12,36 +13,15 @@ from sklearn.metrics import confusion_matrix
 # Path to the directory containing your CSV files
 data_path = 'data/CICIDS/'
 
-# Get a list of all CSV files in the directory
-csv_files = [os.path.join(data_path, f) for f in os.listdir(data_path) if f.endswith('.csv')]
+# Load every CSV in chunks with compact dtypes (float32/int32 features, categorical labels).
+# Cleaning (inf/NaN -> 0, numeric coercion) happens per chunk and the result is cached as Parquet,
+# so later runs skip CSV parsing entirely.
+df = load_cicids_dataset(data_path)
 
-# Load each CSV and store it in a list of dataframes
-df_list = [pd.read_csv(file) for file in csv_files]
-
-# Concatenate all dataframes into one
-df = pd.concat(df_list, ignore_index=True)
-
-print(f"Successfully combined {len(csv_files)} files.")
 print(f"Total rows in the combined dataset: {len(df)}")
+print(f"Dataset memory usage: {dataset_memory_mb(df):.1f} MB")
 df.head()
 
-df.columns = df.columns.str.strip()
-
-df.replace([np.inf, -np.inf], np.nan, inplace=True)
-# Drop rows with NaN values, or fill them. We'll fill them with 0.
-df.fillna(0, inplace=True)
-print(f"Handled infinite and missing values. No NaNs remaining: {df.isna().sum().sum() == 0}")
-
-non_numeric_cols = df.select_dtypes(exclude=np.number).columns.tolist()
-if 'Label' in non_numeric_cols:
-    non_numeric_cols.remove('Label')
-
-for col in non_numeric_cols:
-    df[col] = pd.to_numeric(df[col], errors='coerce')
-
-df.fillna(0, inplace=True)
-print("Ensured all feature columns are numeric.")
-
 X = df.drop(columns=['Label'])
 y = df['Label']
 
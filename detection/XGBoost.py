@@ -1,6 +1,7 @@
 import pandas as pd
 import numpy as np
 import os
+from dataset_loader import CICIDS_CORE_FEATURES, load_cicids_dataset, dataset_memory_mb
 from sklearn.preprocessing import LabelEncoder
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import classification_report
@@ -12,36 +13,15 @@ from xgboost import XGBClassifier
 # Path to the directory containing your CSV files
 data_path = 'data/CICIDS/'
 
-# Get a list of all CSV files in the directory
-csv_files = [os.path.join(data_path, f) for f in os.listdir(data_path) if f.endswith('.csv')]
+# Load every CSV in chunks with compact dtypes (float32/int32 features, categorical labels).
+# Cleaning (inf/NaN -> 0, numeric coercion) happens per chunk and the result is cached as Parquet,
+# so later runs skip CSV parsing entirely.
+df = load_cicids_dataset(data_path)
 
-# Load each CSV and store it in a list of dataframes
-df_list = [pd.read_csv(file) for file in csv_files]
-
-# Concatenate all dataframes into one
-df = pd.concat(df_list, ignore_index=True)
-
-print(f"Successfully combined {len(csv_files)} files.")
 print(f"Total rows in the combined dataset: {len(df)}")
+print(f"Dataset memory usage: {dataset_memory_mb(df):.1f} MB")
 df.head()
 
-df.columns = df.columns.str.strip()
-
-df.replace([np.inf, -np.inf], np.nan, inplace=True)
-# Drop rows with NaN values, or fill them. We'll fill them with 0.
-df.fillna(0, inplace=True)
-print(f"Handled infinite and missing values. No NaNs remaining: {df.isna().sum().sum() == 0}")
-
-non_numeric_cols = df.select_dtypes(exclude=np.number).columns.tolist()
-if 'Label' in non_numeric_cols:
-    non_numeric_cols.remove('Label')
-
-for col in non_numeric_cols:
-    df[col] = pd.to_numeric(df[col], errors='coerce')
-
-df.fillna(0, inplace=True)
-print("Ensured all feature columns are numeric.")
-
 X = df.drop(columns=['Label'])
 y = df['Label']
 
@@ -102,12 +82,7 @@ print("NEW XGBOOST MODEL WITH CORE FEATURES")
 print("="*50)
 
 # Define core features
-core_features = [
-    'Idle Mean', 'PSH Flag Count', 'Average Packet Size',
-    'Max Packet Length', 'Total Fwd Packets', 'Total Backward Packets',
-    'Total Length of Fwd Packets', 'Bwd Packets/s', 'FIN Flag Count',
-    'Destination Port', 'Flow Bytes/s'
-]
+core_features = CICIDS_CORE_FEATURES
 
 # Check which features are available in the dataset
 available_core_features = [col for col in core_features if col in X.columns]
@@ -127,12 +102,21 @@ X_train_core, X_test_core, y_train_core, y_test_core = train_test_split(
 )
 
 # Train new XGBoost model with core features
+xgb_params = {'n_estimators': 100}
+
+# Use the best configuration from the hyperparameter search, if one has been run (see tuning.py)
+from tuning import load_best_params
+tuned_params = load_best_params('xgboost', dataset='cicids', feature_space='core')
+if tuned_params:
+    print(f"Using tuned parameters: {tuned_params}")
+    xgb_params.update(tuned_params)
+
 xgb_core = XGBClassifier(
     objective='multi:softmax',
     num_class=len(le.classes_),
-    n_estimators=100,
     random_state=42,
-    n_jobs=-1
+    n_jobs=-1,
+    **xgb_params
 )
 
 print("Training XGBoost model with core features...")
@@ -182,7 +166,17 @@ with open('xgb_model.pkl', 'wb') as f:
 with open('label_encoder.pkl', 'wb') as f:
     pickle.dump(le, f)
 
+# Save the versioned inference bundle used by the flow scorer
+from inference_bundle import DEFAULT_BUNDLE_PATH, save_inference_bundle
+save_inference_bundle(DEFAULT_BUNDLE_PATH, xgb_core, le, available_core_features)
+
+# Compile the model to ONNX and compare its latency with the native XGBoost predictor
+from predictors import export_and_benchmark
+export_and_benchmark(xgb_core, X_test_core.values[:10000], os.path.join(DEFAULT_BUNDLE_PATH, 'model.onnx'), le.classes_, available_core_features)
+
 print("\nModel and label encoder saved successfully!")
 print("Files created:")
 print("- xgb_model.pkl (XGBoost model)")
-print("- label_encoder.pkl (Label encoder)")
\ No newline at end of file
+print("- label_encoder.pkl (Label encoder)")
+print(f"- {DEFAULT_BUNDLE_PATH}/ (Inference bundle: native booster, labels and feature schema)")
+print(f"- {os.path.join(DEFAULT_BUNDLE_PATH, 'model.onnx')} (Compiled ONNX predictor)")
\ No newline at end of file
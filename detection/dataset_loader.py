@@ -0,0 +1,163 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+# --- Configuration ---
+DEFAULT_DATA_PATH = 'data/CICIDS/'
+DEFAULT_CACHE_DIR = 'data/cache/'
+DEFAULT_CHUNKSIZE = 250_000
+CACHE_FORMAT_VERSION = 2  # part of the cache key; bump when the cached layout or contents change
+LABEL_COLUMN = 'Label'
+
+# Feature subset of the core-feature XGBoost model (XGBoost.py), shared with tuning.py and the inference bundle
+CICIDS_CORE_FEATURES = [
+    'Idle Mean', 'PSH Flag Count', 'Average Packet Size',
+    'Max Packet Length', 'Total Fwd Packets', 'Total Backward Packets',
+    'Total Length of Fwd Packets', 'Bwd Packets/s', 'FIN Flag Count',
+    'Destination Port', 'Flow Bytes/s'
+]
+
+# Ports and packet/flag counters fit comfortably in int32; everything else is stored as float32
+INT32_COLUMNS = [
+    'Destination Port', 'Total Fwd Packets', 'Total Backward Packets',
+    'FIN Flag Count', 'SYN Flag Count', 'RST Flag Count', 'PSH Flag Count',
+    'ACK Flag Count', 'URG Flag Count', 'CWE Flag Count', 'ECE Flag Count',
+]
+
+
+def _list_csv_files(data_path):
+    return sorted(os.path.join(data_path, f) for f in os.listdir(data_path) if f.endswith('.csv'))
+
+
+def _fingerprint(csv_files, usecols):
+    """Hashes file names, sizes and modification times so edited datasets invalidate the cache."""
+    digest = hashlib.sha256()
+    digest.update(str(CACHE_FORMAT_VERSION).encode())
+    digest.update(json.dumps(sorted(usecols) if usecols else None).encode())
+    for path in csv_files:
+        stat = os.stat(path)
+        digest.update(f"{os.path.basename(path)}:{stat.st_size}:{int(stat.st_mtime)}".encode())
+    return digest.hexdigest()[:16]
+
+
+def _clean_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    """Strips column names, coerces features to compact numeric dtypes and removes inf/NaN."""
+    chunk.columns = chunk.columns.str.strip()
+    labels = chunk.pop(LABEL_COLUMN).astype(str).str.strip() if LABEL_COLUMN in chunk.columns else None
+
+    for col in chunk.columns:
+        if chunk[col].dtype != np.float32:
+            chunk[col] = pd.to_numeric(chunk[col], errors='coerce').astype(np.float32)
+
+    values = chunk.to_numpy(copy=False)
+    values[~np.isfinite(values)] = 0
+    chunk = pd.DataFrame(values, columns=chunk.columns, index=chunk.index)
+
+    for col in INT32_COLUMNS:
+        if col in chunk.columns:
+            chunk[col] = chunk[col].astype(np.int32)
+
+    if labels is not None:
+        chunk[LABEL_COLUMN] = labels
+    return chunk
+
+
+def _iter_clean_chunks(csv_path, chunksize, usecols=None):
+    """Yields cleaned chunks of one CSV, reading features directly as float32 where possible."""
+    header = pd.read_csv(csv_path, nrows=0).columns
+    if usecols:
+        wanted = set(usecols) | {LABEL_COLUMN}
+        selected = [col for col in header if col.strip() in wanted]
+    else:
+        selected = list(header)
+    dtypes = {col: np.float32 for col in selected if col.strip() != LABEL_COLUMN}
+
+    yielded = 0
+    try:
+        reader = pd.read_csv(csv_path, usecols=selected, dtype=dtypes, chunksize=chunksize, low_memory=False)
+        for chunk in reader:
+            yield _clean_chunk(chunk)
+            yielded += 1
+    except ValueError:
+        # Some exports contain stray text in numeric columns; fall back to per-chunk coercion,
+        # skipping the chunks already yielded (both readers split the file at the same rows)
+        print(f"  -> Non-numeric values in {csv_path}, re-reading from chunk {yielded + 1} with per-chunk coercion...")
+        reader = pd.read_csv(csv_path, usecols=selected, chunksize=chunksize, low_memory=False)
+        for index, chunk in enumerate(reader):
+            if index >= yielded:
+                yield _clean_chunk(chunk)
+
+
+def load_cicids_dataset(data_path=DEFAULT_DATA_PATH, cache_dir=DEFAULT_CACHE_DIR,
+                        chunksize=DEFAULT_CHUNKSIZE, usecols=None, use_cache=True):
+    """
+    Loads and cleans every CICIDS CSV in `data_path` with compact dtypes.
+
+    Files are processed in chunks and appended to a Parquet cache, so peak memory stays around
+    one chunk plus the final float32 frame. Later runs read the cache directly as long as the
+    source files (names, sizes, mtimes) and the requested columns are unchanged.
+    Returns a DataFrame with float32/int32 features and a categorical 'Label' column.
+    """
+    csv_files = _list_csv_files(data_path)
+    if not csv_files:
+        raise FileNotFoundError(f"No CSV files found in '{data_path}'")
+
+    cache_path = os.path.join(cache_dir, f"cicids_{_fingerprint(csv_files, usecols)}.parquet")
+    if use_cache and os.path.exists(cache_path):
+        print(f"Loading cleaned dataset from cache '{cache_path}'...")
+        return _read_cache(cache_path)
+
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        print("Warning: pyarrow not installed, dataset will not be cached.")
+        pa = pq = None
+
+    if pq is None or not use_cache:
+        frames = []
+        for csv_path in csv_files:
+            print(f"  -> Reading {csv_path}...")
+            frames.extend(_iter_clean_chunks(csv_path, chunksize, usecols))
+        df = pd.concat(frames, ignore_index=True)
+        df[LABEL_COLUMN] = df[LABEL_COLUMN].astype('category')
+        print(f"Successfully combined {len(csv_files)} files ({len(df)} rows).")
+        return df
+
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = cache_path + '.tmp'
+    writer = None
+    schema = None
+    total_rows = 0
+    try:
+        for csv_path in csv_files:
+            print(f"  -> Reading {csv_path}...")
+            for chunk in _iter_clean_chunks(csv_path, chunksize, usecols):
+                if schema is None:
+                    schema = pa.Schema.from_pandas(chunk, preserve_index=False)
+                    writer = pq.ParquetWriter(tmp_path, schema, compression='snappy')
+                else:
+                    # Files can list columns in a different order; align to the first file's schema
+                    chunk = chunk.reindex(columns=schema.names, fill_value=0)
+                writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+                total_rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    os.replace(tmp_path, cache_path)
+
+    print(f"Successfully combined {len(csv_files)} files ({total_rows} rows), cached to '{cache_path}'.")
+    return _read_cache(cache_path)
+
+
+def _read_cache(cache_path):
+    df = pd.read_parquet(cache_path)
+    df[LABEL_COLUMN] = df[LABEL_COLUMN].astype('category')
+    return df
+
+
+def dataset_memory_mb(df: pd.DataFrame) -> float:
+    return df.memory_usage(deep=True).sum() / (1024 * 1024)
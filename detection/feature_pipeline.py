@@ -0,0 +1,192 @@
+import hashlib
+import json
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.feature_selection import mutual_info_classif
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+DEFAULT_CACHE_DIR = 'data/cache/features/'
+STAT_FEATURES = ['mean_features', 'std_features', 'max_features', 'min_features', 'range_features']
+
+
+def hash_frame(data) -> str:
+    """Content hash of a DataFrame/Series/array, used as part of cache keys."""
+    digest = hashlib.sha256()
+    if isinstance(data, (pd.DataFrame, pd.Series)):
+        digest.update(pd.util.hash_pandas_object(data, index=False).values.tobytes())
+        if isinstance(data, pd.DataFrame):
+            digest.update(json.dumps([str(col) for col in data.columns]).encode())
+    else:
+        digest.update(np.ascontiguousarray(data).tobytes())
+    return digest.hexdigest()[:20]
+
+
+class FeatureCache:
+    """Disk cache of intermediate matrices keyed by a hash of their inputs."""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR):
+        self.cache_dir = cache_dir
+
+    def key(self, *parts) -> str:
+        return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()[:24]
+
+    def get_or_compute(self, name, key, compute):
+        if self.cache_dir is None:
+            return compute()
+        path = os.path.join(self.cache_dir, f"{name}_{key}.joblib")
+        if os.path.exists(path):
+            print(f"  -> Using cached {name} ({path})")
+            return joblib.load(path)
+        value = compute()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        joblib.dump(value, path)
+        return value
+
+
+class UNSWFeaturePipeline:
+    """
+    Fitted, serializable version of OptimizedLightGBM's feature engineering:
+    sparse one-hot encoding of categorical columns, row-wise statistics,
+    mutual-information feature selection and standardization.
+
+    The encoded matrices and mutual-information scores are cached on disk keyed by the
+    content of the input data, so changing only model parameters skips preprocessing.
+    """
+
+    def __init__(self, k=200, categorical_max_unique=20, mi_sample_size=None,
+                 random_state=42, cache_dir=DEFAULT_CACHE_DIR):
+        self.k = k
+        self.categorical_max_unique = categorical_max_unique
+        # Estimate mutual information on a stratified subsample of this many rows (None = all rows)
+        self.mi_sample_size = mi_sample_size
+        self.random_state = random_state
+        self.cache = FeatureCache(cache_dir)
+
+        self.categorical_cols_ = None
+        self.numeric_cols_ = None
+        self.encoder_ = None
+        self.feature_names_ = None
+        self.mi_scores_ = None
+        self.selected_indices_ = None
+        self.selected_features_ = None
+        self.scaler_ = None
+        self._train_key = None
+
+    def _params(self):
+        return {
+            'categorical_max_unique': self.categorical_max_unique,
+            'mi_sample_size': self.mi_sample_size,
+            'random_state': self.random_state,
+        }
+
+    def _encode(self, X: pd.DataFrame):
+        """Returns a CSR matrix of [numeric columns | one-hot columns | row statistics]."""
+        numeric = sparse.csr_matrix(X[self.numeric_cols_].to_numpy(dtype=np.float32))
+        if self.categorical_cols_:
+            one_hot = self.encoder_.transform(X[self.categorical_cols_].astype(str)).astype(np.float32)
+            encoded = sparse.hstack([numeric, one_hot], format='csr')
+        else:
+            encoded = numeric
+
+        n_features = encoded.shape[1]
+        row_sum = np.asarray(encoded.sum(axis=1)).ravel()
+        row_sumsq = np.asarray(encoded.multiply(encoded).sum(axis=1)).ravel()
+        row_mean = row_sum / n_features
+        row_var = np.maximum(row_sumsq - n_features * row_mean ** 2, 0) / max(n_features - 1, 1)
+        row_max = encoded.max(axis=1).toarray().ravel()
+        row_min = encoded.min(axis=1).toarray().ravel()
+        stats = np.column_stack([row_mean, np.sqrt(row_var), row_max, row_min, row_max - row_min]).astype(np.float32)
+
+        return sparse.hstack([encoded, sparse.csr_matrix(stats)], format='csr')
+
+    def _mutual_information(self, encoded, y):
+        """Mutual information per column; one-hot columns are scored as discrete features."""
+        y = np.asarray(y)
+        rows = np.arange(encoded.shape[0])
+        if self.mi_sample_size and self.mi_sample_size < len(rows):
+            rng = np.random.default_rng(self.random_state)
+            # Stratified subsample keeps rare classes represented
+            sampled = []
+            for label in np.unique(y):
+                label_rows = rows[y == label]
+                n_take = max(1, int(round(len(label_rows) * self.mi_sample_size / len(rows))))
+                sampled.append(rng.choice(label_rows, size=min(n_take, len(label_rows)), replace=False))
+            rows = np.sort(np.concatenate(sampled))
+            print(f"Estimating mutual information on {len(rows)} sampled rows...")
+
+        sample = encoded[rows]
+        y_sample = y[rows]
+        n_numeric = len(self.numeric_cols_)
+        n_one_hot = encoded.shape[1] - n_numeric - len(STAT_FEATURES)
+        continuous_idx = np.r_[np.arange(n_numeric), np.arange(n_numeric + n_one_hot, encoded.shape[1])]
+        discrete_idx = np.arange(n_numeric, n_numeric + n_one_hot)
+
+        scores = np.zeros(encoded.shape[1])
+        scores[continuous_idx] = mutual_info_classif(
+            sample[:, continuous_idx].toarray(), y_sample,
+            discrete_features=False, random_state=self.random_state
+        )
+        if len(discrete_idx):
+            scores[discrete_idx] = mutual_info_classif(
+                sample[:, discrete_idx], y_sample,
+                discrete_features=True, random_state=self.random_state
+            )
+        return scores
+
+    def fit(self, X: pd.DataFrame, y):
+        self.fit_transform(X, y)
+        return self
+
+    def fit_transform(self, X: pd.DataFrame, y):
+        print("Fitting feature pipeline...")
+        self.categorical_cols_ = [
+            col for col in X.columns
+            if X[col].dtype == 'object' or X[col].nunique() < self.categorical_max_unique
+        ]
+        self.numeric_cols_ = [col for col in X.columns if col not in self.categorical_cols_]
+        print(f"Identified categorical columns: {self.categorical_cols_}")
+
+        self.encoder_ = OneHotEncoder(handle_unknown='ignore', sparse_output=True, dtype=np.float32)
+        if self.categorical_cols_:
+            self.encoder_.fit(X[self.categorical_cols_].astype(str))
+            one_hot_names = self.encoder_.get_feature_names_out(self.categorical_cols_).tolist()
+        else:
+            one_hot_names = []
+        self.feature_names_ = self.numeric_cols_ + one_hot_names + STAT_FEATURES
+
+        self._train_key = self.cache.key('train', hash_frame(X), self._params())
+        encoded = self.cache.get_or_compute('encoded', self._train_key, lambda: self._encode(X))
+
+        mi_key = self.cache.key('mi', self._train_key, hash_frame(np.asarray(y)))
+        print("Performing feature selection...")
+        self.mi_scores_ = self.cache.get_or_compute('mi_scores', mi_key, lambda: self._mutual_information(encoded, y))
+
+        k = min(self.k, encoded.shape[1])
+        self.selected_indices_ = np.sort(np.argsort(-self.mi_scores_, kind='stable')[:k])
+        self.selected_features_ = [self.feature_names_[i] for i in self.selected_indices_]
+        print(f"Selected {len(self.selected_features_)} features out of {encoded.shape[1]}")
+
+        selected = encoded[:, self.selected_indices_].toarray()
+        self.scaler_ = StandardScaler()
+        return self.scaler_.fit_transform(selected).astype(np.float32)
+
+    def transform(self, X: pd.DataFrame):
+        if self.selected_indices_ is None:
+            raise ValueError("UNSWFeaturePipeline must be fitted before calling transform")
+        key = self.cache.key('transform', self._train_key, hash_frame(X), self._params())
+        encoded = self.cache.get_or_compute('encoded', key, lambda: self._encode(X))
+        selected = encoded[:, self.selected_indices_].toarray()
+        return self.scaler_.transform(selected).astype(np.float32)
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        joblib.dump(self, path)
+        print(f"Feature pipeline saved to '{path}'")
+
+    @staticmethod
+    def load(path) -> 'UNSWFeaturePipeline':
+        return joblib.load(path)
@@ -0,0 +1,156 @@
+import json
+import os
+import pickle
+import sys
+import threading
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from dataset_loader import CICIDS_CORE_FEATURES
+from predictors import DEFAULT_PREPROCESSING, Predictor
+
+# --- Configuration ---
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BUNDLE_PATH = os.path.join(PROJECT_ROOT, 'xgb_bundle')
+BUNDLE_FORMAT_VERSION = 1
+MANIFEST_FILENAME = 'manifest.json'
+BOOSTER_FILENAME = 'booster.ubj'
+
+# Feature schema the flow aggregator produces and the core-feature model is trained on
+CORE_FEATURES = CICIDS_CORE_FEATURES
+
+
+class InferenceBundle(Predictor):
+    """A loaded XGBoost booster together with its class labels and feature schema."""
+    backend = 'bundle'
+
+    def __init__(self, booster, classes, feature_names, preprocessing, manifest):
+        super().__init__(classes, feature_names, preprocessing)
+        self.booster = booster
+        self.manifest = manifest
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """Returns class probabilities for an already prepared feature matrix."""
+        margins = np.asarray(self.booster.inplace_predict(X, predict_type='margin'))
+        if margins.ndim == 1:
+            positive = 1.0 / (1.0 + np.exp(-margins))
+            return np.column_stack([1.0 - positive, positive])
+        margins = margins - margins.max(axis=1, keepdims=True)
+        exp_margins = np.exp(margins)
+        return exp_margins / exp_margins.sum(axis=1, keepdims=True)
+
+
+def save_inference_bundle(path, model, label_encoder, feature_names, preprocessing=None):
+    """
+    Writes a versioned inference bundle: the booster in XGBoost's native UBJSON format
+    plus a manifest holding the class labels, ordered feature schema and preprocessing metadata.
+    """
+    import xgboost
+
+    booster = model.get_booster() if hasattr(model, 'get_booster') else model
+    classes = [str(label) for label in label_encoder.classes_]
+    feature_names = list(feature_names)
+    _validate_schema(booster, classes, feature_names)
+
+    os.makedirs(path, exist_ok=True)
+    booster.save_model(os.path.join(path, BOOSTER_FILENAME))
+
+    manifest = {
+        'format_version': BUNDLE_FORMAT_VERSION,
+        'xgboost_version': xgboost.__version__,
+        'booster_file': BOOSTER_FILENAME,
+        'classes': classes,
+        'feature_names': feature_names,
+        'preprocessing': preprocessing or DEFAULT_PREPROCESSING,
+    }
+    with open(os.path.join(path, MANIFEST_FILENAME), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    print(f"Inference bundle saved to '{path}'")
+    return manifest
+
+
+def load_inference_bundle(path=DEFAULT_BUNDLE_PATH) -> InferenceBundle:
+    """Loads a bundle from disk and checks the model against its feature schema and labels."""
+    import xgboost
+
+    with open(os.path.join(path, MANIFEST_FILENAME), 'r') as f:
+        manifest = json.load(f)
+
+    if manifest.get('format_version') != BUNDLE_FORMAT_VERSION:
+        raise ValueError(
+            f"Unsupported inference bundle version {manifest.get('format_version')} "
+            f"(expected {BUNDLE_FORMAT_VERSION}) in '{path}'"
+        )
+
+    booster = xgboost.Booster()
+    booster.load_model(os.path.join(path, manifest['booster_file']))
+    # Single-threaded per call: flow batches are small and workers already run in parallel
+    booster.set_param({'nthread': 1})
+
+    _validate_schema(booster, manifest['classes'], manifest['feature_names'])
+    return InferenceBundle(
+        booster,
+        manifest['classes'],
+        manifest['feature_names'],
+        manifest.get('preprocessing', DEFAULT_PREPROCESSING),
+        manifest,
+    )
+
+
+def _validate_schema(booster, classes, feature_names):
+    """Raises ValueError when the booster does not match the declared features or classes."""
+    if booster.num_features() != len(feature_names):
+        raise ValueError(
+            f"Model expects {booster.num_features()} features but the schema lists {len(feature_names)}"
+        )
+    if booster.feature_names and list(booster.feature_names) != list(feature_names):
+        raise ValueError(
+            f"Model feature order {booster.feature_names} does not match schema {feature_names}"
+        )
+
+    learner_params = json.loads(booster.save_config())['learner']['learner_model_param']
+    num_class = int(learner_params.get('num_class', 0))
+    expected_classes = num_class if num_class > 0 else 2
+    if expected_classes != len(classes):
+        raise ValueError(f"Model predicts {expected_classes} classes but the bundle has {len(classes)} labels")
+
+
+# --- Per-process bundle cache ---
+# The bundle is loaded once per process on first use. Loading it before forking worker
+# processes (e.g. multiprocessing with the 'fork' start method) shares the booster pages
+# copy-on-write, so workers start without touching the disk again.
+_bundle_cache = {}
+_bundle_lock = threading.Lock()
+
+
+def get_inference_bundle(path=DEFAULT_BUNDLE_PATH) -> InferenceBundle:
+    """Returns the process-wide bundle for `path`, loading it lazily on first access."""
+    path = os.path.abspath(path)
+    bundle = _bundle_cache.get(path)
+    if bundle is None:
+        with _bundle_lock:
+            bundle = _bundle_cache.get(path)
+            if bundle is None:
+                bundle = load_inference_bundle(path)
+                _bundle_cache[path] = bundle
+    return bundle
+
+
+def convert_pickles_to_bundle(model_path, encoder_path, bundle_path=DEFAULT_BUNDLE_PATH):
+    """Converts the legacy xgb_model.pkl / label_encoder.pkl pair into an inference bundle."""
+    with open(model_path, 'rb') as f:
+        model = pickle.load(f)
+    with open(encoder_path, 'rb') as f:
+        label_encoder = pickle.load(f)
+
+    feature_names = model.get_booster().feature_names or CORE_FEATURES
+    return save_inference_bundle(bundle_path, model, label_encoder, feature_names)
+
+
+if __name__ == "__main__":
+    detection_dir = os.path.dirname(os.path.abspath(__file__))
+    model_file = sys.argv[1] if len(sys.argv) > 1 else os.path.join(detection_dir, 'xgb_model.pkl')
+    encoder_file = sys.argv[2] if len(sys.argv) > 2 else os.path.join(detection_dir, 'label_encoder.pkl')
+    output_path = sys.argv[3] if len(sys.argv) > 3 else DEFAULT_BUNDLE_PATH
+    convert_pickles_to_bundle(model_file, encoder_file, output_path)
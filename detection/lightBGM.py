@@ -2,18 +2,20 @@ import pandas as pd
 import numpy as np
 import lightgbm as lgb
 from sklearn.model_selection import cross_val_score, StratifiedKFold
-from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import accuracy_score, classification_report, confusion_matrix, roc_auc_score
-from sklearn.feature_selection import SelectKBest, mutual_info_classif
+from feature_pipeline import DEFAULT_CACHE_DIR, UNSWFeaturePipeline
+from tuning import load_best_params, pipeline_feature_space
 import matplotlib.pyplot as plt
 import seaborn as sns
 import warnings
 warnings.filterwarnings('ignore')
 
 class OptimizedLightGBM:
-    def __init__(self):
+    def __init__(self, mi_sample_size=50000, cache_dir=DEFAULT_CACHE_DIR):
         self.model = None
-        self.scaler = StandardScaler()
+        self.feature_pipeline = UNSWFeaturePipeline(
+            k=200, mi_sample_size=mi_sample_size, cache_dir=cache_dir
+        )
         
     def load_and_preprocess_data(self):
         """Load and preprocess the UNSW-NB15 dataset"""
@@ -38,77 +40,32 @@ class OptimizedLightGBM:
         X_test = test_df[feature_cols]
         y_test = test_df[label_col]
         
-        # Handle categorical variables
-        categorical_cols = []
-        for col in X_train.columns:
-
-            if X_train[col].dtype == 'object' or X_train[col].nunique() < 20:
-                categorical_cols.append(col)
-        
-        print(f"Identified categorical columns: {categorical_cols}")
-        
-        # One-hot encoding for categorical variables
-        if categorical_cols:
-            X_train = pd.get_dummies(X_train, columns=categorical_cols, drop_first=False)
-            X_test = pd.get_dummies(X_test, columns=categorical_cols, drop_first=False)
-            
-            # Ensure both datasets have the same columns
-            train_cols = set(X_train.columns)
-            test_cols = set(X_test.columns)
-            common_cols = list(train_cols.intersection(test_cols))
-            
-            X_train = X_train[common_cols]
-            X_test = X_test[common_cols]
-        
-        print(f"Features after preprocessing: {X_train.shape[1]}")
+        # Categorical columns are one-hot encoded (sparse) by the feature pipeline
+        print(f"Raw features: {X_train.shape[1]}")
         print(f"Training samples: {len(X_train)}")
         print(f"Testing samples: {len(X_test)}")
         
         return X_train, X_test, y_train, y_test, X_train.columns.tolist()
     
     def feature_engineering(self, X_train, X_test, y_train):
-        """Advanced feature engineering"""
+        """Advanced feature engineering (fitted, cached pipeline; see feature_pipeline.py)"""
         print("Performing feature engineering...")
         
-        # 1. Statistical features
-        X_train_stats = X_train.copy()
-        X_test_stats = X_test.copy()
-        
-        # Add statistical features
-        X_train_stats['mean_features'] = X_train_stats.mean(axis=1)
-        X_train_stats['std_features'] = X_train_stats.std(axis=1)
-        X_train_stats['max_features'] = X_train_stats.max(axis=1)
-        X_train_stats['min_features'] = X_train_stats.min(axis=1)
-        X_train_stats['range_features'] = X_train_stats.max(axis=1) - X_train_stats.min(axis=1)
-        
-        X_test_stats['mean_features'] = X_test_stats.mean(axis=1)
-        X_test_stats['std_features'] = X_test_stats.std(axis=1)
-        X_test_stats['max_features'] = X_test_stats.max(axis=1)
-        X_test_stats['min_features'] = X_test_stats.min(axis=1)
-        X_test_stats['range_features'] = X_test_stats.max(axis=1) - X_test_stats.min(axis=1)
-        
-        # 2. Feature selection using mutual information
-        print("Performing feature selection...")
-        selector = SelectKBest(score_func=mutual_info_classif, k=min(200, X_train_stats.shape[1]))
-        X_train_selected = selector.fit_transform(X_train_stats, y_train)
-        X_test_selected = selector.transform(X_test_stats)
-        
-        # Get selected feature names
-        selected_features = X_train_stats.columns[selector.get_support()].tolist()
-        print(f"Selected {len(selected_features)} features out of {X_train_stats.shape[1]}")
-        
-        # 3. Standardization
-        X_train_scaled = self.scaler.fit_transform(X_train_selected)
-        X_test_scaled = self.scaler.transform(X_test_selected)
-        
-        return X_train_scaled, X_test_scaled, selected_features
+        # One-hot encoding, statistical features, mutual-information selection and scaling.
+        # Intermediate matrices and MI scores are cached by data content, so re-runs that only
+        # change model parameters skip this step.
+        X_train_scaled = self.feature_pipeline.fit_transform(X_train, y_train)
+        X_test_scaled = self.feature_pipeline.transform(X_test)
+        self.feature_pipeline.save('models/lightgbm_feature_pipeline.joblib')
+        
+        return X_train_scaled, X_test_scaled, self.feature_pipeline.selected_features_
     
     def train_optimized_model(self, X_train, y_train):
         """Train the LightGBM model with best parameters"""
         print("Training optimized model...")
         
         # Best parameters based on extensive testing
-        self.model = lgb.LGBMClassifier(
+        params = dict(
             objective='binary',
             metric='auc',
             n_estimators=1000,
@@ -125,6 +82,16 @@ class OptimizedLightGBM:
             verbose=-1
         )
         
+        # Override with the best configuration from the hyperparameter search, if one was run on
+        # this pipeline's output (tuning.py --features pipeline-k200)
+        tuned_params = load_best_params('lightgbm', dataset='unsw',
+                                        feature_space=pipeline_feature_space(self.feature_pipeline))
+        if tuned_params:
+            print(f"Using tuned parameters: {tuned_params}")
+            params.update(tuned_params)
+        
+        self.model = lgb.LGBMClassifier(**params)
+        
         # Train the model
         self.model.fit(X_train, y_train)
         
@@ -276,6 +243,16 @@ def main():
     print("="*40)
     cv_scores = model.cross_validation_analysis(X_train_engineered, y_train)
     
+    # Compile to ONNX and benchmark against native LightGBM
+    print("\n" + "="*40)
+    print("ONNX EXPORT AND LATENCY BENCHMARK")
+    print("="*40)
+    from predictors import export_and_benchmark
+    export_and_benchmark(
+        final_model, X_test_engineered[:10000], 'models/lightgbm_unsw.onnx',
+        final_model.classes_, selected_features
+    )
+    
     # Generate plots
     print("\n" + "="*40)
     print("GENERATING VISUALIZATIONS")
@@ -6,9 +6,15 @@ import os
 
 # Add the parent directory to the path so we can import from ingestion
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from ingestion.flow_aggregator import FlowAggregator
 from ingestion.parser import LogParser
+from inference_bundle import (
+    CORE_FEATURES, DEFAULT_BUNDLE_PATH, MANIFEST_FILENAME,
+    get_inference_bundle, save_inference_bundle,
+)
+from predictors import load_predictor
 
 def load_model_and_encoder():
     """Load the saved XGBoost model and label encoder."""
@@ -27,50 +33,42 @@ def load_model_and_encoder():
         print("Error: Model files not found. Please run XGBoost.py first to train and save the model.")
         return None, None
 
-def predict_flows(flow_data, model, label_encoder):
-    """Predict labels for flow data using the trained model."""
+def load_scoring_bundle(bundle_path=DEFAULT_BUNDLE_PATH):
+    """
+    Load the inference bundle used for scoring, converting the legacy pickles once if needed.
+    The bundle is cached per process, so repeated calls do not touch the disk.
+    """
+    if not os.path.exists(os.path.join(bundle_path, MANIFEST_FILENAME)):
+        print(f"Inference bundle not found at '{bundle_path}', converting legacy pickles...")
+        model, label_encoder = load_model_and_encoder()
+        if model is None:
+            return None
+        feature_names = model.get_booster().feature_names or CORE_FEATURES
+        save_inference_bundle(bundle_path, model, label_encoder, feature_names)
+
+    bundle = get_inference_bundle(bundle_path)
+    print(f"Inference bundle loaded ({len(bundle.classes)} classes, {len(bundle.feature_names)} features)")
+    return bundle
+
+def predict_flows(flow_data, predictor):
+    """Predict labels for flow data using any Predictor (inference bundle or compiled ONNX graph)."""
     if flow_data.empty:
         print("No flow data to predict on.")
         return None
     
-    # Ensure the flow data has the same features as the training data
-    expected_features = [
-        'Idle Mean', 'PSH Flag Count', 'Average Packet Size',
-        'Max Packet Length', 'Total Fwd Packets', 'Total Backward Packets',
-        'Total Length of Fwd Packets', 'Bwd Packets/s', 'FIN Flag Count',
-        'Destination Port', 'Flow Bytes/s'
-    ]
-    
-    # Check which features are available
-    available_features = [col for col in expected_features if col in flow_data.columns]
-    missing_features = [col for col in expected_features if col not in flow_data.columns]
-    
-    if missing_features:
-        print(f"Warning: Missing features: {missing_features}")
-        print("These features will be filled with 0.")
-        
-        # Fill missing features with 0
-        for feature in missing_features:
-            flow_data[feature] = 0
-    
-    # Select only the expected features in the correct order
-    X_pred = flow_data[expected_features]
-    
-    # Make predictions
-    predictions = model.predict(X_pred)
-    prediction_proba = model.predict_proba(X_pred)
-    
-    # Convert numeric predictions back to original labels
-    predicted_labels = label_encoder.inverse_transform(predictions)
+    # The predictor carries the ordered feature schema the model was trained on
+    expected_features = predictor.feature_names
+    predicted_labels, prediction_confidence = predictor.predict(flow_data)
     
     # Create results DataFrame
     results = pd.DataFrame({
         'Flow_Index': range(len(flow_data)),
         'Predicted_Label': predicted_labels,
-        'Prediction_Confidence': np.max(prediction_proba, axis=1)
+        'Prediction_Confidence': prediction_confidence
     })
     
     # Add original features for reference
+    X_pred = flow_data.reindex(columns=expected_features, fill_value=0)
     for feature in expected_features:
         results[f'Feature_{feature}'] = X_pred[feature].values
     
@@ -81,11 +79,16 @@ def main():
     print("FLOW TRAFFIC ANOMALY DETECTION USING XGBOOST")
     print("="*60)
     
-    # Load the trained model and label encoder
-    model, label_encoder = load_model_and_encoder()
-    if model is None:
+    # Load the inference bundle (booster, labels and feature schema)
+    bundle = load_scoring_bundle()
+    if bundle is None:
         return
     
+    # Optionally score through the compiled ONNX graph (see predictors.py)
+    predictor = bundle
+    if os.getenv("FLOW_PREDICTOR_BACKEND", "bundle") == "onnx":
+        predictor = load_predictor("onnx")
+    
     # Parse and aggregate flow data
     print("\n1. Parsing and aggregating flow data...")
     parser = LogParser()
@@ -118,7 +121,7 @@ def main():
     
     # Make predictions
     print("\n3. Making predictions with XGBoost model...")
-    results = predict_flows(flow_df, model, label_encoder)
+    results = predict_flows(flow_df, predictor)
     
     if results is not None:
         print("\n4. Prediction Results:")
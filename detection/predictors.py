@@ -0,0 +1,229 @@
+import json
+import os
+import sys
+import time
+from abc import ABC, abstractmethod
+
+import numpy as np
+import pandas as pd
+
+# Preprocessing applied to features before scoring (mirrors the training scripts)
+DEFAULT_PREPROCESSING = {
+    'dtype': 'float32',
+    'replace_inf_with': 0.0,
+    'fill_missing_with': 0.0,
+}
+
+
+class Predictor(ABC):
+    """
+    Common scoring interface for the detection models.
+    Subclasses only implement predict_proba over a prepared float32 matrix; one that does not
+    fails at construction.
+    """
+    backend = 'base'
+
+    def __init__(self, classes, feature_names, preprocessing=None):
+        self.classes = np.asarray(classes, dtype=object)
+        self.feature_names = list(feature_names)
+        self.preprocessing = dict(preprocessing or DEFAULT_PREPROCESSING)
+
+    def prepare_features(self, flow_data: pd.DataFrame) -> np.ndarray:
+        """Aligns a flow DataFrame to the predictor's feature schema and returns a dense matrix."""
+        missing_features = [col for col in self.feature_names if col not in flow_data.columns]
+        if missing_features:
+            print(f"Warning: Missing features: {missing_features}")
+            print("These features will be filled with 0.")
+
+        X = flow_data.reindex(columns=self.feature_names, fill_value=self.preprocessing['fill_missing_with'])
+        X = X.to_numpy(dtype=self.preprocessing['dtype'], copy=True)
+        X[np.isinf(X)] = self.preprocessing['replace_inf_with']
+        X[np.isnan(X)] = self.preprocessing['fill_missing_with']
+        return X
+
+    @abstractmethod
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """Returns class probabilities for an already prepared feature matrix."""
+
+    def predict(self, flow_data: pd.DataFrame):
+        """Returns (predicted_labels, confidences) for a DataFrame of flow features."""
+        prediction_proba = self.predict_proba(self.prepare_features(flow_data))
+        predicted_indices = np.argmax(prediction_proba, axis=1)
+        return self.classes[predicted_indices], np.max(prediction_proba, axis=1)
+
+
+class NativePredictor(Predictor):
+    """Wraps a trained scikit-learn, XGBoost or LightGBM estimator's own predict_proba."""
+    backend = 'native'
+
+    def __init__(self, model, classes, feature_names, preprocessing=None):
+        super().__init__(classes, feature_names, preprocessing)
+        self.model = model
+
+    def predict_proba(self, X):
+        return np.asarray(self.model.predict_proba(X))
+
+
+class OnnxPredictor(Predictor):
+    """Runs a compiled ONNX graph with ONNX Runtime on CPU."""
+    backend = 'onnx'
+
+    def __init__(self, onnx_path, classes, feature_names, preprocessing=None, intra_op_threads=1):
+        super().__init__(classes, feature_names, preprocessing)
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = intra_op_threads
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(onnx_path, sess_options=options, providers=['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+
+        output_names = [output.name for output in self.session.get_outputs()]
+        self.proba_output = 'probabilities' if 'probabilities' in output_names else output_names[-1]
+
+    def predict_proba(self, X):
+        (probabilities,) = self.session.run([self.proba_output], {self.input_name: X})
+        probabilities = np.asarray(probabilities)
+        if probabilities.ndim == 1:
+            return np.column_stack([1.0 - probabilities, probabilities])
+        return probabilities
+
+
+def export_model_to_onnx(model, n_features, onnx_path):
+    """
+    Compiles a trained RandomForest, XGBoost (classifier or Booster) or LightGBM classifier into an ONNX graph
+    that outputs a dense probability tensor. Requires skl2onnx / onnxmltools.
+    """
+    try:
+        from onnxmltools.convert.common.data_types import FloatTensorType
+    except ImportError:
+        raise ImportError("ONNX export requires 'onnxmltools' and 'skl2onnx' (pip install onnxmltools skl2onnx)")
+
+    initial_types = [('input', FloatTensorType([None, n_features]))]
+    model_type = type(model).__module__.split('.')[0]
+
+    if model_type == 'xgboost':
+        import onnxmltools
+        # The ONNX converter only understands the default f0..fN feature names
+        booster = model.get_booster() if hasattr(model, 'get_booster') else model
+        booster = booster.copy()
+        booster.feature_names = None
+        # multi:softmax graphs would emit raw margins; softprob gives the same trees with probabilities
+        if json.loads(booster.save_config())['learner']['objective']['name'] == 'multi:softmax':
+            booster.set_param({'objective': 'multi:softprob'})
+        onnx_model = onnxmltools.convert_xgboost(booster, initial_types=initial_types)
+    elif model_type == 'lightgbm':
+        import onnxmltools
+        onnx_model = onnxmltools.convert_lightgbm(model, initial_types=initial_types, zipmap=False)
+    else:
+        from skl2onnx import convert_sklearn
+        from skl2onnx.common.data_types import FloatTensorType as SklFloatTensorType
+        initial_types = [('input', SklFloatTensorType([None, n_features]))]
+        # Pipelines (e.g. scaler + forest) take the zipmap option on their final classifier
+        classifier = model.steps[-1][1] if hasattr(model, 'steps') else model
+        onnx_model = convert_sklearn(model, initial_types=initial_types, options={id(classifier): {'zipmap': False}})
+
+    os.makedirs(os.path.dirname(os.path.abspath(onnx_path)), exist_ok=True)
+    with open(onnx_path, 'wb') as f:
+        f.write(onnx_model.SerializeToString())
+    print(f"ONNX model saved to '{onnx_path}'")
+    return onnx_path
+
+
+def load_predictor(backend='bundle', bundle_path=None, onnx_path=None, intra_op_threads=1):
+    """
+    Returns the flow scorer's predictor for the requested backend.
+    'bundle' uses the XGBoost inference bundle directly; 'onnx' runs the compiled graph
+    with the bundle's labels and feature schema.
+    """
+    from inference_bundle import DEFAULT_BUNDLE_PATH, get_inference_bundle
+
+    bundle = get_inference_bundle(bundle_path or DEFAULT_BUNDLE_PATH)
+    if backend == 'bundle':
+        return bundle
+    if backend == 'onnx':
+        onnx_path = onnx_path or os.path.join(bundle_path or DEFAULT_BUNDLE_PATH, 'model.onnx')
+        return OnnxPredictor(onnx_path, bundle.classes, bundle.feature_names, bundle.preprocessing, intra_op_threads)
+    raise ValueError(f"Unknown predictor backend: {backend}")
+
+
+def benchmark_predictors(predictors, X, single_row_iterations=1000, batch_iterations=20):
+    """
+    Measures single-row and batch latency for each predictor on CPU.
+    Returns a list of dicts with per-row latency in microseconds and batch throughput.
+    """
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    results = []
+    for name, predictor in predictors.items():
+        # Warm up so one-off allocations do not count towards latency
+        predictor.predict_proba(X[:1])
+        predictor.predict_proba(X)
+
+        start = time.perf_counter()
+        for i in range(single_row_iterations):
+            predictor.predict_proba(X[i % len(X):i % len(X) + 1])
+        single_row_us = (time.perf_counter() - start) / single_row_iterations * 1e6
+
+        start = time.perf_counter()
+        for _ in range(batch_iterations):
+            predictor.predict_proba(X)
+        batch_seconds = (time.perf_counter() - start) / batch_iterations
+
+        results.append({
+            'predictor': name,
+            'single_row_us': single_row_us,
+            'batch_ms': batch_seconds * 1e3,
+            'batch_rows_per_s': len(X) / batch_seconds,
+        })
+    return results
+
+
+def print_benchmark(results, batch_size):
+    print(f"{'Predictor':<28} {'Single row (us)':>16} {'Batch of ' + str(batch_size) + ' (ms)':>20} {'Rows/s':>12}")
+    print("-" * 80)
+    for row in results:
+        print(f"{row['predictor']:<28} {row['single_row_us']:>16.1f} {row['batch_ms']:>20.2f} {row['batch_rows_per_s']:>12,.0f}")
+
+
+def export_and_benchmark(model, X_sample, onnx_path, classes, feature_names):
+    """
+    Exports a freshly trained model to ONNX and prints its latency next to the native library.
+    Used at the end of the training scripts; returns the ONNX predictor.
+    """
+    X_sample = np.ascontiguousarray(X_sample, dtype=np.float32)
+    export_model_to_onnx(model, X_sample.shape[1], onnx_path)
+
+    native = NativePredictor(model, classes, feature_names)
+    compiled = OnnxPredictor(onnx_path, classes, feature_names)
+    max_diff = np.max(np.abs(native.predict_proba(X_sample) - compiled.predict_proba(X_sample)))
+    print(f"Max probability difference native vs ONNX: {max_diff:.2e}")
+
+    print_benchmark(benchmark_predictors({
+        f'{type(model).__name__} (native)': native,
+        f'{type(model).__name__} (onnx)': compiled,
+    }, X_sample), len(X_sample))
+    return compiled
+
+
+def main():
+    """Compiles the flow model to ONNX and benchmarks it against the native XGBoost booster."""
+    from inference_bundle import DEFAULT_BUNDLE_PATH, get_inference_bundle
+
+    bundle_path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_BUNDLE_PATH
+    batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+    bundle = get_inference_bundle(bundle_path)
+
+    onnx_path = export_model_to_onnx(bundle.booster, len(bundle.feature_names), os.path.join(bundle_path, 'model.onnx'))
+
+    rng = np.random.default_rng(42)
+    X = rng.random((batch_size, len(bundle.feature_names)), dtype=np.float32) * 1000
+
+    predictors = {
+        'xgboost (inplace_predict)': bundle,
+        'onnxruntime (1 thread)': load_predictor('onnx', bundle_path, onnx_path, intra_op_threads=1),
+    }
+    print_benchmark(benchmark_predictors(predictors, X), batch_size)
+
+
+if __name__ == "__main__":
+    main()
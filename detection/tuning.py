@@ -0,0 +1,440 @@
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+
+import joblib
+import numpy as np
+
+# --- Configuration ---
+DEFAULT_RESULTS_PATH = 'models/tuning_results.jsonl'
+DEFAULT_CACHE_DIR = 'data/cache/tuning/'
+EARLY_STOPPING_ROUNDS = 20
+
+# Parameters currently hard-coded in the training scripts; always evaluated as the first trial
+BASELINE_PARAMS = {
+    'random_forest': {  # anomaly_RF1.rf_params
+        'n_estimators': 200, 'max_depth': 20, 'min_samples_split': 5,
+        'min_samples_leaf': 2, 'class_weight': 'balanced',
+    },
+    'xgboost': {  # XGBoost.py core-feature model
+        'n_estimators': 100,
+    },
+    'lightgbm': {  # OptimizedLightGBM.train_optimized_model
+        'n_estimators': 1000, 'max_depth': 10, 'learning_rate': 0.05, 'num_leaves': 127,
+        'min_child_samples': 50, 'subsample': 0.9, 'colsample_bytree': 0.9,
+        'reg_alpha': 0.1, 'reg_lambda': 0.1,
+    },
+}
+
+# Lists are sampled uniformly; ('uniform', lo, hi) and ('log', lo, hi) are continuous ranges
+SEARCH_SPACES = {
+    'random_forest': {
+        'n_estimators': [100, 200, 400],
+        'max_depth': [10, 20, 30, None],
+        'min_samples_split': [2, 5, 10],
+        'min_samples_leaf': [1, 2, 4],
+        'max_features': ['sqrt', 0.3, 0.5],
+        'class_weight': ['balanced', None],
+    },
+    'xgboost': {
+        'n_estimators': [200, 400, 800],
+        'max_depth': [4, 6, 8, 10],
+        'learning_rate': ('log', 0.01, 0.3),
+        'subsample': ('uniform', 0.6, 1.0),
+        'colsample_bytree': ('uniform', 0.6, 1.0),
+        'min_child_weight': [1, 5, 10],
+    },
+    'lightgbm': {
+        'n_estimators': [500, 1000, 2000],
+        'max_depth': [-1, 8, 10, 16],
+        'learning_rate': ('log', 0.01, 0.2),
+        'num_leaves': [31, 63, 127, 255],
+        'min_child_samples': [20, 50, 100],
+        'subsample': ('uniform', 0.6, 1.0),
+        'subsample_freq': [1],
+        'colsample_bytree': ('uniform', 0.6, 1.0),
+        'reg_alpha': ('log', 1e-3, 1.0),
+        'reg_lambda': ('log', 1e-3, 1.0),
+    },
+}
+
+
+def sample_params(space, rng):
+    params = {}
+    for name, spec in space.items():
+        if isinstance(spec, tuple) and spec[0] == 'uniform':
+            params[name] = rng.uniform(spec[1], spec[2])
+        elif isinstance(spec, tuple) and spec[0] == 'log':
+            params[name] = math.exp(rng.uniform(math.log(spec[1]), math.log(spec[2])))
+        else:
+            params[name] = rng.choice(spec)
+    return params
+
+
+class AshaScheduler:
+    """
+    Asynchronous successive halving. A finished trial is promoted to the next rung as soon as
+    it ranks in the top 1/eta of the trials completed in its rung; otherwise a new trial starts
+    at the lowest rung. Trials that never make the cut are effectively stopped early.
+    """
+
+    def __init__(self, min_resource, max_resource, eta=3):
+        self.eta = eta
+        self.resources = []
+        resource = min_resource
+        while resource < max_resource:
+            self.resources.append(int(resource))
+            resource *= eta
+        self.resources.append(int(max_resource))
+        self.rung_scores = [{} for _ in self.resources]
+        self.promoted = [set() for _ in self.resources]
+
+    def report(self, trial_id, rung, score):
+        self.rung_scores[rung][trial_id] = score
+
+    def next_promotion(self):
+        """Returns (trial_id, rung) for the next promotable trial, or None."""
+        for rung in range(len(self.resources) - 2, -1, -1):
+            ranked = sorted(self.rung_scores[rung].items(), key=lambda item: item[1], reverse=True)
+            for trial_id, _ in ranked[:len(ranked) // self.eta]:
+                if trial_id not in self.promoted[rung]:
+                    self.promoted[rung].add(trial_id)
+                    return trial_id, rung + 1
+        return None
+
+
+class TuningResultsStore:
+    """Append-only JSON Lines store of every evaluated (trial, rung)."""
+
+    def __init__(self, path=DEFAULT_RESULTS_PATH):
+        self.path = path
+
+    def append(self, record):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(record, default=str) + '\n')
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, 'r') as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def best(self, model_name=None, study=None, dataset=None, feature_space=None, all_studies=False):
+        """
+        Best record at the highest resource evaluated, optionally filtered by model/study/
+        dataset/feature space. Without an explicit study only the latest matching study is
+        ranked, unless all_studies is set.
+        """
+        records = [
+            r for r in self.load()
+            if (model_name is None or r['model'] == model_name)
+            and (study is None or r['study'] == study)
+            and (dataset is None or r.get('dataset') == dataset)
+            and (feature_space is None or r.get('feature_space') == feature_space)
+        ]
+        if not records:
+            return None
+        if study is None and not all_studies:
+            latest = records[-1]['study']  # the store is append-only, so the last record is the newest
+            records = [r for r in records if r['study'] == latest]
+        return max(records, key=lambda r: (r['resource'], r['score']))
+
+
+def load_best_params(model_name, dataset=None, results_path=DEFAULT_RESULTS_PATH, feature_space=None):
+    """
+    Tuned parameters for a model family from its latest study, or None if it has not been
+    tuned yet. With feature_space, parameters tuned on other features are refused.
+    """
+    store = TuningResultsStore(results_path)
+    best = store.best(model_name, dataset=dataset, feature_space=feature_space)
+    if best is None and feature_space is not None:
+        other = store.best(model_name, dataset=dataset)
+        if other is not None:
+            print(f"Warning: {model_name} was tuned on feature space '{other.get('feature_space')}', "
+                  f"not '{feature_space}'; using the default parameters.")
+    return best['params'] if best else None
+
+
+# --- Worker side ---
+# Each worker process memory-maps the shared dataset once in its initializer.
+_worker_data = {}
+
+
+def _init_worker(data_file):
+    _worker_data.update(joblib.load(data_file, mmap_mode='r'))
+
+
+def build_model(model_name, params, n_jobs):
+    if model_name == 'random_forest':
+        from sklearn.ensemble import RandomForestClassifier
+        return RandomForestClassifier(**params, n_jobs=n_jobs, random_state=42)
+    if model_name == 'xgboost':
+        from xgboost import XGBClassifier
+        return XGBClassifier(**params, n_jobs=n_jobs, random_state=42, early_stopping_rounds=EARLY_STOPPING_ROUNDS)
+    if model_name == 'lightgbm':
+        import lightgbm as lgb
+        return lgb.LGBMClassifier(**params, n_jobs=n_jobs, random_state=42, verbose=-1)
+    raise ValueError(f"Unknown model family: {model_name}")
+
+
+def score_predictions(y_true, proba):
+    """ROC AUC for binary problems, macro F1 for multiclass."""
+    from sklearn.metrics import f1_score, roc_auc_score
+    if proba.shape[1] == 2:
+        return float(roc_auc_score(y_true, proba[:, 1]))
+    return float(f1_score(y_true, np.argmax(proba, axis=1), average='macro'))
+
+
+def evaluate_trial(model_name, params, n_rows, n_jobs):
+    """
+    Fits one configuration on the first n_rows of the (pre-shuffled) training data and scores it
+    on the validation split. Boosted models early-stop on a separate split, so the score is not
+    biased by the stopping decision. Returns (score, fit seconds, trees kept by early stopping or None).
+    """
+    X_train = _worker_data['X_train'][:n_rows]
+    y_train = _worker_data['y_train'][:n_rows]
+    X_stop = _worker_data['X_stop']
+    y_stop = _worker_data['y_stop']
+    X_val = _worker_data['X_val']
+    y_val = _worker_data['y_val']
+
+    start = time.perf_counter()
+    model = build_model(model_name, params, n_jobs)
+    n_trees = None
+    if model_name == 'xgboost':
+        model.fit(X_train, y_train, eval_set=[(X_stop, y_stop)], verbose=False)
+        n_trees = model.best_iteration + 1  # predict_proba uses the trees up to the best iteration
+    elif model_name == 'lightgbm':
+        import lightgbm as lgb
+        model.fit(X_train, y_train, eval_set=[(X_stop, y_stop)],
+                  callbacks=[lgb.early_stopping(EARLY_STOPPING_ROUNDS, verbose=False)])
+        n_trees = model.best_iteration_ or params.get('n_estimators')
+    else:
+        model.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - start
+
+    # Models trained on a subsample may not have seen every class
+    proba = np.zeros((len(y_val), int(_worker_data['n_classes'])))
+    proba[:, model.classes_.astype(int)] = model.predict_proba(X_val)
+    return score_predictions(y_val, proba), fit_seconds, n_trees
+
+
+# --- Search driver ---
+def prepare_shared_dataset(X, y, cache_dir=DEFAULT_CACHE_DIR, validation_size=0.2, early_stopping_size=0.1,
+                           random_state=42):
+    """
+    Shuffles and splits the dataset into training, early-stopping and validation rows, and dumps
+    it once so every worker can memory-map it.
+    """
+    from sklearn.model_selection import train_test_split
+
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    y = np.asarray(y).astype(np.int32)
+    X_train, X_val, y_train, y_val = train_test_split(
+        X, y, test_size=validation_size, random_state=random_state, stratify=y
+    )
+    X_train, X_stop, y_train, y_stop = train_test_split(
+        X_train, y_train, test_size=early_stopping_size / (1 - validation_size), random_state=random_state,
+        stratify=y_train
+    )
+    # Lower rungs train on a prefix of the rows; put one example of every class first so
+    # small budgets still see all labels (XGBoost rejects non-contiguous class sets)
+    first_of_class = [np.flatnonzero(y_train == label)[0] for label in np.unique(y_train)]
+    order = np.r_[first_of_class, np.setdiff1d(np.arange(len(y_train)), first_of_class)]
+    X_train, y_train = X_train[order], y_train[order]
+    os.makedirs(cache_dir, exist_ok=True)
+    data_file = os.path.join(cache_dir, 'tuning_dataset.joblib')
+    joblib.dump({
+        'X_train': X_train, 'y_train': y_train, 'X_stop': X_stop, 'y_stop': y_stop, 'X_val': X_val, 'y_val': y_val,
+        'n_classes': int(y.max()) + 1,
+    }, data_file)
+    return data_file, len(X_train)
+
+
+def run_search(X, y, model_names=('random_forest', 'xgboost', 'lightgbm'), n_trials=30,
+               n_workers=None, total_cores=None, eta=3, min_rows=5000, study=None, dataset=None,
+               feature_space=None, results_path=DEFAULT_RESULTS_PATH, cache_dir=DEFAULT_CACHE_DIR, seed=42):
+    """
+    Runs ASHA across the given model families on a shared dataset.
+
+    `total_cores` is split between `n_workers` concurrent trials and each model's own n_jobs,
+    so trials never oversubscribe the machine. Every evaluation is appended to the results store,
+    tagged with the dataset and the feature space X comes from.
+    Returns the best record per model family.
+    """
+    total_cores = total_cores or os.cpu_count() or 1
+    n_workers = n_workers or max(1, total_cores // 4)
+    n_jobs = max(1, total_cores // n_workers)
+    study = study or datetime.now().strftime('%Y%m%d-%H%M%S')
+    rng = random.Random(seed)
+
+    data_file, n_train_rows = prepare_shared_dataset(X, y, cache_dir)
+    scheduler = AshaScheduler(min(min_rows, n_train_rows), n_train_rows, eta)
+    store = TuningResultsStore(results_path)
+    print(f"Tuning {list(model_names)}: {n_trials} trials, {n_workers} workers x {n_jobs} threads, "
+          f"rungs (rows) = {scheduler.resources}")
+
+    trials = {}
+    pending_baselines = [name for name in model_names if name in BASELINE_PARAMS]
+
+    def next_job():
+        promotion = scheduler.next_promotion()
+        if promotion is not None:
+            return promotion
+        if len(trials) >= n_trials:
+            return None
+        trial_id = len(trials)
+        if pending_baselines:
+            model_name = pending_baselines.pop(0)
+            params = dict(BASELINE_PARAMS[model_name])
+        else:
+            model_name = model_names[trial_id % len(model_names)]
+            params = sample_params(SEARCH_SPACES[model_name], rng)
+        trials[trial_id] = (model_name, params)
+        return trial_id, 0
+
+    with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker, initargs=(data_file,)) as pool:
+        running = {}
+        while True:
+            while len(running) < n_workers:
+                job = next_job()
+                if job is None:
+                    break
+                trial_id, rung = job
+                model_name, params = trials[trial_id]
+                future = pool.submit(evaluate_trial, model_name, params, scheduler.resources[rung], n_jobs)
+                running[future] = (trial_id, rung)
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                trial_id, rung = running.pop(future)
+                model_name, params = trials[trial_id]
+                try:
+                    score, fit_seconds, n_trees = future.result()
+                except Exception as e:
+                    print(f"  -> Trial {trial_id} ({model_name}) failed: {e}")
+                    score, fit_seconds, n_trees = float('-inf'), 0.0, None
+                scheduler.report(trial_id, rung, score)
+                # The scored model is the early-stopped one: record its tree count, since the
+                # training scripts apply the parameters without early stopping
+                scored_params = params if n_trees is None else {**params, 'n_estimators': int(n_trees)}
+                store.append({
+                    'study': study,
+                    'dataset': dataset,
+                    'feature_space': feature_space,
+                    'timestamp': datetime.now().isoformat(),
+                    'trial_id': trial_id,
+                    'model': model_name,
+                    'rung': rung,
+                    'resource': scheduler.resources[rung],
+                    'params': scored_params,
+                    'best_iteration': n_trees,
+                    'score': score,
+                    'fit_seconds': round(fit_seconds, 3),
+                })
+                print(f"  -> Trial {trial_id:>3} {model_name:<14} rung {rung} "
+                      f"({scheduler.resources[rung]} rows): score={score:.4f} in {fit_seconds:.1f}s")
+
+    best = {name: store.best(name, study) for name in model_names}
+    print("\nBest configuration per model family:")
+    for name, record in best.items():
+        if record:
+            print(f"  {name}: score={record['score']:.4f} at {record['resource']} rows -> {record['params']}")
+    return best
+
+
+def load_unsw_training_data():
+    """UNSW-NB15 training set with label-encoded categorical columns, without the label-leaking attack_cat (as in anomaly_RF1.py)."""
+    import pandas as pd
+    from sklearn.preprocessing import LabelEncoder
+
+    df = pd.read_csv('data/UNSW_NB15_training-set.csv.zip')
+    y = df['label'].to_numpy()
+    X = df.drop(columns=['id', 'label', 'attack_cat'], errors='ignore')
+    for col in X.select_dtypes(include=['object']).columns:
+        X[col] = LabelEncoder().fit_transform(X[col])
+    return X.to_numpy(dtype=np.float32), y
+
+
+def pipeline_feature_space(pipeline):
+    """Feature space name of an UNSWFeaturePipeline's output."""
+    return f"pipeline-k{pipeline.k}"
+
+
+def load_unsw_pipeline_data(k=200, mi_sample_size=50000):
+    """UNSW-NB15 training set through the fitted feature pipeline, with lightBGM.py's columns and settings."""
+    import pandas as pd
+    sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+    from feature_pipeline import UNSWFeaturePipeline
+
+    df = pd.read_csv('data/UNSW_NB15_training-set.csv.zip')
+    label_col = df.columns[-1]
+    X = df[[col for col in df.columns if col not in ['id', label_col]]]
+    y = df[label_col].to_numpy()
+    return UNSWFeaturePipeline(k=k, mi_sample_size=mi_sample_size).fit_transform(X, y), y
+
+
+def load_cicids_training_data(core_only=False):
+    """Cleaned CICIDS dataset from the Parquet cache with encoded labels (as in XGBoost.py)."""
+    sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+    from dataset_loader import CICIDS_CORE_FEATURES, load_cicids_dataset
+
+    df = load_cicids_dataset()
+    y = df.pop('Label').cat.codes.to_numpy()
+    if core_only:
+        df = df[[col for col in CICIDS_CORE_FEATURES if col in df.columns]]
+    return df.to_numpy(dtype=np.float32), y
+
+
+# Feature spaces a search can run on, per dataset, and the training script that consumes each
+FEATURE_SPACES = {
+    'unsw': {
+        'label-encoded': load_unsw_training_data,  # anomaly_RF1.py
+        'pipeline-k200': load_unsw_pipeline_data,  # lightBGM.py
+    },
+    'cicids': {
+        'core': lambda: load_cicids_training_data(core_only=True),  # XGBoost.py core-feature model
+        'all': load_cicids_training_data,
+    },
+}
+DEFAULT_FEATURE_SPACES = {'unsw': 'label-encoded', 'cicids': 'core'}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ASHA hyperparameter search across the detection models")
+    parser.add_argument('--dataset', choices=['unsw', 'cicids'], default='unsw')
+    parser.add_argument('--features', default=None,
+                        help="feature space: unsw 'label-encoded' (default, anomaly_RF1.py) or 'pipeline-k200' "
+                             "(lightBGM.py); cicids 'core' (default, XGBoost.py) or 'all'")
+    parser.add_argument('--models', default='random_forest,xgboost,lightgbm')
+    parser.add_argument('--trials', type=int, default=30)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--cores', type=int, default=None)
+    parser.add_argument('--eta', type=int, default=3)
+    parser.add_argument('--min-rows', type=int, default=5000)
+    parser.add_argument('--results', default=DEFAULT_RESULTS_PATH)
+    args = parser.parse_args()
+
+    features = args.features or DEFAULT_FEATURE_SPACES[args.dataset]
+    if features not in FEATURE_SPACES[args.dataset]:
+        parser.error(f"unknown feature space '{features}' for {args.dataset}: {sorted(FEATURE_SPACES[args.dataset])}")
+    X, y = FEATURE_SPACES[args.dataset][features]()
+    run_search(
+        X, y, model_names=tuple(args.models.split(',')), n_trials=args.trials,
+        n_workers=args.workers, total_cores=args.cores, eta=args.eta,
+        min_rows=args.min_rows, study=f"{args.dataset}-{datetime.now():%Y%m%d-%H%M%S}", dataset=args.dataset,
+        feature_space=features, results_path=args.results,
+    )
+
+
+if __name__ == "__main__":
+    main()
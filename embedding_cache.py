@@ -0,0 +1,168 @@
+import json
+import os
+from contextlib import contextmanager
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # not POSIX: no cross-process lock, keep to one writer per cache
+    fcntl = None
+
+from ingestion.templating import template_key, template_message
+
+EMBEDDINGS_FILENAME = "embeddings.f16"
+KEYS_FILENAME = "keys.i64"
+META_FILENAME = "meta.json"
+LOCK_FILENAME = "write.lock"
+KEY_BYTES = 8
+
+
+class EmbeddingCache:
+    """
+    On-disk embedding cache keyed on templated log messages.
+
+    Embeddings live in a memory-mapped float16 matrix that grows by doubling; row i belongs to
+    the i-th key in an append-only int64 key file, from which the in-memory hash index is rebuilt
+    on open. Every distinct template is embedded once, ever.
+
+    Several processes may share a cache (orchestrators, the sequence scorer, the nightly refit):
+    appends take an exclusive lock on the directory's lock file and first pick up the keys other
+    writers appended, so rows are never handed out twice. Rows are written before their keys, so
+    a key that is visible always points at a complete embedding.
+    """
+
+    def __init__(self, cache_dir, dim, model_name="all-MiniLM-L6-v2", initial_capacity=65536):
+        self.cache_dir = cache_dir
+        self.dim = dim
+        self.model_name = model_name
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+        self.embeddings_path = os.path.join(cache_dir, EMBEDDINGS_FILENAME)
+        self.keys_path = os.path.join(cache_dir, KEYS_FILENAME)
+        self.lock_path = os.path.join(cache_dir, LOCK_FILENAME)
+        meta_path = os.path.join(cache_dir, META_FILENAME)
+        self.size = 0
+        self.index = {}
+        self.embeddings = None
+        self.capacity = 0
+
+        with self._locked():
+            if os.path.exists(meta_path):
+                with open(meta_path, "r") as f:
+                    meta = json.load(f)
+                if meta.get("dim") != dim or meta.get("model_name") != model_name:
+                    raise ValueError(
+                        f"Embedding cache '{cache_dir}' was built with {meta.get('model_name')} "
+                        f"(dim {meta.get('dim')}), not {model_name} (dim {dim})"
+                    )
+            else:
+                with open(meta_path, "w") as f:
+                    json.dump({"dim": dim, "model_name": model_name, "dtype": "float16"}, f)
+            existing_rows = os.path.getsize(self.embeddings_path) // (2 * dim) if os.path.exists(self.embeddings_path) else 0
+            self._open(max(initial_capacity, existing_rows))
+            self._refresh()
+
+    def __len__(self):
+        return self.size
+
+    def _open(self, capacity):
+        mode = "r+" if os.path.exists(self.embeddings_path) else "w+"
+        if mode == "r+" and os.path.getsize(self.embeddings_path) < capacity * self.dim * 2:
+            with open(self.embeddings_path, "r+b") as f:
+                f.truncate(capacity * self.dim * 2)
+        self.embeddings = np.memmap(self.embeddings_path, dtype=np.float16, mode=mode, shape=(capacity, self.dim))
+        self.capacity = capacity
+
+    def _ensure_capacity(self, rows):
+        if rows <= self.capacity:
+            return
+        self.embeddings.flush()
+        del self.embeddings
+        self._open(max(rows, self.capacity * 2))
+
+    @contextmanager
+    def _locked(self):
+        """Exclusive lock against the other processes writing to this cache."""
+        if fcntl is None:
+            yield
+            return
+        with open(self.lock_path, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _refresh(self):
+        """Indexes the keys appended since the last read (by this or another process)."""
+        if not os.path.exists(self.keys_path):
+            return
+        total = os.path.getsize(self.keys_path) // KEY_BYTES  # a torn last key is ignored
+        if total <= self.size:
+            return
+        with open(self.keys_path, "rb") as f:
+            f.seek(self.size * KEY_BYTES)
+            keys = np.fromfile(f, dtype=np.int64, count=total - self.size)
+        # Keys are appended after their embeddings are flushed, so the key file is the source of truth
+        self._ensure_capacity(total)
+        for offset, key in enumerate(keys.tolist()):
+            self.index.setdefault(key, self.size + offset)
+        self.size = total
+
+    def lookup(self, keys):
+        """Row numbers for each key, -1 where the key is not cached."""
+        return np.array([self.index.get(key, -1) for key in keys], dtype=np.int64)
+
+    def add(self, keys, embeddings):
+        """Append embeddings for new keys (keys already present are ignored)."""
+        embeddings = np.asarray(embeddings, dtype=np.float16)
+        with self._locked():
+            self._refresh()  # another writer may have added some of these keys meanwhile
+            new = {}
+            for row, key in enumerate(keys):
+                if key not in self.index:
+                    new.setdefault(key, row)
+            if not new:
+                return
+            start = self.size
+            self._ensure_capacity(start + len(new))
+            self.embeddings[start:start + len(new)] = embeddings[list(new.values())]
+            self.embeddings.flush()
+
+            new_keys = np.array(list(new), dtype=np.int64)
+            with open(self.keys_path, "r+b" if os.path.exists(self.keys_path) else "wb") as f:
+                f.seek(start * KEY_BYTES)  # overwrites a torn last key
+                new_keys.tofile(f)
+            for offset, key in enumerate(new_keys.tolist()):
+                self.index[key] = start + offset
+            self.size += len(new)
+
+    def embed(self, messages, encode_fn):
+        """
+        Returns float32 embeddings aligned with `messages`.
+        Messages are templated first; only templates not yet in the cache are passed to
+        encode_fn (once per distinct template), and the results are stored for later runs.
+        """
+        templates = [template_message(message) for message in messages]
+        keys = [template_key(template) for template in templates]
+        self._refresh()
+        rows = self.lookup(keys)
+
+        missing = {}
+        for position in np.flatnonzero(rows < 0):
+            missing.setdefault(keys[position], templates[position])
+        self.misses += len(missing)
+        self.hits += len(messages) - int((rows < 0).sum())
+
+        if missing:
+            new_embeddings = encode_fn(list(missing.values()))
+            self.add(list(missing.keys()), new_embeddings)
+            rows = self.lookup(keys)
+
+        return np.asarray(self.embeddings[rows], dtype=np.float32)
+
+    def stats(self):
+        return {"templates": self.size, "hits": self.hits, "misses": self.misses}
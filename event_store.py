@@ -0,0 +1,267 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from correlation import event_time
+from ingestion.templating import template_message
+
+SEGMENT_MAX_EVENTS = 100000
+MANIFEST_FILENAME = "manifest.json"
+# Inverted indexes: index name -> how to get the term from a stored event
+INDEXED_FIELDS = {
+    "source.ip": lambda log: log.get("source.ip"),
+    "user.name": lambda log: log.get("user.name"),
+    "url.template": lambda log: template_message(log["url.original"]) if log.get("url.original") else None,
+    "rule.name": lambda log: log.get("rule.name"),
+}
+
+
+def _segment_path(directory, segment_id, suffix):
+    return os.path.join(directory, f"segment_{segment_id:06d}{suffix}")
+
+
+class Segment:
+    """
+    One append-only file of JSON-lines events with its time index (event timestamps and byte
+    offsets) and inverted indexes (term -> sorted local event ids). A sealed segment stores its
+    indexes as CSR arrays in an .npz file and its terms in a .terms.json file.
+    """
+
+    def __init__(self, directory, segment_id):
+        self.directory = directory
+        self.segment_id = segment_id
+        self.path = _segment_path(directory, segment_id, ".jsonl")
+        self.timestamps = []
+        self.offsets = []
+        self.postings = {field: {} for field in INDEXED_FIELDS}  # field -> term -> list or array of ids
+        self.sealed = False
+
+    def __len__(self):
+        return len(self.offsets)
+
+    @property
+    def min_ts(self):
+        return float(np.min(self.timestamps)) if len(self) else None
+
+    @property
+    def max_ts(self):
+        return float(np.max(self.timestamps)) if len(self) else None
+
+    def index_event(self, log, offset):
+        event_id = len(self.offsets)
+        self.offsets.append(offset)
+        self.timestamps.append(event_time(log))
+        for field, term_of in INDEXED_FIELDS.items():
+            term = term_of(log)
+            if term:
+                self.postings[field].setdefault(str(term), []).append(event_id)
+
+    def seal(self):
+        """Writes the indexes next to the segment file; the segment is read-only afterwards."""
+        arrays = {"timestamps": np.asarray(self.timestamps, dtype=np.float64),
+                  "offsets": np.asarray(self.offsets, dtype=np.int64)}
+        terms = {}
+        for field, postings in self.postings.items():
+            terms[field] = list(postings)
+            lists = [np.asarray(ids, dtype=np.int32) for ids in postings.values()]
+            arrays[f"{field}.postings"] = np.concatenate(lists) if lists else np.empty(0, np.int32)
+            arrays[f"{field}.bounds"] = np.cumsum([0] + [len(ids) for ids in lists]).astype(np.int64)
+        np.savez(_segment_path(self.directory, self.segment_id, ".index.npz"), **arrays)
+        with open(_segment_path(self.directory, self.segment_id, ".terms.json"), "w") as f:
+            json.dump(terms, f)
+        self._load_sealed(arrays, terms)
+
+    def _load_sealed(self, arrays, terms):
+        self.timestamps = arrays["timestamps"]
+        self.offsets = arrays["offsets"]
+        self.postings = {}
+        for field in INDEXED_FIELDS:
+            postings, bounds = arrays[f"{field}.postings"], arrays[f"{field}.bounds"]
+            self.postings[field] = {term: postings[bounds[i]:bounds[i + 1]]
+                                    for i, term in enumerate(terms.get(field, []))}
+        self.sealed = True
+
+    @classmethod
+    def open(cls, directory, segment_id, sealed=True):
+        """
+        Loads a segment. sealed says whether the manifest lists it: an unlisted segment is
+        re-indexed from its events even if index files exist, since those were left by a roll
+        that crashed before the manifest was saved.
+        """
+        segment = cls(directory, segment_id)
+        index_path = _segment_path(directory, segment_id, ".index.npz")
+        if sealed and os.path.exists(index_path):
+            with np.load(index_path) as data:
+                arrays = {name: data[name] for name in data.files}
+            with open(_segment_path(directory, segment_id, ".terms.json"), "r") as f:
+                segment._load_sealed(arrays, json.load(f))
+        elif os.path.exists(segment.path):
+            # Active segment of a previous run: rebuild its indexes, dropping a torn last line
+            with open(segment.path, "rb+") as f:
+                offset = 0
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        f.truncate(offset)
+                        break
+                    segment.index_event(json.loads(line), offset)
+                    offset += len(line)
+        return segment
+
+    def candidates(self, terms, start=None, end=None):
+        """Sorted local ids matching every (field, term) pair and the [start, end) time range."""
+        ids = None
+        for field, term in terms.items():
+            matched = self.postings[field].get(str(term))
+            if matched is None:
+                return np.empty(0, np.int64)
+            matched = np.asarray(matched)
+            ids = matched if ids is None else np.intersect1d(ids, matched, assume_unique=True)
+            if not len(ids):
+                return ids
+        if start is None and end is None:
+            return np.arange(len(self)) if ids is None else ids
+        timestamps = np.asarray(self.timestamps)
+        ids = np.arange(len(self)) if ids is None else ids
+        keep = np.ones(len(ids), dtype=bool)
+        if start is not None:
+            keep &= timestamps[ids] >= start
+        if end is not None:
+            keep &= timestamps[ids] < end
+        return ids[keep]
+
+    def read(self, ids):
+        events = []
+        with open(self.path, "rb") as f:
+            for event_id in ids:
+                f.seek(int(self.offsets[event_id]))
+                events.append(json.loads(f.readline()))
+        return events
+
+
+class EventStore:
+    """
+    Embedded store of normalized ECS logs for drill-down without Elasticsearch.
+
+    Events are appended to JSON-lines segment files of up to segment_max_events. Each segment
+    keeps a time index and inverted indexes on source.ip, user.name, the templated URL and the
+    Tier 1 rule name; a query intersects the postings of the requested terms, segments outside
+    the time range are skipped using the manifest's min/max timestamps. Single writer.
+    """
+
+    def __init__(self, directory, segment_max_events=SEGMENT_MAX_EVENTS):
+        self.directory = directory
+        self.segment_max_events = segment_max_events
+        os.makedirs(directory, exist_ok=True)
+        self.manifest_path = os.path.join(directory, MANIFEST_FILENAME)
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, "r") as f:
+                self.manifest = json.load(f)
+        else:
+            self.manifest = {"segments": []}  # sealed segments: id, count, min_ts, max_ts
+        self._sealed = {}  # segment id -> Segment, loaded on first query
+        next_id = max([s["id"] for s in self.manifest["segments"]], default=0) + 1
+        self.active = Segment.open(directory, next_id, sealed=False)
+        self._writer = open(self.active.path, "ab")
+        if len(self.active) >= self.segment_max_events:
+            self._roll()  # the previous run crashed while rolling it
+
+    def __len__(self):
+        return sum(s["count"] for s in self.manifest["segments"]) + len(self.active)
+
+    def append(self, log: dict, rule_name=None):
+        if rule_name and "rule.name" not in log:
+            log = {**log, "rule.name": rule_name}
+        line = (json.dumps(log) + "\n").encode("utf-8")
+        self.active.index_event(log, self._writer.tell())
+        self._writer.write(line)
+        if len(self.active) >= self.segment_max_events:
+            self._roll()
+
+    def _roll(self):
+        self._writer.close()
+        segment = self.active
+        segment.seal()
+        self.manifest["segments"].append({"id": segment.segment_id, "count": len(segment),
+                                          "min_ts": segment.min_ts, "max_ts": segment.max_ts})
+        self._save_manifest()
+        self._sealed[segment.segment_id] = segment
+        self.active = Segment(self.directory, segment.segment_id + 1)
+        self._writer = open(self.active.path, "ab")
+
+    def _save_manifest(self):
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.manifest, f)
+        os.replace(tmp_path, self.manifest_path)
+
+    def flush(self):
+        self._writer.flush()
+
+    def close(self):
+        """Flushes the active segment; it stays unsealed and is re-indexed on the next open."""
+        self._writer.close()
+
+    def _segments(self, start, end):
+        for info in self.manifest["segments"]:
+            if (start is not None and info["max_ts"] < start) or (end is not None and info["min_ts"] >= end):
+                continue
+            if info["id"] not in self._sealed:
+                self._sealed[info["id"]] = Segment.open(self.directory, info["id"])
+            yield self._sealed[info["id"]]
+        if len(self.active):
+            yield self.active
+
+    def query(self, source_ip=None, user=None, url=None, rule=None, start=None, end=None, limit=None):
+        """
+        Events matching all given criteria, oldest segment first. url is templated like the
+        index (so /item/42 also finds /item/7); start/end are epoch seconds, end exclusive.
+        """
+        terms = {field: term for field, term in [("source.ip", source_ip), ("user.name", user),
+                                                 ("url.template", template_message(url) if url else None),
+                                                 ("rule.name", rule)] if term}
+        self.flush()
+        events = []
+        for segment in self._segments(start, end):
+            ids = segment.candidates(terms, start, end)
+            if limit is not None:
+                ids = ids[:limit - len(events)]
+            events.extend(segment.read(ids))
+            if limit is not None and len(events) >= limit:
+                break
+        return events
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load or query the local event store")
+    parser.add_argument("--dir", default="event_store")
+    parser.add_argument("--ingest", nargs="*", default=[], help="normalized ECS JSON/JSONL files to append")
+    parser.add_argument("--ip")
+    parser.add_argument("--user")
+    parser.add_argument("--url")
+    parser.add_argument("--rule")
+    parser.add_argument("--last", type=float, help="only events from the last N hours")
+    parser.add_argument("--limit", type=int, default=100)
+    args = parser.parse_args()
+
+    store = EventStore(args.dir)
+    if args.ingest:
+        from orchestrator import load_logs_from_files
+
+        for log in load_logs_from_files(".", args.ingest):
+            store.append(log)
+        print(f"Event store '{args.dir}' holds {len(store)} events")
+    if args.ip or args.user or args.url or args.rule or args.last:
+        started = time.perf_counter()
+        start = time.time() - args.last * 3600 if args.last else None
+        events = store.query(args.ip, args.user, args.url, args.rule, start=start, limit=args.limit)
+        for event in events:
+            print(json.dumps(event))
+        print(f"{len(events)} events in {(time.perf_counter() - started) * 1000:.1f} ms")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
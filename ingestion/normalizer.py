@@ -118,15 +118,22 @@ class LogNormalizer:
                 user_match = re.search(r'user=(\S+)', message)
                 if user_match:
                     ecs_log['user.name'] = user_match.group(1)
+                elif parsed_log.get('user'):
+                    ecs_log['user.name'] = parsed_log['user']
                     
                 rhost_match = re.search(r'rhost=(\S+)', message)
                 if rhost_match:
                     ecs_log['source.ip'] = rhost_match.group(1)
+                elif parsed_log.get('source_ip'):
+                    ecs_log['source.ip'] = parsed_log['source_ip']
                     
             elif 'accepted password' in message:
                 ecs_log['event.category'] = 'authentication'
                 ecs_log['event.type'] = 'authentication_success'
                 ecs_log['event.outcome'] = 'success'
+                if parsed_log.get('user'):
+                    ecs_log['user.name'] = parsed_log['user']
+                    ecs_log['source.ip'] = parsed_log.get('source_ip')
                 
         elif log_type == 'nginx' and parsed_log:
             ecs_log['source.ip'] = parsed_log.get('ip_address')
@@ -143,8 +150,9 @@ class LogNormalizer:
             ecs_log['source.ip'] = parsed_log.get('source_ip')
             ecs_log['user.name'] = parsed_log.get('user')
             ecs_log['event.category'] = 'authentication'
-            ecs_log['event.action'] = 'authentication_failure'
             ecs_log['event.outcome'] = parsed_log.get('event_outcome')
+            ecs_log['event.type'] = f"authentication_{ecs_log['event.outcome'] or 'failure'}"
+            ecs_log['event.action'] = ecs_log['event.type']
         
         # Add raw log for reference
         ecs_log['raw'] = parsed_log.get('raw', '')
@@ -42,6 +42,10 @@ class LogParser:
             # Check for Linux syslog format
             elif self._is_linux_syslog(line):
                 parsed_log = self._parse_linux_syslog(line)
+                # sshd password lines also carry the user and source IP of the attempt
+                auth = self.parse_auth_log(line)
+                if auth.get('user'):
+                    parsed_log.update(user=auth['user'], source_ip=auth['source_ip'], event_outcome=auth['event_outcome'])
             # Fallback to generic syslog parsing
             else:
                 parsed_log = self._parse_syslog(line)
@@ -0,0 +1,32 @@
+import hashlib
+import re
+
+# Variable parts of log messages, masked in this order (UUIDs and IPs before generic hex/numbers)
+TEMPLATE_MASKS = [
+    ("<UUID>", re.compile(r'\b[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\b')),
+    ("<IP>", re.compile(r'\b(?:\d{1,3}\.){3}\d{1,3}\b')),
+    # IPv6: full 8-group form or any compressed form containing '::' (so hh:mm:ss times are left alone)
+    ("<IP>", re.compile(r'\b(?:[0-9a-fA-F]{1,4}:){7}[0-9a-fA-F]{1,4}\b|(?<![\w:])(?=[0-9a-fA-F:]*::)[0-9a-fA-F:]{2,39}(?![\w:])')),
+    ("<HEX>", re.compile(r'\b0[xX][0-9a-fA-F]+\b|\b(?=[0-9a-fA-F]*\d)(?=[0-9a-fA-F]*[a-fA-F])[0-9a-fA-F]{8,}\b')),
+    ("<NUM>", re.compile(r'\d+(?:\.\d+)*')),
+]
+WHITESPACE = re.compile(r'\s+')
+
+
+def template_message(message: str) -> str:
+    """
+    Reduce a log message to its template by masking variable tokens.
+    e.g. 'Failed password for root from 1.2.3.4 port 5123' -> 'Failed password for root from <IP> port <NUM>'
+    """
+    if not message:
+        return ""
+    template = str(message)
+    for placeholder, pattern in TEMPLATE_MASKS:
+        template = pattern.sub(placeholder, template)
+    return WHITESPACE.sub(' ', template).strip()
+
+
+def template_key(template: str) -> int:
+    """Stable signed 64-bit hash of a template, used as the embedding cache key."""
+    digest = hashlib.blake2b(template.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little', signed=True)
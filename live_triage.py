@@ -0,0 +1,131 @@
+import json
+import os
+
+PIT_KEEP_ALIVE = "1m"
+# Sort of a live poll: event time, then the point-in-time's own tiebreaker for equal timestamps
+LIVE_SORT = [{"@timestamp": {"order": "asc"}}, {"_shard_doc": "asc"}]
+
+
+class SearchCursor:
+    """
+    Position of the live loop in the log index: the last triaged @timestamp (epoch millis, as
+    returned in sort values) and the ids of the documents triaged at exactly that timestamp.
+    Point-in-time tiebreakers are only valid within one PIT, so the ids are what lets the next
+    poll resume among documents that share the last timestamp. Saved as JSON.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.timestamp = None
+        self.ids = set()
+        if path and os.path.exists(path):
+            with open(path, "r") as f:
+                state = json.load(f)
+            self.timestamp = state["timestamp"]
+            self.ids = set(state["ids"])
+
+    def describe(self):
+        return "start of index" if self.timestamp is None else f"@timestamp {self.timestamp} ms"
+
+    def seen(self, hit):
+        return hit["sort"][0] == self.timestamp and hit["_id"] in self.ids
+
+    def advance(self, hits):
+        """Moves past hits (in sort order) once they have been handled."""
+        for hit in hits:
+            timestamp = hit["sort"][0]
+            if timestamp != self.timestamp:
+                self.timestamp = timestamp
+                self.ids = set()
+            self.ids.add(hit["_id"])
+
+    def save(self):
+        if not self.path:
+            return
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"timestamp": self.timestamp, "ids": sorted(self.ids)}, f)
+        os.replace(tmp_path, self.path)
+
+
+class LiveLogSource:
+    """
+    New documents of an index (or alias) in @timestamp order. Each poll() opens a point in
+    time, pages through it with search_after and closes it, so one poll sees a consistent
+    snapshot and the next poll picks up whatever was indexed since. Documents indexed with an
+    @timestamp older than the cursor are not seen.
+    """
+
+    def __init__(self, es_client, index, cursor, batch_size=1000, keep_alive=PIT_KEEP_ALIVE):
+        self.es_client = es_client
+        self.index = index
+        self.cursor = cursor
+        self.batch_size = batch_size
+        self.keep_alive = keep_alive
+
+    def _query(self):
+        # Documents without @timestamp would sort last and push the cursor past every future log
+        filters = [{"exists": {"field": "@timestamp"}}]
+        if self.cursor.timestamp is not None:
+            filters.append({"range": {"@timestamp": {"gte": self.cursor.timestamp, "format": "epoch_millis"}}})
+        return {"bool": {"filter": filters}}
+
+    def poll(self):
+        """Yields batches (lists of hits with _index, _id, _source and sort) of documents not yet triaged."""
+        pit_id = self.es_client.open_point_in_time(index=self.index, keep_alive=self.keep_alive)["id"]
+        try:
+            query = self._query()
+            search_after = None
+            while True:
+                response = self.es_client.search(pit={"id": pit_id, "keep_alive": self.keep_alive},
+                                                 query=query, sort=LIVE_SORT, size=self.batch_size,
+                                                 search_after=search_after, track_total_hits=False)
+                pit_id = response.get("pit_id", pit_id)
+                hits = response["hits"]["hits"]
+                if not hits:
+                    break
+                search_after = hits[-1]["sort"]
+                new_hits = [hit for hit in hits if not self.cursor.seen(hit)]
+                if new_hits:
+                    yield new_hits
+                if len(hits) < self.batch_size:
+                    break
+        finally:
+            self.es_client.close_point_in_time(id=pit_id)
+
+
+def verdict(result, aggregate):
+    """Fields written back onto a triaged document."""
+    fields = {
+        "triage.classification": result["classification"],
+        "triage.rule_name": result["rule_name"],
+        "triage.confidence_score": round(float(aggregate["confidence_score"]), 4),
+    }
+    analysis = aggregate.get("llm_analysis")
+    if analysis is not None:
+        fields["triage.severity"] = analysis.get("severity")
+    if aggregate.get("tier2_anomaly") is not None:
+        fields["triage.tier2_anomaly"] = bool(aggregate["tier2_anomaly"])
+    return fields
+
+
+def write_verdicts(es_client, hits, results):
+    """
+    Partial-updates each hit's document (in its concrete index, not the alias) with the verdict
+    of its (result, aggregate) pair in one bulk request. Returns (updated, item errors).
+    """
+    if not hits:
+        return 0, []
+    operations = []
+    for hit, (result, aggregate) in zip(hits, results):
+        operations.append({"update": {"_index": hit["_index"], "_id": hit["_id"], "retry_on_conflict": 3}})
+        operations.append({"doc": verdict(result, aggregate)})
+    response = es_client.bulk(operations=operations)
+    updated, errors = 0, []
+    for item in response["items"]:
+        outcome = next(iter(item.values()))
+        if 200 <= outcome.get("status", 500) < 300:
+            updated += 1
+        else:
+            errors.append(outcome.get("error", outcome))
+    return updated, errors
@@ -0,0 +1,211 @@
+import argparse
+import os
+import time
+
+import numpy as np
+import onnxruntime as ort
+from tokenizers import Tokenizer
+
+HF_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+DEFAULT_MODEL_DIR = os.getenv("TIER2_ONNX_MODEL_DIR", "minilm_onnx")
+FP32_FILENAME = "model.onnx"
+INT8_FILENAME = "model_int8.onnx"
+TOKENIZER_FILENAME = "tokenizer.json"
+MAX_SEQ_LENGTH = 256  # all-MiniLM-L6-v2's max_seq_length
+MODEL_INPUTS = ["input_ids", "attention_mask", "token_type_ids"]
+# Quantized embeddings must stay this close (cosine) to the fp32 model's
+DEFAULT_MIN_COSINE = 0.99
+SAMPLE_LOG_FILES = ["data-logs/linux-2k.log", "data-logs/access-10k.log", "data-logs/test_attacks.log"]
+
+
+def export_minilm_onnx(output_dir=DEFAULT_MODEL_DIR, model_name=HF_MODEL_NAME, opset=14):
+    """
+    Exports the MiniLM transformer (token embeddings only; pooling is done in numpy) to ONNX
+    with dynamic batch/sequence axes, and saves its fast tokenizer alongside.
+    Needs torch and transformers, so run it once on a build machine, not on the CPU nodes.
+    """
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    os.makedirs(output_dir, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    tokenizer.save_pretrained(output_dir)
+    model = AutoModel.from_pretrained(model_name).eval()
+
+    dummy = tokenizer(["Failed password for root from <IP> port <NUM>"], return_tensors="pt")
+    fp32_path = os.path.join(output_dir, FP32_FILENAME)
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(dummy[name] for name in MODEL_INPUTS),
+            fp32_path,
+            input_names=MODEL_INPUTS,
+            output_names=["last_hidden_state"],
+            dynamic_axes={name: {0: "batch", 1: "sequence"} for name in MODEL_INPUTS + ["last_hidden_state"]},
+            opset_version=opset,
+        )
+    print(f"Exported {model_name} to '{fp32_path}'")
+    return fp32_path
+
+
+def quantize_onnx_model(fp32_path, int8_path):
+    """Dynamic int8 quantization: weights stored as int8, activations quantized on the fly."""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+    print(f"Quantized model saved to '{int8_path}' "
+          f"({os.path.getsize(fp32_path) / 1e6:.1f} MB -> {os.path.getsize(int8_path) / 1e6:.1f} MB)")
+    return int8_path
+
+
+class OnnxSentenceEmbedder:
+    """
+    Drop-in replacement for SentenceTransformer('all-MiniLM-L6-v2').encode on CPU:
+    ONNX Runtime + the Rust tokenizer, mean pooling over the attention mask and L2 normalization.
+    Does not import torch.
+    """
+
+    def __init__(self, model_dir=DEFAULT_MODEL_DIR, quantized=True, intra_op_threads=1,
+                 max_seq_length=MAX_SEQ_LENGTH, pad_token="[PAD]"):
+        self.model_path = os.path.join(model_dir, INT8_FILENAME if quantized else FP32_FILENAME)
+        if not os.path.exists(self.model_path):
+            raise FileNotFoundError(
+                f"ONNX embedder '{self.model_path}' not found; run 'python onnx_embedder.py --output-dir {model_dir}'"
+            )
+        self.quantized = quantized
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, TOKENIZER_FILENAME))
+        self.tokenizer.enable_truncation(max_length=max_seq_length)
+        pad_id = self.tokenizer.token_to_id(pad_token)
+        self.tokenizer.enable_padding(pad_id=pad_id if pad_id is not None else 0, pad_token=pad_token)
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = intra_op_threads
+        options.inter_op_num_threads = 1
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(self.model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = [inp.name for inp in self.session.get_inputs()]
+        self._dim = None
+
+    def get_sentence_embedding_dimension(self):
+        if self._dim is None:
+            self._dim = self.encode(["dimension probe"]).shape[1]
+        return self._dim
+
+    def _encode_batch(self, texts):
+        encodings = self.tokenizer.encode_batch(texts)
+        inputs = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+        }
+        token_embeddings = self.session.run(None, {name: inputs[name] for name in self.input_names})[0]
+
+        mask = inputs["attention_mask"][:, :, None].astype(np.float32)
+        pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        return pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+
+    def encode(self, sentences, batch_size=64, show_progress_bar=False, convert_to_numpy=True):
+        """
+        Same call signature as SentenceTransformer.encode (progress bar ignored).
+        Sentences are length-sorted before batching so each batch pads to a similar length.
+        """
+        if isinstance(sentences, str):
+            sentences = [sentences]
+        sentences = [str(s) for s in sentences]
+        if not sentences:
+            return np.empty((0, self._dim or 0), dtype=np.float32)
+
+        order = np.argsort([-len(s) for s in sentences], kind="stable")
+        embeddings = [None] * len(sentences)
+        for start in range(0, len(sentences), batch_size):
+            batch_idx = order[start:start + batch_size]
+            batch = self._encode_batch([sentences[i] for i in batch_idx])
+            for row, idx in enumerate(batch_idx):
+                embeddings[idx] = batch[row]
+        result = np.vstack(embeddings).astype(np.float32)
+        self._dim = result.shape[1]
+        return result
+
+
+def validate_embedder(candidate, reference, sentences, min_cosine=DEFAULT_MIN_COSINE, batch_size=64):
+    """
+    Cosine similarity between candidate and reference embeddings of the same sentences.
+    Raises ValueError if any sentence falls below min_cosine.
+    """
+    a = np.asarray(candidate.encode(sentences, batch_size=batch_size), dtype=np.float32)
+    b = np.asarray(reference.encode(sentences, batch_size=batch_size), dtype=np.float32)
+    cosine = (a * b).sum(axis=1) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1) + 1e-12)
+    stats = {"sentences": len(sentences), "min_cosine": float(cosine.min()), "mean_cosine": float(cosine.mean())}
+    if stats["min_cosine"] < min_cosine:
+        worst = sentences[int(cosine.argmin())]
+        raise ValueError(
+            f"Embedder deviates from reference: min cosine {stats['min_cosine']:.4f} < {min_cosine} (on '{worst}')"
+        )
+    return stats
+
+
+def measure_load(factory):
+    """Returns (object, load seconds, resident memory added in MB) for factory()."""
+    import psutil
+
+    process = psutil.Process()
+    rss_before = process.memory_info().rss
+    start = time.perf_counter()
+    obj = factory()
+    seconds = time.perf_counter() - start
+    return obj, seconds, (process.memory_info().rss - rss_before) / 1e6
+
+
+def load_sample_messages(paths=SAMPLE_LOG_FILES, limit=2000):
+    messages = []
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        with open(path, "r", errors="ignore") as f:
+            messages.extend(line.strip() for line in f if line.strip())
+    # Spread the sample across files rather than taking only the first one
+    step = max(1, len(messages) // limit)
+    return messages[::step][:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export, quantize and validate the ONNX Tier 2 embedder")
+    parser.add_argument("--output-dir", default=DEFAULT_MODEL_DIR)
+    parser.add_argument("--model-name", default=HF_MODEL_NAME)
+    parser.add_argument("--threads", type=int, default=1, help="ONNX Runtime intra-op threads")
+    parser.add_argument("--min-cosine", type=float, default=DEFAULT_MIN_COSINE)
+    parser.add_argument("--skip-export", action="store_true", help="Reuse an existing fp32 export")
+    args = parser.parse_args()
+
+    fp32_path = os.path.join(args.output_dir, FP32_FILENAME)
+    if not (args.skip_export and os.path.exists(fp32_path)):
+        export_minilm_onnx(args.output_dir, args.model_name)
+    quantize_onnx_model(fp32_path, os.path.join(args.output_dir, INT8_FILENAME))
+
+    sentences = load_sample_messages()
+    if not sentences:
+        raise SystemExit("No sample log messages found for validation")
+
+    # ONNX first, so the memory numbers are not inflated by torch already being imported
+    int8, int8_seconds, int8_mb = measure_load(
+        lambda: OnnxSentenceEmbedder(args.output_dir, quantized=True, intra_op_threads=args.threads)
+    )
+    from sentence_transformers import SentenceTransformer
+    fp32, fp32_seconds, fp32_mb = measure_load(lambda: SentenceTransformer(args.model_name, device="cpu"))
+
+    print("\n--- ONNX int8 vs PyTorch fp32 ---")
+    print(f"Load time: {int8_seconds:.2f}s vs {fp32_seconds:.2f}s")
+    print(f"Resident memory added: {int8_mb:.0f} MB vs {fp32_mb:.0f} MB")
+    for name, model in [("onnx-int8", int8), ("torch-fp32", fp32)]:
+        start = time.perf_counter()
+        model.encode(sentences, batch_size=64)
+        print(f"{name}: {len(sentences) / (time.perf_counter() - start):.0f} messages/s")
+
+    stats = validate_embedder(int8, fp32, sentences, min_cosine=args.min_cosine)
+    print(f"Cosine similarity over {stats['sentences']} log lines: "
+          f"min {stats['min_cosine']:.4f}, mean {stats['mean_cosine']:.4f} (tolerance {args.min_cosine})")
+
+
+if __name__ == "__main__":
+    main()
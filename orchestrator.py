@@ -1,31 +1,23 @@
-from elasticsearch import Elasticsearch
-from elasticsearch.helpers import scan
-
-
-# # --- Configuration ---
-# ELASTICSEARCH_HOST = "http://localhost:9200"
-# INDEX_NAME = "unified-logs"
-# BATCH_SIZE = 1000
-# LOOP_DELAY_SECONDS = 1
-
-# # --- Initialize connections and models ---
-# try:
-#     es_client = Elasticsearch([ELASTICSEARCH_HOST], request_timeout=30, api_key=None, basic_auth=None)
-#     anomaly_detector = BertAnomalyDetector(model_path="hdbscan_model.joblib")  # Use trained model
-#     print("Orchestrator initialized successfully.")
-# except Exception as e:
-#     print(f"Error during initialization: {e}")
-#     exit()
-
 # --- Tier Processing Functions ---
 
 import os
 import json
 import re
+import time
 from datetime import datetime
 
 # --- Import your custom modules ---
+# Heavy Tier 2/3 dependencies (torch, hdbscan, groq) load lazily through the component registry
+from component_registry import registry
 from tier1_rules import THREAT_RULES, BENIGN_RULES
+from correlation import CorrelationEngine
+from brute_force import BruteForceDetector
+from alert_aggregation import AlertAggregator
+from report_builder import ReportBuilder, LLM_REPORT_SEVERITIES
+from rollup_store import RollupStore
+from event_store import EventStore
+from sketches import TrafficSketch
+from ingestion.templating import template_message
 from tier3_llm import analyze_log_with_llm, should_escalate_to_llm, calculate_confidence_score
 
 # --- Configuration ---
@@ -36,6 +28,47 @@ FILES_TO_PROCESS = [
     "output_access-10k.log_ecs.json",
 ]
 REPORT_FILENAME = "security_intelligence_report.md"
+REPORT_JSON_FILENAME = "security_intelligence_report.json"
+# Per-minute triage rollups kept across runs for trend reports (rollup_store.py); empty = disabled
+ROLLUP_DB_PATH = os.getenv("ROLLUP_DB_PATH", "triage_rollups.db")
+# Local indexed copy of every triaged log for drill-down without Elasticsearch (event_store.py); empty = disabled
+EVENT_STORE_DIR = os.getenv("EVENT_STORE_DIR", "")
+# Results sharing (classification, rule, source IP, templated URL) within this window are reported and escalated once
+AGGREGATION_WINDOW_SECONDS = int(os.getenv("AGGREGATION_WINDOW_SECONDS", "3600"))
+# Distinct message templates of one unclassified aggregate that Tier 2/3 judge (the first log of each)
+AGGREGATE_MAX_JUDGED_TEMPLATES = int(os.getenv("AGGREGATE_MAX_JUDGED_TEMPLATES", "8"))
+SEVERITY_RANK = {"High": 3, "Medium": 2, "Low": 1}
+# Tier 2 (embedding + HDBSCAN novelty detection) runs between the rules and the LLM when a trained model exists
+TIER2_MODEL_PATH = os.getenv("TIER2_MODEL_PATH", "hdbscan_model.joblib")
+TIER2_MODEL_DIR = os.getenv("TIER2_MODEL_DIR", "models/tier2")  # versioned models from tier2_refit.py take precedence
+# "hdbscan" (cluster membership) or "knn" (distance to normal exemplars, built with tier2_knn.py)
+TIER2_MODE = os.getenv("TIER2_MODE", "hdbscan")
+TIER2_KNN_INDEX_DIR = os.getenv("TIER2_KNN_INDEX_DIR", "models/tier2_knn")
+TIER2_BATCH_SIZE = int(os.getenv("TIER2_BATCH_SIZE", "256"))
+TIER2_MAX_WAIT_SECONDS = float(os.getenv("TIER2_MAX_WAIT_SECONDS", "0.5"))
+TIER2_EMBEDDING_BACKEND = os.getenv("TIER2_EMBEDDING_BACKEND", "torch")  # "torch" or "onnx" (int8, CPU-only)
+TIER2_INTRA_OP_THREADS = int(os.getenv("TIER2_INTRA_OP_THREADS", "1"))
+TIER2_EMBEDDING_CACHE_DIR = os.getenv(
+    "TIER2_EMBEDDING_CACHE_DIR", "embedding_cache_onnx" if TIER2_EMBEDDING_BACKEND == "onnx" else "embedding_cache"
+)
+# Sliding-window sequence model (training2.ipynb) scoring the last events of each source IP. Opt-in
+# (e.g. SEQ_MODEL_PATH=lstm_seq_model.pt): it embeds every log with a source IP, loading the
+# sentence-transformer even for Tier-1-only runs
+SEQ_MODEL_PATH = os.getenv("SEQ_MODEL_PATH", "")
+SEQ_THREAT_THRESHOLD = float(os.getenv("SEQ_THREAT_THRESHOLD", "0.5"))
+SEQ_MICRO_BATCH_SIZE = int(os.getenv("SEQ_MICRO_BATCH_SIZE", "256"))
+SEQ_NUM_THREADS = int(os.getenv("SEQ_NUM_THREADS", "0"))  # 0 = torch default
+# Unix socket of a shared Tier 2 model server (tier2_server.py); empty = load the model in this process
+TIER2_SERVER_SOCKET = os.getenv("TIER2_SERVER_SOCKET", "")
+# Live mode (--live): poll the uploader's write alias for new logs and write verdicts back
+ELASTICSEARCH_HOST = os.getenv("ELASTICSEARCH_HOST", "http://localhost:9200")
+INDEX_NAME = os.getenv("INDEX_NAME", "unified-logs")
+BATCH_SIZE = int(os.getenv("BATCH_SIZE", "1000"))
+LOOP_DELAY_SECONDS = float(os.getenv("LOOP_DELAY_SECONDS", "1"))
+LIVE_CURSOR_PATH = os.getenv("LIVE_CURSOR_PATH", "live_cursor.json")  # last @timestamp (and its ids) triaged
+# The live session reports and starts over after this long, or this many logs, whichever comes first
+LIVE_REPORT_INTERVAL_SECONDS = float(os.getenv("LIVE_REPORT_INTERVAL_SECONDS", "3600"))
+LIVE_MAX_REPORT_LOGS = int(os.getenv("LIVE_MAX_REPORT_LOGS", "1000000"))
 
 # --- Core Orchestrator Functions ---
 
@@ -83,6 +116,7 @@ def tier1_triage(log_context: dict):
     Performs Tier 1 triage on a log.
     Returns a tuple: (classification, rule_name or None, confidence_score)
     Classifications: "THREAT", "BENIGN", "UNCLASSIFIED"
+    (TriageSession reclassifies authentication failures inside a brute-force campaign as "AGGREGATED")
     """
     searchable_text = json.dumps(log_context)
     confidence_score = calculate_confidence_score(log_context)
@@ -105,149 +139,466 @@ def tier1_triage(log_context: dict):
 
     return "UNCLASSIFIED", None, confidence_score
 
-def generate_security_report(analysis_results):
-    """Generates a markdown security report from the analysis results."""
-    print(f"--- Generating Security Intelligence Report ---")
-    
-    threats = [r for r in analysis_results if r['classification'] == 'THREAT']
-    llm_analyzed = [r for r in analysis_results if 'llm_analysis' in r]
-    benign = [r for r in analysis_results if r['classification'] == 'BENIGN']
-    
-    # Filter LLM results to only show actual threats or high-severity issues
-    critical_llm_alerts = [
-        r for r in llm_analyzed 
-        if r['llm_analysis'].get('severity') in ['High', 'Medium'] and not r['llm_analysis'].get('pre_filtered', False)
-    ]
-    
-    # Calculate confidence statistics
-    high_confidence_threats = [r for r in threats if r.get('confidence_score', 0) > 0.7]
-    low_confidence_threats = [r for r in threats if r.get('confidence_score', 0) <= 0.7]
-
-    report_content = f"""
-# Security Intelligence Report
-**Date Generated:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-**Total Logs Analyzed:** {len(analysis_results)}
-
----
-## 🚨 Executive Summary
-A total of **{len(threats) + len(critical_llm_alerts)}** high-priority security events were detected.
-
-- **{len(threats)}** known threats were identified by Tier 1 rules.
-  - **{len(high_confidence_threats)}** high-confidence threats (confidence > 0.7)
-  - **{len(low_confidence_threats)}** low-confidence threats (confidence ≤ 0.7)
-- **{len(critical_llm_alerts)}** previously unknown anomalies were classified as Medium or High severity by Tier 3 LLM analysis.
-- **{len(benign)}** logs were classified as benign and ignored.
-- **{len([r for r in analysis_results if r.get('pre_filtered', False)])}** logs were pre-filtered as low-priority by Tier 3.
-
----
-## 🎯 Tier 1: Known Threat Detections
-High-confidence threats identified by predefined rules.
-
-| Rule Matched                  | Count |
-| ----------------------------- | ----- |
-"""
-    # Create a summary table for Tier 1 threats with confidence scores
-    threat_summary = {}
-    for threat in threats:
-        rule = threat['rule_name']
-        if rule not in threat_summary:
-            threat_summary[rule] = {'count': 0, 'high_confidence': 0, 'low_confidence': 0}
-        threat_summary[rule]['count'] += 1
-        if threat.get('confidence_score', 0) > 0.7:
-            threat_summary[rule]['high_confidence'] += 1
-        else:
-            threat_summary[rule]['low_confidence'] += 1
-    
-    if not threat_summary:
-        report_content += "| No known threats detected. | N/A | N/A | N/A |\n"
+def load_tier2_detector(model_path=None):
+    """Loads the trained Tier 2 detector, or returns None if unavailable."""
+    knn_index_dir = None
+    if TIER2_MODE == "knn":
+        knn_index_dir, model_path = TIER2_KNN_INDEX_DIR, None
+        if not os.path.isdir(knn_index_dir):
+            print(f"Tier 2 k-NN index '{knn_index_dir}' not found; unclassified logs go straight to Tier 3.")
+            return None
     else:
-        report_content += "| Rule Matched                  | Total | High Conf | Low Conf |\n"
-        report_content += "| ----------------------------- | ----- | --------- | -------- |\n"
-        for rule, stats in sorted(threat_summary.items()):
-            report_content += f"| {rule:<29} | {stats['count']:<5} | {stats['high_confidence']:<9} | {stats['low_confidence']:<8} |\n"
-
-    report_content += """
----
-## 🧠 Tier 3: LLM Anomaly Analysis (Medium & High Severity)
-Logs that did not match known patterns but were flagged as significant by the AI analyst.
-
-"""
-    if not critical_llm_alerts:
-        report_content += "*No medium or high severity anomalies were identified by the LLM.*\n"
+        if model_path is None:
+            from tier2_refit import latest_model_entry
+            entry = latest_model_entry(TIER2_MODEL_DIR)
+            # A clusterer only makes sense for embeddings of the backend it was fitted on
+            # (versions saved before the manifest recorded it are taken as they are)
+            trained_backend = entry.get("embedding_backend") if entry else None
+            if trained_backend and trained_backend != TIER2_EMBEDDING_BACKEND:
+                print(f"Warning: Tier 2 model version {entry['version']} was fitted on '{trained_backend}' "
+                      f"embeddings ({entry.get('embedding_model')}), but TIER2_EMBEDDING_BACKEND is "
+                      f"'{TIER2_EMBEDDING_BACKEND}'; skipping Tier 2. Refit with --embedding-backend "
+                      f"{TIER2_EMBEDDING_BACKEND} or set TIER2_EMBEDDING_BACKEND={trained_backend}.")
+                return None
+            model_path = os.path.join(TIER2_MODEL_DIR, entry["file"]) if entry else TIER2_MODEL_PATH
+        if not os.path.exists(model_path):
+            print(f"Tier 2 model '{model_path}' not found; unclassified logs go straight to Tier 3.")
+            return None
+    try:
+        from tier2 import BertAnomalyDetector
+        detector = BertAnomalyDetector(
+            model_path=model_path,
+            knn_index_dir=knn_index_dir,
+            embedding_cache_dir=TIER2_EMBEDDING_CACHE_DIR,
+            embedding_backend=TIER2_EMBEDDING_BACKEND,
+            intra_op_threads=TIER2_INTRA_OP_THREADS,
+        )
+    except Exception as e:
+        print(f"Warning: Could not initialize Tier 2 detector ({e}); skipping Tier 2.")
+        return None
+    print(f"Tier 2 model loaded ({TIER2_MODE} mode, {TIER2_EMBEDDING_BACKEND} embedder)")
+    return detector
+
+def load_tier2_batcher(model_path=None):
+    """
+    The Tier 2 detector behind a dynamic batcher, or None if unavailable.
+    With TIER2_SERVER_SOCKET set, requests go to a shared tier2_server.py process instead of a local model.
+    """
+    from tier2 import DynamicBatcher
+    if TIER2_SERVER_SOCKET:
+        from tier2_server import Tier2Client
+        detector = Tier2Client(TIER2_SERVER_SOCKET)
+        try:
+            info = detector.info()
+        except OSError as e:
+            print(f"Warning: Tier 2 server at '{TIER2_SERVER_SOCKET}' unreachable ({e}); skipping Tier 2.")
+            return None
+        print(f"Tier 2 served by pid {info['pid']} at '{TIER2_SERVER_SOCKET}'")
     else:
-        for alert in critical_llm_alerts:
-            analysis = alert['llm_analysis']
-            confidence_score = alert.get('confidence_score', 0)
-            report_content += f"""
-### **{analysis.get('classification', 'N/A')}** (Severity: {analysis.get('severity', 'N/A')})
-- **Confidence Score:** {confidence_score:.2f}
-- **Hypothesis:** {analysis.get('hypothesis', 'N/A')}
-- **Timestamp:** `{alert['log_context'].get('@timestamp', 'N/A')}`
-- **Source IP:** `{alert['log_context'].get('source.ip', 'N/A')}`
-- **Original Log:** `{alert['log_context'].get('message', 'N/A')}`
-- **Recommended Action:** {analysis.get('recommended_action', 'N/A')}
----
-"""
-
-    with open(REPORT_FILENAME, 'w') as f:
-        f.write(report_content)
-    print(f"\n✅ Report successfully generated: {REPORT_FILENAME}")
+        detector = load_tier2_detector(model_path)
+        if detector is None:
+            return None
+    print(f"Tier 2 enabled (batch size {TIER2_BATCH_SIZE}, max wait {TIER2_MAX_WAIT_SECONDS}s)")
+    return DynamicBatcher(detector, max_batch_size=TIER2_BATCH_SIZE, max_wait_seconds=TIER2_MAX_WAIT_SECONDS,
+                          return_scores=True)
+
+def load_sequence_scorer(tier2_batcher=None):
+    """Loads the sequence model behind a micro-batching scorer, or returns None if unavailable."""
+    if not SEQ_MODEL_PATH or not os.path.exists(SEQ_MODEL_PATH):
+        return None
+    try:
+        from sequence_inference import SequenceInferenceEngine, SequenceScorer
+        engine = SequenceInferenceEngine.from_path(SEQ_MODEL_PATH, num_threads=SEQ_NUM_THREADS or None)
+        # Reuse the local Tier 2 embedder (and its template cache) when there is one
+        detector = tier2_batcher.detector if tier2_batcher is not None else None
+        if not hasattr(detector, "embed"):
+            from tier2 import BertAnomalyDetector
+            detector = BertAnomalyDetector(
+                embedding_cache_dir=TIER2_EMBEDDING_CACHE_DIR,
+                embedding_backend=TIER2_EMBEDDING_BACKEND,
+                intra_op_threads=TIER2_INTRA_OP_THREADS,
+            )
+    except Exception as e:
+        print(f"Warning: Could not initialize sequence model ({e}); skipping sequence scoring.")
+        return None
+    print(f"Sequence scoring enabled ({SEQ_MODEL_PATH}, window {engine.window_size}, "
+          f"micro-batch {SEQ_MICRO_BATCH_SIZE}, threshold {SEQ_THREAT_THRESHOLD})")
+    return SequenceScorer(engine, detector.embed, micro_batch_size=SEQ_MICRO_BATCH_SIZE)
+
+def tier2_message(log_context: dict) -> str:
+    """Text embedded by Tier 2 for a log."""
+    return log_context.get("message") or log_context.get("raw", "")
+
+def generate_security_report(analysis_results, correlation_alerts=None, traffic_summary=None, brute_force_campaigns=None,
+                             builder=None, report_filename=None, json_filename=None, sequence_threats=()):
+    """
+    Writes the markdown security report and its JSON summary (to REPORT_FILENAME and
+    REPORT_JSON_FILENAME unless given). Pass a ReportBuilder that has already seen the results
+    to avoid scanning them again.
+    """
+    report_filename = report_filename or REPORT_FILENAME
+    json_filename = json_filename or REPORT_JSON_FILENAME
+    correlation_alerts = correlation_alerts or []
+    brute_force_campaigns = brute_force_campaigns or []
+    print(f"--- Generating Security Intelligence Report ---")
+    if builder is None:
+        builder = ReportBuilder().add_all(analysis_results)
+    builder.write_markdown(report_filename, correlation_alerts, traffic_summary, brute_force_campaigns, sequence_threats)
+    builder.write_json(json_filename, correlation_alerts, traffic_summary, brute_force_campaigns, sequence_threats)
+    print(f"\n✅ Report successfully generated: {report_filename} (summary: {json_filename})")
+
+
+def period_report_filenames(period_start):
+    """
+    (markdown, JSON) report names of a live report period, stamped with its start time so
+    every period keeps its own files; a period starting in the same second gets a suffix.
+    """
+    stamp = period_start.strftime("%Y%m%d-%H%M%S")
+    for sequence in range(1, 1000):
+        suffix = stamp if sequence == 1 else f"{stamp}-{sequence}"
+        names = tuple(f"{root}_{suffix}{ext}" for root, ext in
+                      (os.path.splitext(REPORT_FILENAME), os.path.splitext(REPORT_JSON_FILENAME)))
+        if not any(os.path.exists(name) for name in names):
+            return names
+    raise RuntimeError(f"Too many reports for the period starting {stamp}")
 
 
 # --- Main Orchestration Workflow ---
-def main():
-    """Main function to orchestrate the entire workflow."""
-    
-    # 1. Load all logs from the specified files
-    all_logs = load_logs_from_files(LOG_DIRECTORY, FILES_TO_PROCESS)
-    
-    # 2. Process logs through the triage engine
-    print("--- Starting Triage and Analysis Engine ---")
-    analysis_results = []
-    unclassified_count = 0
-    max_tier3 = int(os.getenv("MAX_TIER3_ESCALATIONS", "50"))
-    tier3_used = 0
-    pre_filtered_count = 0
+class TriageSession:
+    """
+    State of one triage run. process() takes logs one at a time through Tier 1, correlation,
+    the traffic sketch, brute-force detection and aggregation, and sends each new unclassified
+    aggregate (and each new message template within it) on to Tier 2/3. main() feeds it the logs of local files; live_main() feeds it
+    batches polled from Elasticsearch and calls reset() after each report period.
+    rollup_source names input that a re-run reads again in full (see RollupStore).
+    """
 
-    for i, log in enumerate(all_logs):
-        # Provide progress feedback
-        if (i + 1) % 1000 == 0:
-            print(f"  -> Processed {i+1}/{len(all_logs)} logs...")
+    def __init__(self, rollup_source=None):
+        self.max_tier3 = int(os.getenv("MAX_TIER3_ESCALATIONS", "50"))
+        self.tier2_batcher = load_tier2_batcher()
+        self.sequence_scorer = load_sequence_scorer(self.tier2_batcher)
+        self.rollups = RollupStore(ROLLUP_DB_PATH, source=rollup_source) if ROLLUP_DB_PATH else None
+        self.event_store = EventStore(EVENT_STORE_DIR) if EVENT_STORE_DIR else None
+        self.reset()
+
+    def reset(self):
+        """Starts a new report period: clears counters, detectors and aggregates, keeps models and stores."""
+        self.logs = 0
+        self.unclassified_count = 0
+        self.tier3_used = 0
+        self.pre_filtered_count = 0
+        self.tier2_anomalies = 0
+        self.sequence_threats = {}  # source IP -> windows scored above SEQ_THREAT_THRESHOLD
+        self.correlation_engine = CorrelationEngine()
+        self.correlation_alerts = []
+        self.traffic_sketch = TrafficSketch()
+        self.brute_force = BruteForceDetector()
+        self.brute_force_campaigns = []
+        # Closed aggregates go straight into the report counters instead of staying in memory
+        self.report_builder = ReportBuilder()
+        self.aggregator = AlertAggregator(window_seconds=AGGREGATION_WINDOW_SECONDS,
+                                          on_close=self.report_builder.add)
+
+    def escalate(self, result, log):
+        """Asks the LLM about log; the aggregate keeps the more severe of its analyses."""
+        analysis = analyze_log_with_llm(log)
+        self.tier3_used += 1
+        previous = result.get('llm_analysis')
+        if previous is None or SEVERITY_RANK.get(analysis.get('severity'), 0) > SEVERITY_RANK.get(previous.get('severity'), 0):
+            result['llm_analysis'] = analysis
+            result['llm_log_context'] = log  # the log the analysis is about (log_context is the first one)
+        result.pop('pre_filtered', None)
+
+    def pre_filter(self, result):
+        """Records a judgement that did not escalate; the aggregate counts as pre-filtered unless another did."""
+        self.pre_filtered_count += 1
+        if 'llm_analysis' not in result:
+            result['pre_filtered'] = True
+
+    def tier3_stage(self, index, result, log, novelty=None):
+        """Escalates an unclassified log to the LLM if it is worth the budget."""
+        if result.get('llm_analysis', {}).get('severity') in LLM_REPORT_SEVERITIES:
+            return  # already reported (e.g. as a sequence threat or for an earlier template)
+        # Use improved escalation logic with confidence scoring
+        if should_escalate_to_llm(log, novelty=novelty) and self.tier3_used < self.max_tier3:
+            self.escalate(result, log)
+            print(f"    -> Escalated log {index+1} to LLM (confidence: {result['confidence_score']:.2f})")
+        else:
+            # Log was pre-filtered (not escalated to LLM due to low confidence)
+            self.pre_filter(result)
+
+    def tier2_completed(self, completed):
+        """Handles a flushed Tier 2 batch: only novel (outlier) logs continue to Tier 3."""
+        threshold = self.tier2_batcher.detector.anomaly_threshold
+        for (index, result, log), (is_anomaly, score) in completed:
+            result['pending_judgements'] -= 1
+            novelty = score / threshold if threshold else None
+            confidence_score = calculate_confidence_score(log, novelty=novelty)
+            if 'tier2_score' in result:
+                # A later template of the aggregate: keep the most anomalous judgement
+                score = max(score, result['tier2_score'])
+                confidence_score = max(confidence_score, result['confidence_score'])
+            result['tier2_score'] = score
+            result['confidence_score'] = confidence_score
+            if is_anomaly:
+                if not result.get('tier2_anomaly'):
+                    self.tier2_anomalies += 1
+                result['tier2_anomaly'] = True
+                self.tier3_stage(index, result, log, novelty=novelty)
+            else:
+                # Fits a known cluster of normal traffic
+                result.setdefault('tier2_anomaly', False)
+                self.pre_filter(result)
 
+    def sequence_completed(self, completed):
+        """
+        Records sequence-level threat scores for logs whose source IP has a full window. The
+        first threatening window of a source IP in a report period escalates its aggregate to
+        Tier 3 (unless a Tier 1 rule already reports it); all of them go into the report.
+        """
+        for result, score in completed:
+            result['pending_judgements'] -= 1
+            if score is None:
+                continue
+            result['sequence_score'] = max(result.get('sequence_score', 0.0), score)
+            if score < SEQ_THREAT_THRESHOLD:
+                continue
+            result['sequence_threat'] = True
+            log = result['log_context']
+            source_ip = log.get('source.ip')
+            threat = self.sequence_threats.get(source_ip)
+            if threat is None:
+                threat = self.sequence_threats[source_ip] = {
+                    "source.ip": source_ip, "windows": 0, "max_score": score,
+                    "first_seen": log.get('@timestamp'), "message": log.get('message'),
+                }
+                if (result['classification'] != 'THREAT' and 'llm_analysis' not in result
+                        and self.tier3_used < self.max_tier3):
+                    self.escalate(result, log)
+                    print(f"    -> Escalated sequence threat from {source_ip} to LLM (score {score:.2f})")
+            threat["windows"] += 1
+            if score > threat["max_score"]:
+                threat["max_score"], threat["message"] = score, log.get('message')
+            threat["last_seen"] = log.get('@timestamp')
+
+    def process(self, log: dict):
+        """Triages one log; returns (its own result, the aggregate it was folded into)."""
+        i = self.logs
+        self.logs += 1
         classification, rule_name, confidence_score = tier1_triage(log)
-        
+        self.correlation_alerts.extend(self.correlation_engine.process(log))
+        self.traffic_sketch.update(log)
+        if log.get('event.type') == 'authentication_failure':
+            # The Tier 1 verdict stands until the failure belongs to a reported campaign; from then
+            # on the campaign is the alert instead of one per line
+            self.brute_force_campaigns.extend(self.brute_force.process(log))
+            if self.brute_force.last_campaigns:
+                classification, rule_name = "AGGREGATED", self.brute_force.last_campaigns[0]["rule_name"]
+
         result = {
             "classification": classification,
             "rule_name": rule_name,
             "confidence_score": confidence_score,
             "log_context": log
         }
-        
+        if self.rollups is not None:
+            self.rollups.record(log, classification, rule_name)
+        if self.event_store is not None:
+            self.event_store.append(log, rule_name)
+        # Repeats of the same rule, source IP and URL pattern only bump the count of their aggregate
+        aggregate, is_new = self.aggregator.add(result)
+
+        if is_new:
+            aggregate['pending_judgements'] = 0  # Tier 2 / sequence results still in flight
+            aggregate['judged_templates'] = set()
+
+        judge = False
         if classification == "UNCLASSIFIED":
-            unclassified_count += 1
-            # Use improved escalation logic with confidence scoring
-            if should_escalate_to_llm(log) and tier3_used < max_tier3:
-                llm_analysis = analyze_log_with_llm(log)
-                result['llm_analysis'] = llm_analysis
-                tier3_used += 1
-                print(f"    -> Escalated log {i+1} to LLM (confidence: {confidence_score:.2f})")
+            self.unclassified_count += 1
+            # Tier 2/3 judge the first log of each message template of an aggregate, so a later,
+            # different message sharing the rule, source IP and URL pattern is not hidden behind the first
+            template = template_message(tier2_message(log))
+            judged = aggregate['judged_templates']
+            judge = template not in judged and len(judged) < AGGREGATE_MAX_JUDGED_TEMPLATES
+            if judge:
+                judged.add(template)
+        if judge:
+            if self.tier2_batcher is not None:
+                aggregate['pending_judgements'] += 1
+                self.tier2_completed(self.tier2_batcher.submit(tier2_message(log), (i, aggregate, log)))
             else:
-                # Log was pre-filtered (not escalated to LLM due to low confidence)
-                pre_filtered_count += 1
-                result['pre_filtered'] = True
-        
-        analysis_results.append(result)
+                self.tier3_stage(i, aggregate, log)
+        elif self.tier2_batcher is not None:
+            self.tier2_completed(self.tier2_batcher.poll())
+
+        if self.sequence_scorer is not None and log.get('source.ip'):
+            aggregate['pending_judgements'] += 1
+            self.sequence_completed(self.sequence_scorer.submit(log['source.ip'], tier2_message(log), aggregate))
+        return result, aggregate
+
+    def drain(self):
+        """Completes the pending Tier 2 and sequence batches, so every aggregate so far is judged."""
+        if self.tier2_batcher is not None:
+            self.tier2_completed(self.tier2_batcher.flush())
+        if self.sequence_scorer is not None:
+            self.sequence_completed(self.sequence_scorer.flush())
+
+    def finish(self):
+        self.drain()
+        if self.rollups is not None:
+            self.rollups.close()
+            print(f"Triage rollups saved to {ROLLUP_DB_PATH} (trend reports: python rollup_store.py --since ...)")
+        if self.event_store is not None:
+            self.event_store.close()
+            print(f"Event store '{EVENT_STORE_DIR}' holds {len(self.event_store)} events "
+                  f"(query: python event_store.py --ip ...)")
+
+    def report(self, report_filename=None, json_filename=None):
+        """Prints the triage statistics and writes the security report (see generate_security_report)."""
+        # Aggregates closed during the run are already in the builder; one pass adds the rest
+        analysis_results = self.aggregator.aggregates
+        report = self.report_builder.add_all(analysis_results)
+
+        print(f"\n--- Triage Complete ---")
+        print(f"Aggregated Results: {report.results} (from {self.aggregator.results} logs)")
+        print(f"Total Threats (Tier 1): {report.threats}")
+        print(f"  - High Confidence: {report.high_confidence_threats}")
+        print(f"  - Low Confidence: {report.low_confidence_threats}")
+        print(f"Correlation Alerts: {len(self.correlation_alerts)} "
+              f"({self.correlation_engine.stats()['entities']} tracked entities)")
+        traffic_summary = self.traffic_sketch.summary()
+        print(f"Distinct Source IPs (approx.): {traffic_summary['distinct_source_ips']}, "
+              f"distinct URLs (approx.): {traffic_summary['distinct_urls']} "
+              f"(sketch memory {self.traffic_sketch.memory_bytes() / 1024:.0f} KiB)")
+        print(f"Brute-Force Campaigns: {len(self.brute_force_campaigns)} "
+              f"(from {self.brute_force.events} authentication failures)")
+        print(f"Total Benign (Tier 1): {report.counts['BENIGN']}")
+        if self.tier2_batcher is not None:
+            print(f"Tier 2 Anomalies ({'k-NN novelty' if TIER2_MODE == 'knn' else 'HDBSCAN outliers'}): "
+                  f"{self.tier2_anomalies} aggregates (of {self.unclassified_count} unclassified logs)")
+            if self.tier2_batcher.detector.embedding_cache is not None:
+                print(f"  - Embedding cache: {self.tier2_batcher.detector.embedding_cache.stats()}")
+        if self.sequence_scorer is not None:
+            print(f"Sequence Threats (window model): {sum(t['windows'] for t in self.sequence_threats.values())} "
+                  f"windows from {len(self.sequence_threats)} source IPs ({self.sequence_scorer.engine.stats()})")
+        print(f"Total Escalated to LLM (Tier 3): {self.tier3_used} logs "
+              f"(of {self.unclassified_count} unclassified logs)")
+        print(f"Pre-filtered by Tier 3: {self.pre_filtered_count} judged logs "
+              f"({report.pre_filtered} logs)")
+        load_times = registry.load_times()
+        if load_times:
+            print("Lazy component load times: " + ", ".join(f"{name} {seconds:.2f}s" for name, seconds in load_times.items()))
+
+        generate_security_report(analysis_results, self.correlation_alerts, traffic_summary,
+                                 self.brute_force_campaigns, builder=report,
+                                 sequence_threats=list(self.sequence_threats.values()),
+                                 report_filename=report_filename, json_filename=json_filename)
+
+
+def main():
+    """Main function to orchestrate the entire workflow."""
     
-    print(f"\n--- Triage Complete ---")
-    print(f"Total Threats (Tier 1): {len([r for r in analysis_results if r['classification'] == 'THREAT'])}")
-    print(f"  - High Confidence: {len([r for r in analysis_results if r['classification'] == 'THREAT' and r.get('confidence_score', 0) > 0.7])}")
-    print(f"  - Low Confidence: {len([r for r in analysis_results if r['classification'] == 'THREAT' and r.get('confidence_score', 0) <= 0.7])}")
-    print(f"Total Benign (Tier 1): {len([r for r in analysis_results if r['classification'] == 'BENIGN'])}")
-    print(f"Total Escalated to LLM (Tier 3): {tier3_used} (of {unclassified_count} unclassified)")
-    print(f"Pre-filtered by Tier 3: {pre_filtered_count}")
+    # 1. Load all logs from the specified files
+    all_logs = load_logs_from_files(LOG_DIRECTORY, FILES_TO_PROCESS)
+    
+    # 2. Process logs through the triage engine
+    print("--- Starting Triage and Analysis Engine ---")
+    # Re-running on the same files replaces their rollups instead of counting them twice
+    session = TriageSession(rollup_source="files:" + ",".join(sorted(FILES_TO_PROCESS)))
+    for i, log in enumerate(all_logs):
+        # Provide progress feedback
+        if (i + 1) % 1000 == 0:
+            print(f"  -> Processed {i+1}/{len(all_logs)} logs...")
+        session.process(log)
+    session.finish()
 
     # 3. Generate the final report
-    generate_security_report(analysis_results)
+    session.report()
+
+
+def live_main(es_client=None, max_polls=None):
+    """
+    Live mode: polls INDEX_NAME for documents newer than the persisted cursor, triages them in
+    batches of BATCH_SIZE, writes each verdict back onto its document and advances the cursor
+    once the batch's verdicts are written. Every LIVE_REPORT_INTERVAL_SECONDS (or
+    LIVE_MAX_REPORT_LOGS logs) the security report of that period is written to files named after
+    its start time (period_report_filenames) and the session is reset, so memory stays bounded. Runs until interrupted (or for max_polls polls).
+    """
+    from elasticsearch import ApiError, TransportError
+    from live_triage import LiveLogSource, SearchCursor, write_verdicts
+
+    if es_client is None:
+        from elasticsearch import Elasticsearch
+        es_client = Elasticsearch([ELASTICSEARCH_HOST], request_timeout=30)
+    cursor = SearchCursor(LIVE_CURSOR_PATH)
+    source = LiveLogSource(es_client, INDEX_NAME, cursor, batch_size=BATCH_SIZE)
+    print(f"--- Live triage of '{INDEX_NAME}' at {ELASTICSEARCH_HOST} (cursor: {cursor.describe()}) ---")
+    session = TriageSession()
+    period_started = time.monotonic()
+    period_start = datetime.now()
+    unsent = None  # (hits, results) already triaged whose verdicts are not written yet
+
+    def commit(hits, results):
+        updated, errors = write_verdicts(es_client, hits, results)
+        if errors:
+            print(f"  Warning: {len(errors)} verdicts not written, e.g. {errors[0]}")
+        # At-least-once: the cursor only moves past logs whose verdicts were sent
+        cursor.advance(hits)
+        cursor.save()
+        print(f"  -> Triaged {len(hits)} new logs ({updated} verdicts written, {session.logs} this period)")
+
+    def rotate_if_due():
+        nonlocal period_started, period_start, reports
+        if (session.logs >= LIVE_MAX_REPORT_LOGS
+                or (session.logs and time.monotonic() - period_started >= LIVE_REPORT_INTERVAL_SECONDS)):
+            session.report(*period_report_filenames(period_start))
+            session.reset()
+            period_started = time.monotonic()
+            period_start = datetime.now()
+            reports += 1
+
+    polls = reports = 0
+    try:
+        while max_polls is None or polls < max_polls:
+            polls += 1
+            new_logs = 0
+            # Only Elasticsearch failures are retried; a triage error propagates instead of
+            # re-triaging the same batch (and inflating the session's counters) forever
+            try:
+                if unsent is not None:
+                    commit(*unsent)
+                    unsent = None
+                for hits in source.poll():
+                    results = [session.process(hit["_source"]) for hit in hits]
+                    session.drain()
+                    unsent = (hits, results)
+                    commit(hits, results)
+                    unsent = None
+                    new_logs += len(hits)
+                    rotate_if_due()
+            except (ApiError, TransportError) as e:
+                print(f"Warning: Elasticsearch request failed ({e}); retrying in {LOOP_DELAY_SECONDS}s")
+            if unsent is None:
+                rotate_if_due()
+            if not new_logs and (max_polls is None or polls < max_polls):
+                time.sleep(LOOP_DELAY_SECONDS)
+    except KeyboardInterrupt:
+        print("\nStopping live triage...")
+    finally:
+        session.finish()
+    if session.logs or not reports:
+        session.report(*period_report_filenames(period_start))
+
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Triage normalized logs and write the security report")
+    parser.add_argument("--live", action="store_true",
+                        help=f"poll Elasticsearch ('{INDEX_NAME}') for new logs instead of reading {LOG_DIRECTORY}/")
+    parser.add_argument("--max-polls", type=int, help="live mode: stop after this many polls")
+    args = parser.parse_args()
+    if args.live:
+        live_main(max_polls=args.max_polls)
+    else:
+        main()
@@ -0,0 +1,289 @@
+import heapq
+import json
+from datetime import datetime
+
+HIGH_CONFIDENCE = 0.7
+REPORT_TOP_AGGREGATES = 20  # alert groups listed individually in the report
+LLM_REPORT_SEVERITIES = ("High", "Medium")
+
+
+class ReportBuilder:
+    """
+    Security report from (aggregated) triage results in a single pass.
+
+    add() folds each result into counters; only what the report lists item by item is kept
+    (the largest alert groups in a bounded heap and the Medium/High LLM findings), so memory is
+    O(alerts) rather than O(results). write_markdown() then streams the sections to the file
+    and write_json() emits the same figures as a machine-readable summary.
+    """
+
+    def __init__(self, top_aggregates=REPORT_TOP_AGGREGATES):
+        self.top_aggregates = top_aggregates
+        self.logs = 0
+        self.results = 0
+        self.counts = {"THREAT": 0, "BENIGN": 0, "UNCLASSIFIED": 0, "AGGREGATED": 0}
+        self.threat_alerts = 0
+        self.high_confidence_threats = 0
+        self.pre_filtered = 0
+        self.tier2_anomalies = 0
+        self.llm_analyzed = 0
+        self.threats_by_rule = {}  # rule -> {'count', 'high_confidence', 'low_confidence'}
+        self.llm_alerts = []
+        self._top = []  # min-heap of (count, sequence, result)
+
+    def add(self, result: dict):
+        count = result.get('count', 1)
+        classification = result['classification']
+        self.logs += count
+        self.results += 1
+        self.counts[classification] = self.counts.get(classification, 0) + count
+        if result.get('pre_filtered', False):
+            self.pre_filtered += count
+        if result.get('tier2_anomaly'):
+            self.tier2_anomalies += 1
+
+        if classification == 'THREAT':
+            self.threat_alerts += 1
+            high = result.get('confidence_score', 0) > HIGH_CONFIDENCE
+            if high:
+                self.high_confidence_threats += count
+            stats = self.threats_by_rule.setdefault(result['rule_name'],
+                                                    {'count': 0, 'high_confidence': 0, 'low_confidence': 0})
+            stats['count'] += count
+            stats['high_confidence' if high else 'low_confidence'] += count
+            entry = (count, self.results, result)
+            if len(self._top) < self.top_aggregates:
+                heapq.heappush(self._top, entry)
+            elif count > self._top[0][0]:
+                heapq.heapreplace(self._top, entry)
+
+        analysis = result.get('llm_analysis')
+        if analysis is not None:
+            self.llm_analyzed += 1
+            # Only actual threats or high-severity issues are reported
+            if analysis.get('severity') in LLM_REPORT_SEVERITIES and not analysis.get('pre_filtered', False):
+                self.llm_alerts.append(result)
+
+    def add_all(self, results):
+        for result in results:
+            self.add(result)
+        return self
+
+    @property
+    def threats(self):
+        return self.counts['THREAT']
+
+    @property
+    def low_confidence_threats(self):
+        return self.threats - self.high_confidence_threats
+
+    def top_alert_groups(self):
+        """Largest Tier 1 alert groups, biggest first (ties in arrival order)."""
+        return [result for _, _, result in sorted(self._top, key=lambda entry: (-entry[0], entry[1]))]
+
+    def write_markdown(self, path, correlation_alerts=(), traffic_summary=None, brute_force_campaigns=(),
+                       sequence_threats=()):
+        llm_alert_logs = sum(r.get('count', 1) for r in self.llm_alerts)
+        with open(path, 'w') as f:
+            f.write(f"""
+# Security Intelligence Report
+**Date Generated:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+**Total Logs Analyzed:** {self.logs} ({self.results} aggregated results)
+
+---
+## 🚨 Executive Summary
+A total of **{self.threats + llm_alert_logs + len(correlation_alerts) + len(brute_force_campaigns) + len(sequence_threats)}** high-priority security events were detected.
+
+- **{self.threats}** known threats were identified by Tier 1 rules, in **{self.threat_alerts}** distinct alerts (same rule, source IP and URL pattern).
+  - **{self.high_confidence_threats}** high-confidence threats (confidence > {HIGH_CONFIDENCE})
+  - **{self.low_confidence_threats}** low-confidence threats (confidence ≤ {HIGH_CONFIDENCE})
+- **{len(correlation_alerts)}** volumetric alerts were raised by correlation rules.
+- **{len(brute_force_campaigns)}** brute-force / password-spray campaigns were identified; **{self.counts['AGGREGATED']}** authentication failures inside them are reported per campaign.
+- **{len(sequence_threats)}** source IPs produced event sequences scored as threats by the sequence model.
+- **{llm_alert_logs}** previously unknown anomalies were classified as Medium or High severity by Tier 3 LLM analysis.
+- **{self.counts['BENIGN']}** logs were classified as benign and ignored.
+- **{self.pre_filtered}** logs were pre-filtered as low-priority by Tier 3.
+""")
+            self._write_tier1(f)
+            if traffic_summary is not None:
+                self._write_traffic(f, traffic_summary)
+            self._write_correlation(f, correlation_alerts)
+            self._write_campaigns(f, brute_force_campaigns)
+            self._write_sequence_threats(f, sequence_threats)
+            self._write_llm_alerts(f)
+
+    def _write_tier1(self, f):
+        f.write("""
+---
+## 🎯 Tier 1: Known Threat Detections
+High-confidence threats identified by predefined rules.
+
+| Rule Matched                  | Count |
+| ----------------------------- | ----- |
+""")
+        if not self.threats_by_rule:
+            f.write("| No known threats detected. | N/A | N/A | N/A |\n")
+            return
+        f.write("| Rule Matched                  | Total | High Conf | Low Conf |\n")
+        f.write("| ----------------------------- | ----- | --------- | -------- |\n")
+        for rule, stats in sorted(self.threats_by_rule.items()):
+            f.write(f"| {rule:<29} | {stats['count']:<5} | {stats['high_confidence']:<9} | {stats['low_confidence']:<8} |\n")
+
+        f.write(f"\n**Largest alert groups** (top {self.top_aggregates} of {self.threat_alerts}):\n\n")
+        f.write("| Rule Matched                  | Source IP       | Target Pattern                 | Count | First Seen | Last Seen |\n")
+        f.write("| ----------------------------- | --------------- | ------------------------------ | ----- | ---------- | --------- |\n")
+        for threat in self.top_alert_groups():
+            # Plain per-log results (not aggregated) stand for a group of one
+            log = threat['log_context']
+            timestamp = log.get('@timestamp', 'N/A')
+            target = threat.get('target_template') or log.get('url.original') or log.get('message') or 'N/A'
+            target = target[:60].replace('|', '\\|')
+            f.write(f"| {threat['rule_name']:<29} | {log.get('source.ip') or 'N/A':<15} | "
+                    f"`{target}` | {threat.get('count', 1):<5} | {threat.get('first_seen', timestamp)} | "
+                    f"{threat.get('last_seen', timestamp)} |\n")
+
+    @staticmethod
+    def _write_traffic(f, traffic_summary):
+        f.write(f"""
+---
+## 📊 Traffic Overview (approximate)
+Estimated from fixed-size sketches: **~{traffic_summary['distinct_source_ips']}** distinct source IPs and **~{traffic_summary['distinct_urls']}** distinct URLs; {traffic_summary['total_requests']} events carried a source IP.
+
+""")
+        if not traffic_summary['top_sources']:
+            f.write("*No source IPs were observed.*\n")
+            return
+        f.write("| Top Source IP                 | Requests (est.) | Distinct URLs (est.) |\n")
+        f.write("| ----------------------------- | --------------- | -------------------- |\n")
+        for source in traffic_summary['top_sources']:
+            f.write(f"| {source['source.ip']:<29} | {source['requests']:<15} | {source['distinct_urls']:<20} |\n")
+
+    @staticmethod
+    def _write_correlation(f, correlation_alerts):
+        f.write("""
+---
+## 📈 Correlated Volumetric Detections
+Entities that crossed a correlation rule's threshold within its time window.
+
+""")
+        if not correlation_alerts:
+            f.write("*No correlation rule thresholds were crossed.*\n")
+            return
+        f.write("| Rule                          | Entity                  | Events | Window | First Fired |\n")
+        f.write("| ----------------------------- | ----------------------- | ------ | ------ | ----------- |\n")
+        for alert in correlation_alerts:
+            entity = f"{alert['entity_field']}={alert['entity']}"
+            f.write(f"| {alert['rule_name']:<29} | {entity:<23} | {alert['count']:<6} | "
+                    f"{alert['window_seconds']}s | {alert['@timestamp']} |\n")
+
+    @staticmethod
+    def _write_campaigns(f, brute_force_campaigns):
+        f.write("""
+---
+## 🔐 Brute-Force Campaigns
+Authentication failures aggregated per source IP and per targeted user; one row per campaign.
+
+""")
+        if not brute_force_campaigns:
+            f.write("*No brute-force or password-spray campaigns were detected.*\n")
+            return
+        f.write("| Campaign                      | Entity                  | Failures | Users | Source IPs | First Seen | Last Seen |\n")
+        f.write("| ----------------------------- | ----------------------- | -------- | ----- | ---------- | ---------- | --------- |\n")
+        for campaign in brute_force_campaigns:
+            entity = f"{campaign['entity_field']}={campaign['entity']}"
+            f.write(f"| {campaign['rule_name']:<29} | {entity:<23} | {campaign['failures']:<8} | "
+                    f"{len(campaign['users']):<5} | {len(campaign['source_ips']):<10} | "
+                    f"{campaign['first_seen']} | {campaign['last_seen']} |\n")
+
+    @staticmethod
+    def _write_sequence_threats(f, sequence_threats):
+        f.write("""
+---
+## 🧬 Sequence Model Detections
+Source IPs whose recent events, taken as a window, scored above the sequence model's threat threshold.
+
+""")
+        if not sequence_threats:
+            f.write("*No event sequences were scored as threats.*\n")
+            return
+        f.write("| Source IP                     | Windows | Max Score | First Seen | Last Seen | Highest-Scoring Log |\n")
+        f.write("| ----------------------------- | ------- | --------- | ---------- | --------- | ------------------- |\n")
+        for threat in sorted(sequence_threats, key=lambda t: -t['max_score']):
+            message = (threat.get('message') or 'N/A')[:60].replace('|', '\\|')
+            f.write(f"| {threat['source.ip'] or 'N/A':<29} | {threat['windows']:<7} | {threat['max_score']:<9.2f} | "
+                    f"{threat.get('first_seen')} | {threat.get('last_seen')} | `{message}` |\n")
+
+    def _write_llm_alerts(self, f):
+        f.write("""
+---
+## 🧠 Tier 3: LLM Anomaly Analysis (Medium & High Severity)
+Logs that did not match known patterns but were flagged as significant by the AI analyst.
+
+""")
+        if not self.llm_alerts:
+            f.write("*No medium or high severity anomalies were identified by the LLM.*\n")
+            return
+        for alert in self.llm_alerts:
+            analysis = alert['llm_analysis']
+            log = alert.get('llm_log_context') or alert['log_context']
+            confidence_score = alert.get('confidence_score', 0)
+            f.write(f"""
+### **{analysis.get('classification', 'N/A')}** (Severity: {analysis.get('severity', 'N/A')})
+- **Confidence Score:** {confidence_score:.2f}
+- **Occurrences:** {alert.get('count', 1)} (first seen `{alert.get('first_seen', 'N/A')}`, last seen `{alert.get('last_seen', 'N/A')}`)
+- **Hypothesis:** {analysis.get('hypothesis', 'N/A')}
+- **Timestamp:** `{log.get('@timestamp', 'N/A')}`
+- **Source IP:** `{log.get('source.ip', 'N/A')}`
+- **Original Log:** `{log.get('message', 'N/A')}`
+- **Recommended Action:** {analysis.get('recommended_action', 'N/A')}
+---
+""")
+
+    def summary(self, correlation_alerts=(), traffic_summary=None, brute_force_campaigns=(), sequence_threats=()):
+        """JSON-serializable summary with the same figures as the markdown report."""
+        return {
+            "generated_at": datetime.now().isoformat(timespec="seconds"),
+            "total_logs": self.logs,
+            "aggregated_results": self.results,
+            "threats": {
+                "total": self.threats,
+                "alerts": self.threat_alerts,
+                "high_confidence": self.high_confidence_threats,
+                "low_confidence": self.low_confidence_threats,
+                "by_rule": self.threats_by_rule,
+                "top_alert_groups": [
+                    {"rule_name": r['rule_name'], "source.ip": r['log_context'].get('source.ip'),
+                     "target_template": r.get('target_template'), "count": r.get('count', 1),
+                     "first_seen": r.get('first_seen'), "last_seen": r.get('last_seen')}
+                    for r in self.top_alert_groups()
+                ],
+            },
+            "benign": self.counts['BENIGN'],
+            "unclassified": self.counts['UNCLASSIFIED'],
+            "campaign_authentication_failures": self.counts['AGGREGATED'],
+            "pre_filtered": self.pre_filtered,
+            "tier2_anomalies": self.tier2_anomalies,
+            "llm_analyzed": self.llm_analyzed,
+            "llm_alerts": [
+                {**{k: r['llm_analysis'].get(k) for k in ("classification", "severity", "hypothesis", "recommended_action")},
+                 "confidence_score": r.get('confidence_score'), "count": r.get('count', 1),
+                 "source.ip": (r.get('llm_log_context') or r['log_context']).get('source.ip'),
+                 "message": (r.get('llm_log_context') or r['log_context']).get('message'),
+                 "first_seen": r.get('first_seen'), "last_seen": r.get('last_seen')}
+                for r in self.llm_alerts
+            ],
+            "correlation_alerts": list(correlation_alerts),
+            "brute_force_campaigns": [
+                {**{k: v for k, v in c.items() if k != 'last_seen_ts'},
+                 "users": sorted(c['users']), "source_ips": sorted(c['source_ips'])}
+                for c in brute_force_campaigns
+            ],
+            "sequence_threats": sorted(sequence_threats, key=lambda t: -t['max_score']),
+            "traffic": traffic_summary,
+        }
+
+    def write_json(self, path, correlation_alerts=(), traffic_summary=None, brute_force_campaigns=(),
+                   sequence_threats=()):
+        with open(path, 'w') as f:
+            json.dump(self.summary(correlation_alerts, traffic_summary, brute_force_campaigns, sequence_threats),
+                      f, indent=2, default=str)
@@ -0,0 +1,218 @@
+import argparse
+import sqlite3
+import time
+from collections import Counter
+from datetime import datetime
+
+from correlation import event_time
+
+ROLLUP_DB_PATH = "triage_rollups.db"
+TOP_IPS_PER_MINUTE = 20  # source IPs kept per minute (per flush, so a split minute may keep a few more)
+FLUSH_EVERY = 50000  # buffered logs between upserts
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rollups (
+    source TEXT NOT NULL,         -- ingestion source that re-runs replace, '' for append-only input
+    minute INTEGER NOT NULL,      -- epoch seconds // 60
+    dimension TEXT NOT NULL,      -- 'total', 'classification', 'rule', 'log.source', 'status_class', 'source.ip'
+    value TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (source, minute, dimension, value)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS rollups_by_dimension ON rollups (dimension, minute);
+"""
+UPSERT = """
+INSERT INTO rollups (source, minute, dimension, value, count) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (source, minute, dimension, value) DO UPDATE SET count = count + excluded.count
+"""
+
+
+def status_class(log: dict):
+    status = log.get("http.response.status_code")
+    try:
+        return f"{int(status) // 100}xx"
+    except (TypeError, ValueError):
+        return None
+
+
+def to_epoch(value) -> float:
+    """Epoch seconds of an epoch timestamp, datetime or ISO string."""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if isinstance(value, datetime):
+        value = value.timestamp()
+    return float(value)
+
+
+def to_minute(value) -> int:
+    return int(to_epoch(value) // 60)
+
+
+class RollupStore:
+    """
+    Per-minute triage counts in SQLite (WAL mode), so trend reports over any time range are
+    answered from a few thousand rows instead of re-processing raw logs.
+
+    record() only updates in-memory counters; every flush_every logs (and on close) they are
+    upserted in one transaction. Rows are keyed by the run's source: a run given a source
+    re-reads all of it, so its first flush replaces every row earlier runs stored for that
+    source and re-processing the same input leaves the counts unchanged. Runs without a source
+    (live mode, whose cursor never re-reads a log) only add, and different sources sharing a
+    minute add up.
+    """
+
+    def __init__(self, path=ROLLUP_DB_PATH, top_ips=TOP_IPS_PER_MINUTE, flush_every=FLUSH_EVERY, source=None):
+        self.path = path
+        self.top_ips = top_ips
+        self.flush_every = flush_every
+        self.source = source
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._migrate()
+        self.conn.executescript(SCHEMA)
+        self.pending = Counter()  # (minute, dimension, value) -> count
+        self.pending_ips = {}  # minute -> Counter of source IPs
+        self.pending_logs = 0
+        self.replaced = source is None  # whether the source's rows from earlier runs are gone
+
+    def _migrate(self):
+        """Moves rows of a database created before rollups were keyed by source to the '' source."""
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(rollups)")]
+        if not columns or "source" in columns:
+            return
+        with self.conn:
+            self.conn.execute("DROP INDEX IF EXISTS rollups_by_dimension")
+            self.conn.execute("ALTER TABLE rollups RENAME TO rollups_unkeyed")
+            self.conn.executescript(SCHEMA)
+            self.conn.execute("INSERT INTO rollups SELECT '', minute, dimension, value, count FROM rollups_unkeyed")
+            self.conn.execute("DROP TABLE rollups_unkeyed")
+
+    def record(self, log: dict, classification, rule_name=None):
+        minute = int(event_time(log) // 60)
+        pending = self.pending
+        pending[(minute, "total", "")] += 1
+        pending[(minute, "classification", classification)] += 1
+        if rule_name:
+            pending[(minute, "rule", rule_name)] += 1
+        if log.get("log.source"):
+            pending[(minute, "log.source", log["log.source"])] += 1
+        status = status_class(log)
+        if status:
+            pending[(minute, "status_class", status)] += 1
+        if log.get("source.ip"):
+            self.pending_ips.setdefault(minute, Counter())[log["source.ip"]] += 1
+        self.pending_logs += 1
+        if self.pending_logs >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        source = self.source or ""
+        rows = [(source, minute, dimension, value, count)
+                for (minute, dimension, value), count in self.pending.items()]
+        for minute, ips in self.pending_ips.items():
+            rows.extend((source, minute, "source.ip", ip, count) for ip, count in ips.most_common(self.top_ips))
+        if rows:
+            with self.conn:
+                if not self.replaced:
+                    self.conn.execute("DELETE FROM rollups WHERE source = ?", (source,))
+                self.conn.executemany(UPSERT, rows)
+            self.replaced = True
+        self.pending.clear()
+        self.pending_ips.clear()
+        self.pending_logs = 0
+        return len(rows)
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+    # --- Queries (start inclusive, end exclusive; epoch seconds, datetimes or ISO strings) ---
+
+    def _range(self, start, end):
+        return (to_minute(start) if start is not None else 0,
+                to_minute(end) if end is not None else 2 ** 62)
+
+    def totals(self, dimension, start=None, end=None, limit=None):
+        """[(value, count)] of a dimension over the range, largest first."""
+        query = ("SELECT value, SUM(count) AS total FROM rollups WHERE dimension = ? AND minute >= ? AND minute < ? "
+                 "GROUP BY value ORDER BY total DESC, value")
+        params = [dimension, *self._range(start, end)]
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+        return self.conn.execute(query, params).fetchall()
+
+    def timeseries(self, dimension="total", value="", start=None, end=None, bucket_minutes=60):
+        """[(bucket start as epoch seconds, count)] of one dimension value, for non-empty buckets."""
+        query = ("SELECT (minute / ?) * ? * 60 AS bucket, SUM(count) FROM rollups "
+                 "WHERE dimension = ? AND value = ? AND minute >= ? AND minute < ? GROUP BY bucket ORDER BY bucket")
+        return self.conn.execute(query, [bucket_minutes, bucket_minutes, dimension, value,
+                                         *self._range(start, end)]).fetchall()
+
+    def time_bounds(self):
+        first, last = self.conn.execute("SELECT MIN(minute), MAX(minute) FROM rollups WHERE dimension = 'total'").fetchone()
+        return (None, None) if first is None else (first * 60, (last + 1) * 60)
+
+
+def write_trend_report(store, path, start=None, end=None, bucket_minutes=60, top=10):
+    """Markdown trend report for a time range, built from the rollups alone."""
+    first, last = store.time_bounds()
+    start = to_epoch(start) if start is not None else first
+    end = to_epoch(end) if end is not None else last
+
+    def fmt(ts):
+        return datetime.fromtimestamp(ts).strftime('%Y-%m-%d %H:%M') if ts is not None else "N/A"
+
+    total = sum(count for _, count in store.totals("total", start, end))
+    with open(path, "w") as f:
+        f.write(f"""
+# Security Trend Report
+**Date Generated:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+**Period:** {fmt(start)} – {fmt(end)}
+**Total Logs:** {total}
+
+---
+## Classifications
+| Classification  | Count |
+| --------------- | ----- |
+""")
+        for value, count in store.totals("classification", start, end):
+            f.write(f"| {value:<15} | {count:<5} |\n")
+
+        f.write("\n## Top Rules\n| Rule                          | Count |\n| ----------------------------- | ----- |\n")
+        for value, count in store.totals("rule", start, end, limit=top):
+            f.write(f"| {value:<29} | {count:<5} |\n")
+
+        f.write("\n## HTTP Status Classes\n| Class | Count |\n| ----- | ----- |\n")
+        for value, count in store.totals("status_class", start, end):
+            f.write(f"| {value:<5} | {count:<5} |\n")
+
+        f.write("\n## Top Source IPs\n| Source IP                     | Count |\n| ----------------------------- | ----- |\n")
+        for value, count in store.totals("source.ip", start, end, limit=top):
+            f.write(f"| {value:<29} | {count:<5} |\n")
+
+        f.write(f"\n## Volume per {bucket_minutes} minutes\n| Period Start     | Logs  | Threats |\n| ---------------- | ----- | ------- |\n")
+        threats = dict(store.timeseries("classification", "THREAT", start, end, bucket_minutes))
+        for bucket, count in store.timeseries("total", "", start, end, bucket_minutes):
+            f.write(f"| {fmt(bucket)} | {count:<5} | {threats.get(bucket, 0):<7} |\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Trend report from the orchestrator's per-minute rollups")
+    parser.add_argument("--db", default=ROLLUP_DB_PATH)
+    parser.add_argument("--since", help="ISO timestamp (default: first rollup)")
+    parser.add_argument("--until", help="ISO timestamp, exclusive (default: last rollup)")
+    parser.add_argument("--bucket-minutes", type=int, default=60)
+    parser.add_argument("--output", default="security_trend_report.md")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    store = RollupStore(args.db)
+    write_trend_report(store, args.output, args.since, args.until, args.bucket_minutes)
+    store.close()
+    print(f"Trend report written to {args.output} in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
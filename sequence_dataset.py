@@ -0,0 +1,156 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import torch
+from numpy.lib.stride_tricks import sliding_window_view
+from torch.utils.data import DataLoader, Dataset
+
+from sequence_models import WINDOW_SIZE
+
+META_FILENAME = "windows.npz"
+INFO_FILENAME = "windows.json"
+EMBEDDINGS_FILENAME = "embeddings.f32"
+
+
+class SequenceWindows:
+    """
+    Sliding windows over per-entity event sequences without materializing them.
+
+    The embeddings are stored once, sorted by (entity, time), in a float32 memmap, so every
+    window is the contiguous slice embeddings[start:start + W]. Only the window start offsets,
+    labels and end times are kept in memory: O(N) instead of O(N * W * D).
+    """
+
+    def __init__(self, embeddings_path, n_rows, embed_dim, starts, labels, end_times, window_size=WINDOW_SIZE):
+        self.embeddings_path = embeddings_path
+        self.n_rows = n_rows
+        self.embed_dim = embed_dim
+        self.starts = starts
+        self.labels = labels
+        self.end_times = end_times
+        self.window_size = window_size
+
+    def __len__(self):
+        return len(self.starts)
+
+    def embeddings(self):
+        return np.memmap(self.embeddings_path, dtype=np.float32, mode="r", shape=(self.n_rows, self.embed_dim))
+
+    def windows_view(self):
+        """(n_rows - W + 1, W, D) zero-copy view of every window position; index it with .starts."""
+        return sliding_window_view(self.embeddings(), self.window_size, axis=0).transpose(0, 2, 1)
+
+    def split_time(self, quantile=0.8):
+        return np.datetime64(int(np.quantile(self.end_times.astype(np.int64), quantile)), "ns")
+
+    def split_by_time(self, quantile=0.8):
+        """(train, val) window indices: windows ending before / at-or-after the time quantile."""
+        split = self.split_time(quantile)
+        return np.flatnonzero(self.end_times < split), np.flatnonzero(self.end_times >= split)
+
+    def dataset(self, indices=None):
+        indices = np.arange(len(self)) if indices is None else np.asarray(indices)
+        return SlidingWindowDataset(self.embeddings_path, self.n_rows, self.embed_dim,
+                                    self.starts[indices], self.labels[indices], self.window_size)
+
+    def save(self, directory):
+        """Saves the window index next to the embeddings file (which must live in directory)."""
+        np.savez(os.path.join(directory, META_FILENAME), starts=self.starts, labels=self.labels,
+                 end_times=self.end_times.astype("datetime64[ns]").astype(np.int64))
+        with open(os.path.join(directory, INFO_FILENAME), "w") as f:
+            json.dump({"embeddings": os.path.basename(self.embeddings_path), "n_rows": self.n_rows,
+                       "embed_dim": self.embed_dim, "window_size": self.window_size}, f)
+
+    @classmethod
+    def load(cls, directory):
+        with open(os.path.join(directory, INFO_FILENAME), "r") as f:
+            info = json.load(f)
+        meta = np.load(os.path.join(directory, META_FILENAME))
+        return cls(os.path.join(directory, info["embeddings"]), info["n_rows"], info["embed_dim"],
+                   meta["starts"], meta["labels"], meta["end_times"].astype("datetime64[ns]"), info["window_size"])
+
+
+def build_sequence_windows(embeddings, entities, timestamps, labels, directory, window_size=WINDOW_SIZE,
+                           stride=1, chunk_size=65536):
+    """
+    Writes embeddings sorted by (entity, time) to directory and indexes every stride-th window
+    of window_size consecutive events of the same entity. A window is labelled with the max
+    label of its events. Rows without an entity are dropped, as groupby would.
+    """
+    entities = pd.Series(entities)
+    valid = np.flatnonzero(entities.notnull().to_numpy())
+    codes, _ = pd.factorize(entities.iloc[valid], sort=True)
+    timestamps = pd.to_datetime(pd.Series(timestamps).iloc[valid]).to_numpy(dtype="datetime64[ns]")
+    # Stable sorts: by time, then by entity, keeping time order within each entity
+    by_time = np.argsort(timestamps, kind="stable")
+    local_order = by_time[np.argsort(codes[by_time], kind="stable")]
+    order = valid[local_order]
+    sorted_codes = codes[local_order]
+
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, EMBEDDINGS_FILENAME)
+    embed_dim = np.shape(embeddings)[1]
+    stored = np.memmap(path, dtype=np.float32, mode="w+", shape=(len(order), embed_dim))
+    for start in range(0, len(order), chunk_size):
+        stored[start:start + chunk_size] = np.asarray(embeddings[order[start:start + chunk_size]], dtype=np.float32)
+    stored.flush()
+    del stored
+
+    # Group boundaries in sorted order; windows must not cross them
+    boundaries = np.flatnonzero(np.diff(sorted_codes)) + 1
+    group_starts = np.r_[0, boundaries]
+    group_ends = np.r_[boundaries, len(order)]
+    starts = np.concatenate([np.arange(g0, g1 - window_size + 1, stride, dtype=np.int64)
+                             for g0, g1 in zip(group_starts, group_ends)] or [np.empty(0, np.int64)])
+
+    sorted_labels = np.asarray(labels)[order]
+    window_labels = (sliding_window_view(sorted_labels, window_size).max(axis=1)[starts]
+                     if len(sorted_labels) >= window_size else np.empty(0, np.int64))
+    end_times = timestamps[local_order][starts + window_size - 1]
+
+    windows = SequenceWindows(path, len(order), embed_dim, starts, window_labels.astype(np.int64), end_times,
+                              window_size)
+    windows.save(directory)
+    return windows
+
+
+class SlidingWindowDataset(Dataset):
+    """
+    Torch view of selected windows. The memmap is opened lazily in each DataLoader worker,
+    so workers share the page cache instead of receiving a pickled copy of the embeddings.
+    """
+
+    def __init__(self, embeddings_path, n_rows, embed_dim, starts, labels, window_size=WINDOW_SIZE):
+        self.embeddings_path = embeddings_path
+        self.n_rows = n_rows
+        self.embed_dim = embed_dim
+        self.starts = starts
+        self.labels = torch.as_tensor(labels, dtype=torch.long)
+        self.window_size = window_size
+        self._embeddings = None
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_embeddings"] = None
+        return state
+
+    def __getitem__(self, idx):
+        if self._embeddings is None:
+            self._embeddings = np.memmap(self.embeddings_path, dtype=np.float32, mode="r",
+                                         shape=(self.n_rows, self.embed_dim))
+        start = self.starts[idx]
+        window = torch.from_numpy(np.array(self._embeddings[start:start + self.window_size]))
+        return window, self.labels[idx]
+
+
+def make_dataloader(dataset, batch_size=64, shuffle=False, num_workers=None):
+    """DataLoader with worker processes reading windows from the shared memmap."""
+    if num_workers is None:
+        num_workers = min(4, os.cpu_count() or 1)
+    return DataLoader(dataset, batch_size=batch_size, shuffle=shuffle, num_workers=num_workers,
+                      persistent_workers=num_workers > 0)
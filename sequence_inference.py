@@ -0,0 +1,169 @@
+from collections import OrderedDict
+
+import numpy as np
+import torch
+
+from sequence_models import EMBED_DIM, WINDOW_SIZE
+
+MAX_ENTITIES = 100000
+INITIAL_CAPACITY = 1024  # ring buffers allocated up front; doubled on demand up to MAX_ENTITIES
+THREAT_CLASS = 1  # label 1 = threat in training2.ipynb
+
+
+def load_sequence_model(path, num_threads=None):
+    """
+    Loads a TorchScript sequence classifier (e.g. lstm_seq_model.pt) for CPU inference,
+    frozen and optimized for inference where the model allows it.
+    """
+    if num_threads:
+        torch.set_num_threads(num_threads)
+    model = torch.jit.load(path, map_location='cpu').eval()
+    try:
+        model = torch.jit.optimize_for_inference(torch.jit.freeze(model))
+    except Exception as e:
+        print(f"Warning: could not freeze sequence model ({e}); using it unoptimized.")
+    return model
+
+
+class EntityRingBuffers:
+    """
+    The last window_size embeddings of each entity (source IP), stored as ring buffers in one
+    (slots, W, D) array that starts at initial_capacity slots and doubles as entities arrive.
+    Once capacity slots are in use the least recently seen entity is evicted.
+    """
+
+    def __init__(self, window_size=WINDOW_SIZE, embed_dim=EMBED_DIM, capacity=MAX_ENTITIES,
+                 initial_capacity=INITIAL_CAPACITY):
+        self.window_size = window_size
+        self.embed_dim = embed_dim
+        self.capacity = capacity
+        allocated = min(initial_capacity, capacity)
+        self.buffers = np.zeros((allocated, window_size, embed_dim), dtype=np.float32)
+        self.counts = np.zeros(allocated, dtype=np.int64)  # events pushed into each slot
+        self.slots = OrderedDict()  # entity -> slot, least recently seen first
+        self.free = list(range(allocated - 1, -1, -1))
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.slots)
+
+    def _grow(self):
+        old = len(self.buffers)
+        new = min(old * 2, self.capacity)
+        self.buffers = np.concatenate(
+            [self.buffers, np.zeros((new - old, self.window_size, self.embed_dim), dtype=np.float32)])
+        self.counts = np.concatenate([self.counts, np.zeros(new - old, dtype=np.int64)])
+        self.free.extend(range(new - 1, old - 1, -1))
+
+    def _slot(self, entity):
+        slot = self.slots.get(entity)
+        if slot is not None:
+            self.slots.move_to_end(entity)
+            return slot
+        if not self.free and len(self.buffers) < self.capacity:
+            self._grow()
+        if self.free:
+            slot = self.free.pop()
+        else:
+            _, slot = self.slots.popitem(last=False)
+            self.evictions += 1
+        self.counts[slot] = 0
+        self.slots[entity] = slot
+        return slot
+
+    def push(self, entity, embedding, out=None):
+        """
+        Appends an embedding; once the entity has window_size events, returns its current
+        window (oldest first), written into out if given. Otherwise returns None.
+        """
+        slot = self._slot(entity)
+        count = self.counts[slot]
+        self.buffers[slot, count % self.window_size] = embedding
+        count += 1
+        self.counts[slot] = count
+        if count < self.window_size:
+            return None
+        # After n pushes the oldest event sits at position n % W
+        order = (count + np.arange(self.window_size)) % self.window_size
+        if out is None:
+            return self.buffers[slot, order]
+        np.take(self.buffers[slot], order, axis=0, out=out)
+        return out
+
+
+class SequenceInferenceEngine:
+    """
+    Online sliding-window scoring with a trained sequence classifier (stride 1, as in training).
+
+    score_batch takes a micro-batch of (entity, embedding) events in arrival order, advances
+    each entity's ring buffer, and scores every window that became complete in a single
+    forward pass under torch.inference_mode.
+    """
+
+    def __init__(self, model, window_size=WINDOW_SIZE, embed_dim=EMBED_DIM, max_entities=MAX_ENTITIES,
+                 threat_class=THREAT_CLASS):
+        self.model = model
+        self.window_size = window_size
+        self.embed_dim = embed_dim
+        self.threat_class = threat_class
+        self.buffers = EntityRingBuffers(window_size, embed_dim, max_entities)
+        self._windows = np.empty((0, window_size, embed_dim), dtype=np.float32)
+        self.windows_scored = 0
+
+    @classmethod
+    def from_path(cls, path, num_threads=None, **kwargs):
+        return cls(load_sequence_model(path, num_threads=num_threads), **kwargs)
+
+    def score_batch(self, entities, embeddings):
+        """
+        Returns threat probabilities aligned with the inputs; NaN for events whose entity
+        has not yet seen window_size events.
+        """
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if len(self._windows) < len(entities):
+            self._windows = np.empty((len(entities), self.window_size, self.embed_dim), dtype=np.float32)
+
+        rows = []
+        for i, (entity, embedding) in enumerate(zip(entities, embeddings)):
+            if self.buffers.push(entity, embedding, out=self._windows[len(rows)]) is not None:
+                rows.append(i)
+
+        scores = np.full(len(entities), np.nan, dtype=np.float32)
+        if rows:
+            with torch.inference_mode():
+                logits = self.model(torch.from_numpy(self._windows[:len(rows)]))
+                scores[rows] = torch.softmax(logits, dim=1)[:, self.threat_class].numpy()
+            self.windows_scored += len(rows)
+        return scores
+
+    def stats(self):
+        return {"entities": len(self.buffers), "windows_scored": self.windows_scored,
+                "evictions": self.buffers.evictions}
+
+
+class SequenceScorer:
+    """
+    Collects (entity, message, payload) events from the orchestrator into micro-batches,
+    embeds each micro-batch in one call and scores it with the engine.
+    """
+
+    def __init__(self, engine, embed_fn, micro_batch_size=256):
+        self.engine = engine
+        self.embed_fn = embed_fn
+        self.micro_batch_size = micro_batch_size
+        self.pending = []
+
+    def submit(self, entity, message, payload):
+        """Queue an event; returns completed (payload, score) pairs once a micro-batch is scored."""
+        self.pending.append((entity, message, payload))
+        if len(self.pending) >= self.micro_batch_size:
+            return self.flush()
+        return []
+
+    def flush(self):
+        if not self.pending:
+            return []
+        entities, messages, payloads = zip(*self.pending)
+        self.pending = []
+        scores = self.engine.score_batch(entities, self.embed_fn(list(messages)))
+        return [(payload, None if np.isnan(score) else float(score)) for payload, score in zip(payloads, scores)]
@@ -0,0 +1,46 @@
+import torch
+import torch.nn as nn
+
+WINDOW_SIZE = 8  # number of events per sequence (tuned in training2.ipynb)
+EMBED_DIM = 384  # all-MiniLM-L6-v2
+
+
+class LSTMClassifier(nn.Module):
+    def __init__(self, embed_dim, hidden_dim=128, num_layers=2, num_classes=2, dropout=0.2):
+        super().__init__()
+        self.lstm = nn.LSTM(input_size=embed_dim, hidden_size=hidden_dim, num_layers=num_layers, batch_first=True, dropout=dropout, bidirectional=True)
+        self.fc = nn.Linear(hidden_dim*2, num_classes)
+
+    def forward(self, x):
+        # x: (B, W, D)
+        out, _ = self.lstm(x)
+        last = out[:, -1, :]
+        return self.fc(last)
+
+
+class TransformerSeqClassifier(nn.Module):
+    def __init__(self, embed_dim, nhead=8, dim_feedforward=256, num_layers=2, num_classes=2, dropout=0.1):
+        super().__init__()
+        encoder_layer = nn.TransformerEncoderLayer(d_model=embed_dim, nhead=nhead, dim_feedforward=dim_feedforward, dropout=dropout, batch_first=True)
+        self.transformer = nn.TransformerEncoder(encoder_layer, num_layers=num_layers)
+        self.pool = nn.AdaptiveAvgPool1d(1)  # will apply to (B, D, W)
+        self.fc = nn.Linear(embed_dim, num_classes)
+
+    def forward(self, x):
+        # x: (B, W, D)
+        out = self.transformer(x)  # (B, W, D)
+        # pool across time
+        out = out.transpose(1, 2)  # (B, D, W)
+        pooled = self.pool(out).squeeze(-1)  # (B, D)
+        return self.fc(pooled)
+
+
+def export_torchscript(model, path, window_size=WINDOW_SIZE, embed_dim=EMBED_DIM):
+    """Traces a trained sequence classifier on CPU and saves it for the inference engine."""
+    model = model.to('cpu').eval()
+    example_input = torch.randn(2, window_size, embed_dim)
+    with torch.no_grad():
+        traced = torch.jit.trace(model, example_input)
+    traced.save(path)
+    print(f"Saved TorchScript model: {path}")
+    return traced
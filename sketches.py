@@ -0,0 +1,197 @@
+import hashlib
+import heapq
+
+import numpy as np
+
+CMS_WIDTH = 1 << 16
+CMS_DEPTH = 4  # 4 x 65536 uint32 counters = 1 MiB; overestimate <= e/width * total with prob 1 - e^-depth
+HLL_PRECISION = 14  # 16384 one-byte registers, ~0.8% standard error
+SOURCE_HLL_PRECISION = 10  # per top talker: 1024 registers, ~3% standard error
+TOP_K = 20
+
+
+def hash64(key) -> int:
+    """Stable 64-bit hash (unlike hash(), identical in every worker process, so shards can merge)."""
+    return int.from_bytes(hashlib.blake2b(str(key).encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class CountMinSketch:
+    """Approximate per-key counts in a fixed depth x width counter matrix; never underestimates."""
+
+    def __init__(self, width=CMS_WIDTH, depth=CMS_DEPTH):
+        self.width = width
+        self.depth = depth
+        self.counts = np.zeros((depth, width), dtype=np.uint32)
+        self.total = 0
+        self._rows = np.arange(depth)
+
+    def _columns(self, h):
+        # Double hashing: depth independent-enough columns from one 64-bit hash
+        h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1
+        return [(h1 + i * h2) % self.width for i in range(self.depth)]
+
+    def add(self, key, count=1, h=None):
+        """Adds count to key; returns the key's updated estimate."""
+        columns = self._columns(hash64(key) if h is None else h)
+        self.counts[self._rows, columns] += count
+        self.total += count
+        return int(self.counts[self._rows, columns].min())
+
+    def estimate(self, key, h=None):
+        return int(self.counts[self._rows, self._columns(hash64(key) if h is None else h)].min())
+
+    def merge(self, other):
+        if (self.width, self.depth) != (other.width, other.depth):
+            raise ValueError(f"Cannot merge Count-Min sketches of shape {self.counts.shape} and {other.counts.shape}")
+        self.counts += other.counts
+        self.total += other.total
+        return self
+
+
+class HyperLogLog:
+    """Approximate number of distinct keys in 2^precision one-byte registers."""
+
+    def __init__(self, precision=HLL_PRECISION):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def add(self, key, h=None):
+        h = hash64(key) if h is None else h
+        index = h >> (64 - self.precision)
+        rest = h & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def count(self) -> int:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.power(2.0, -self.registers.astype(np.float64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * np.log(m / zeros)  # linear counting for small cardinalities
+        return int(round(estimate))
+
+    def merge(self, other):
+        if self.precision != other.precision:
+            raise ValueError(f"Cannot merge HyperLogLogs of precision {self.precision} and {other.precision}")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+
+class TopK:
+    """
+    The k keys with the highest Count-Min estimates seen so far. A min-heap with lazy deletion
+    keeps the smallest tracked estimate at the top; stale heap entries are refreshed on pop.
+    """
+
+    def __init__(self, k=TOP_K):
+        self.k = k
+        self.counts = {}  # tracked key -> latest estimate
+        self._heap = []
+
+    def __contains__(self, key):
+        return key in self.counts
+
+    def update(self, key, estimate):
+        """Tracks key if it is now a top-k key; returns the key it displaced (or None)."""
+        if key in self.counts:
+            self.counts[key] = estimate
+            return None
+        if len(self.counts) < self.k:
+            self.counts[key] = estimate
+            heapq.heappush(self._heap, (estimate, key))
+            return None
+        while True:
+            smallest, smallest_key = self._heap[0]
+            if self.counts[smallest_key] == smallest:
+                break
+            heapq.heapreplace(self._heap, (self.counts[smallest_key], smallest_key))
+        if estimate <= smallest:
+            return None
+        heapq.heapreplace(self._heap, (estimate, key))
+        del self.counts[smallest_key]
+        self.counts[key] = estimate
+        return smallest_key
+
+    def items(self):
+        return sorted(self.counts.items(), key=lambda item: item[1], reverse=True)
+
+
+class TrafficSketch:
+    """
+    Fixed-memory traffic statistics over the log stream (about 1.1 MiB by default): top talkers
+    by request count (Count-Min + top-k), distinct source IPs and URLs (HyperLogLog), and the
+    distinct URLs requested by each top talker. Sketches built by separate workers over shards
+    of the logs can be combined with merge().
+
+    A source's URL sketch starts when it enters the top k, so for sources that climbed into it
+    late the distinct-URL figure is a lower bound.
+    """
+
+    def __init__(self, k=TOP_K, cms_width=CMS_WIDTH, cms_depth=CMS_DEPTH, hll_precision=HLL_PRECISION,
+                 source_hll_precision=SOURCE_HLL_PRECISION):
+        self.source_counts = CountMinSketch(cms_width, cms_depth)
+        self.top_sources = TopK(k)
+        self.distinct_sources = HyperLogLog(hll_precision)
+        self.distinct_urls = HyperLogLog(hll_precision)
+        self.source_hll_precision = source_hll_precision
+        self.source_urls = {}  # top-k source -> HyperLogLog of its URLs
+
+    def update(self, log: dict):
+        source_ip = log.get("source.ip")
+        url = log.get("url.original")
+        url_hash = hash64(url) if url else None
+        if url_hash is not None:
+            self.distinct_urls.add(url, h=url_hash)
+        if not source_ip:
+            return
+        h = hash64(source_ip)
+        self.distinct_sources.add(source_ip, h=h)
+        displaced = self.top_sources.update(source_ip, self.source_counts.add(source_ip, h=h))
+        if displaced is not None:
+            self.source_urls.pop(displaced, None)
+        if url_hash is not None and source_ip in self.top_sources:
+            if source_ip not in self.source_urls:
+                self.source_urls[source_ip] = HyperLogLog(self.source_hll_precision)
+            self.source_urls[source_ip].add(url, h=url_hash)
+
+    def merge(self, other):
+        """Folds another shard's sketch into this one (sketches must have the same sizes)."""
+        self.source_counts.merge(other.source_counts)
+        self.distinct_sources.merge(other.distinct_sources)
+        self.distinct_urls.merge(other.distinct_urls)
+        source_urls = {}
+        for sketches in (self.source_urls, other.source_urls):
+            for source_ip, hll in sketches.items():
+                if source_ip in source_urls:
+                    source_urls[source_ip].merge(hll)
+                else:
+                    source_urls[source_ip] = HyperLogLog(hll.precision).merge(hll)
+        # Re-rank the candidates of both shards against the merged counts
+        top_sources = TopK(self.top_sources.k)
+        for source_ip in set(self.top_sources.counts) | set(other.top_sources.counts):
+            top_sources.update(source_ip, self.source_counts.estimate(source_ip))
+        self.top_sources = top_sources
+        self.source_urls = {ip: hll for ip, hll in source_urls.items() if ip in top_sources}
+        return self
+
+    def summary(self):
+        return {
+            "total_requests": self.source_counts.total,
+            "distinct_source_ips": self.distinct_sources.count(),
+            "distinct_urls": self.distinct_urls.count(),
+            "top_sources": [
+                {
+                    "source.ip": source_ip,
+                    "requests": count,
+                    "distinct_urls": self.source_urls[source_ip].count() if source_ip in self.source_urls else 0,
+                }
+                for source_ip, count in self.top_sources.items()
+            ],
+        }
+
+    def memory_bytes(self):
+        return (self.source_counts.counts.nbytes + self.distinct_sources.registers.nbytes
+                + self.distinct_urls.registers.nbytes
+                + sum(hll.registers.nbytes for hll in self.source_urls.values()))
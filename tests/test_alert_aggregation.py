@@ -0,0 +1,142 @@
+import os
+import sys
+
+import pytest
+
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+pytest.importorskip("numpy")
+
+from alert_aggregation import AlertAggregator
+
+
+def threat(second, ip="203.0.113.9", url="/admin/config.php?id=1", rule="Suspicious 404 Patterns"):
+    minutes, seconds = divmod(second, 60)
+    hours, minutes = divmod(minutes, 60)
+    log = {"@timestamp": f"2025-06-14T{hours:02d}:{minutes:02d}:{seconds:02d}", "source.ip": ip, "url.original": url}
+    return {"classification": "THREAT", "rule_name": rule, "confidence_score": 0.8, "log_context": log}
+
+
+def test_scanner_results_collapse_into_one_aggregate():
+    aggregator = AlertAggregator(max_exemplars=3)
+    new_flags = [aggregator.add(threat(s, url=f"/admin/config{s}.php?id={s}"))[1] for s in range(1000)]
+
+    assert new_flags[0] and not any(new_flags[1:])
+    (aggregate,) = aggregator.aggregates
+    assert aggregate["count"] == 1000
+    assert aggregate["target_template"] == "/admin/config<NUM>.php?id=<NUM>"
+    assert aggregate["first_seen"] == "2025-06-14T00:00:00" and aggregate["last_seen"] == "2025-06-14T00:16:39"
+    assert len(aggregate["exemplars"]) == 3 and aggregate["log_context"] is aggregate["exemplars"][0]
+
+
+def test_aggregates_split_by_rule_source_and_window():
+    aggregator = AlertAggregator(window_seconds=3600)
+    for s in range(10):
+        aggregator.add(threat(s))
+        aggregator.add(threat(s, ip="198.51.100.1"))
+        aggregator.add(threat(s, rule="Directory Traversal Attempt"))
+    aggregator.add(threat(4000))  # a later window of the first group
+    aggregator.add({"classification": "UNCLASSIFIED", "rule_name": None, "confidence_score": 0.2,
+                    "log_context": {"@timestamp": "2025-06-14T00:00:00", "message": "session opened for user 42"}})
+
+    counts = [(a["rule_name"], a["log_context"].get("source.ip"), a["count"]) for a in aggregator.aggregates]
+    assert counts == [
+        ("Suspicious 404 Patterns", "203.0.113.9", 10),
+        ("Suspicious 404 Patterns", "198.51.100.1", 10),
+        ("Directory Traversal Attempt", "203.0.113.9", 10),
+        ("Suspicious 404 Patterns", "203.0.113.9", 1),
+        (None, None, 1),
+    ]
+    assert aggregator.aggregates[-1]["target_template"] == "session opened for user <NUM>"
+
+
+def test_report_counts_logs_behind_aggregates(tmp_path, monkeypatch):
+    import orchestrator
+
+    aggregator = AlertAggregator()
+    for s in range(500):
+        aggregator.add(threat(s))
+    monkeypatch.setattr(orchestrator, "REPORT_FILENAME", str(tmp_path / "report.md"))
+    monkeypatch.setattr(orchestrator, "REPORT_JSON_FILENAME", str(tmp_path / "report.json"))
+    orchestrator.generate_security_report(aggregator.aggregates)
+
+    report = (tmp_path / "report.md").read_text()
+    assert "**Total Logs Analyzed:** 500 (1 aggregated results)" in report
+    assert "| Suspicious 404 Patterns       | 500   | 500       | 0        |" in report
+    assert "`/admin/config.php?id=<NUM>` | 500" in report
+
+
+def test_closed_aggregates_are_handed_off_and_dropped():
+    closed = []
+    aggregator = AlertAggregator(window_seconds=60, expire_every=10**9, on_close=closed.append)
+    first, _ = aggregator.add(threat(0))
+    pending, _ = aggregator.add(threat(0, ip="198.51.100.1"))
+    pending["pending_judgements"] = 1  # a Tier 2 result is still in flight
+    current, _ = aggregator.add(threat(100, ip="192.0.2.7"))
+
+    now = current["first_seen_ts"]
+    aggregator.expire(now)
+    assert closed == [first]
+    assert aggregator.aggregates == [pending, current]
+
+    pending["pending_judgements"] = 0
+    aggregator.expire(now + 1)
+    assert closed == [first, pending] and aggregator.aggregates == [current]
+    assert aggregator.stats() == {"results": 3, "aggregates": 3, "open": 1, "closed": 2}
+
+
+def test_new_message_template_of_an_aggregate_is_judged(tmp_path, monkeypatch):
+    import json
+    import orchestrator
+
+    monkeypatch.setattr(orchestrator, "ROLLUP_DB_PATH", "")
+    monkeypatch.setattr(orchestrator, "REPORT_FILENAME", str(tmp_path / "report.md"))
+    monkeypatch.setattr(orchestrator, "REPORT_JSON_FILENAME", str(tmp_path / "report.json"))
+    escalated = []
+
+    def analyze(log):
+        escalated.append(log["message"])
+        severity = "High" if "stack trace" in log["message"] else "Low"
+        return {"classification": "Anomaly", "severity": severity, "hypothesis": "-", "recommended_action": "-"}
+
+    monkeypatch.setattr(orchestrator, "analyze_log_with_llm", analyze)
+    monkeypatch.setattr(orchestrator, "should_escalate_to_llm", lambda log, novelty=None: True)
+    session = orchestrator.TriageSession()
+    session.tier2_batcher = session.sequence_scorer = None
+    session.aggregator.expire_every = 1
+
+    def web(second, query, message, ip="203.0.113.9"):
+        return {"@timestamp": f"2025-06-14T0{second // 3600}:00:{second % 60:02d}", "source.ip": ip,
+                "url.original": f"/search?q={query}", "message": message}
+
+    for q in range(3):
+        session.process(web(q, q, f"GET /search?q={q} HTTP/1.1 200"))
+    session.process(web(3, 7, "GET /search?q=7 HTTP/1.1 500 stack trace in handler"))
+    _, aggregate = session.process(web(4, 8, "GET /search?q=8 HTTP/1.1 500 stack trace in handler"))
+    assert aggregate["count"] == 5
+    assert escalated == ["GET /search?q=0 HTTP/1.1 200", "GET /search?q=7 HTTP/1.1 500 stack trace in handler"]
+
+    session.process(web(7200, 1, "GET /search?q=1 HTTP/1.1 200", ip="198.51.100.1"))  # closes the first window
+    assert aggregate not in session.aggregator.aggregates
+    session.report()
+
+    summary = json.loads((tmp_path / "report.json").read_text())
+    assert summary["total_logs"] == 6 and summary["aggregated_results"] == 2
+    (alert,) = summary["llm_alerts"]
+    assert alert["severity"] == "High" and alert["count"] == 5
+    assert alert["message"] == "GET /search?q=7 HTTP/1.1 500 stack trace in handler"
+
+
+def test_report_accepts_plain_per_log_results(tmp_path, monkeypatch):
+    import orchestrator
+
+    monkeypatch.setattr(orchestrator, "REPORT_FILENAME", str(tmp_path / "report.md"))
+    monkeypatch.setattr(orchestrator, "REPORT_JSON_FILENAME", str(tmp_path / "report.json"))
+    orchestrator.generate_security_report([threat(s) for s in range(3)])
+
+    report = (tmp_path / "report.md").read_text()
+    assert "**Total Logs Analyzed:** 3 (3 aggregated results)" in report
+    assert "`/admin/config.php?id=1` | 1     | 2025-06-14T00:00:00 | 2025-06-14T00:00:00 |" in report
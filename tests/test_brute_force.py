@@ -0,0 +1,90 @@
+import os
+import sys
+
+import pytest
+
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+pytest.importorskip("numpy")
+
+from brute_force import BRUTE_FORCE, DISTRIBUTED_BRUTE_FORCE, PASSWORD_SPRAY, BruteForceDetector
+from ingestion.normalizer import LogNormalizer
+from ingestion.parser import LogParser
+
+
+def failure(second, ip, user):
+    hours, rest = divmod(second, 3600)
+    minutes, seconds = divmod(rest, 60)
+    return {"@timestamp": f"2025-06-14T{hours:02d}:{minutes:02d}:{seconds:02d}",
+            "event.type": "authentication_failure", "source.ip": ip, "user.name": user}
+
+
+def run(detector, logs):
+    return [campaign for log in logs for campaign in detector.process(log)]
+
+
+def test_sshd_failed_password_lines_become_authentication_failures(tmp_path):
+    path = tmp_path / "auth.log"
+    path.write_text(
+        "Jun 14 15:16:01 combo sshd[19939]: Failed password for invalid user admin from 203.0.113.4 port 22 ssh2\n"
+        "Jun 14 15:16:09 combo sshd[19940]: Accepted password for alice from 198.51.100.2 port 22 ssh2\n"
+    )
+    failed, accepted = LogNormalizer().normalize_logs_to_ecs(LogParser().load_file(str(path)))
+    assert failed["event.type"] == "authentication_failure"
+    assert (failed["user.name"], failed["source.ip"], failed["host.name"]) == ("admin", "203.0.113.4", "combo")
+    assert accepted["event.type"] == "authentication_success" and accepted["user.name"] == "alice"
+
+
+def test_one_campaign_per_brute_force_burst():
+    detector = BruteForceDetector()
+    campaigns = run(detector, [failure(s, "203.0.113.4", "root") for s in range(500)])
+
+    assert len(campaigns) == 1
+    assert campaigns[0]["rule_name"] == BRUTE_FORCE and campaigns[0]["entity"] == "203.0.113.4"
+    assert campaigns[0]["failures"] == 500 and campaigns[0]["users"] == {"root"}
+    assert detector.folded == 490
+
+    # The same IP returning after the campaign went quiet starts a new one
+    later = run(detector, [failure(10000 + s, "203.0.113.4", "root") for s in range(20)])
+    assert len(later) == 1
+
+
+def test_password_spray_from_one_ip():
+    users = [f"user{i}" for i in range(30)]
+    campaigns = run(BruteForceDetector(), [failure(s, "203.0.113.4", users[s % 30]) for s in range(60)])
+
+    assert [c["rule_name"] for c in campaigns] == [PASSWORD_SPRAY]
+    assert len(campaigns[0]["users"]) == 30 and campaigns[0]["failures"] == 60
+
+
+def test_distributed_attack_on_one_account():
+    campaigns = run(BruteForceDetector(), [failure(s, f"10.0.0.{s % 25}", "admin") for s in range(50)])
+
+    assert [(c["rule_name"], c["entity_field"], c["entity"]) for c in campaigns] == \
+        [(DISTRIBUTED_BRUTE_FORCE, "user.name", "admin")]
+    assert len(campaigns[0]["source_ips"]) == 25
+
+
+def test_sparse_failures_do_not_open_campaigns():
+    # One failure every two minutes stays below every threshold of the ten minute window
+    logs = [failure(s, "203.0.113.4", "root") for s in range(0, 7200, 120)]
+    logs.append({"@timestamp": "2025-06-14T00:00:00", "event.type": "authentication_success",
+                 "source.ip": "203.0.113.4", "user.name": "root"})
+    detector = BruteForceDetector()
+    assert run(detector, logs) == []
+    assert detector.events == 60
+
+
+def test_last_campaigns_covers_only_failures_inside_a_campaign():
+    detector = BruteForceDetector()
+    covered = []
+    for second in range(30):
+        detector.process(failure(second, "203.0.113.4", "root"))
+        covered.append(bool(detector.last_campaigns))
+    assert covered == [False] * 9 + [True] * 21  # the tenth failure opens the campaign
+    detector.process({"@timestamp": "2025-06-14T00:01:00", "event.type": "authentication_success",
+                      "source.ip": "203.0.113.4", "user.name": "root"})
+    assert detector.last_campaigns == []
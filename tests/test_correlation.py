@@ -0,0 +1,53 @@
+import os
+import sys
+
+import pytest
+
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+pytest.importorskip("numpy")
+
+from correlation import CorrelationEngine, SlidingWindowCounter
+
+
+def access_log(second, ip="203.0.113.9", status=404):
+    minutes, seconds = divmod(second, 60)
+    return {"@timestamp": f"2025-06-14T10:{minutes:02d}:{seconds:02d}", "source.ip": ip,
+            "http.response.status_code": status}
+
+
+def test_high_volume_4xx_fires_once_per_window_per_ip():
+    engine = CorrelationEngine()
+    alerts = [a for s in range(25) for a in engine.process(access_log(s))]
+    alerts += [a for s in range(25) for a in engine.process(access_log(s, ip="198.51.100.1", status=200))]
+
+    assert [(a["rule_name"], a["entity"], a["count"]) for a in alerts] == \
+        [("High-Volume 4xx Errors", "203.0.113.9", 20)]
+    # A new burst in a later window alerts again
+    later = [a for s in range(300, 330) for a in engine.process(access_log(s))]
+    assert len(later) == 1
+
+
+def test_events_outside_the_window_do_not_accumulate():
+    engine = CorrelationEngine()
+    # One 4xx every 5 seconds: at most 12 in any 60s window, below the threshold of 20
+    alerts = [a for s in range(0, 600, 5) for a in engine.process(access_log(s))]
+    assert alerts == []
+
+
+def test_counter_expires_idle_entities_and_bounds_memory():
+    counter = SlidingWindowCounter(window_seconds=60, max_entities=100, initial_capacity=8)
+    for i in range(100):
+        counter.add(f"ip{i}", ts=0)
+    assert len(counter) == 100 and len(counter.counts) == 100
+
+    counter.add("late", ts=1000)  # full: idle entities are expired before anything is evicted
+    assert counter.expired == 100 and counter.evictions == 0 and len(counter) == 1
+
+    for i in range(150):
+        counter.add(f"burst{i}", ts=1001)
+    assert len(counter) == 100 and counter.evictions == 51
+    assert len(counter.counts) == 100
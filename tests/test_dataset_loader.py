@@ -0,0 +1,70 @@
+import os
+import sys
+
+import pytest
+
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, ".."))
+DETECTION_DIR = os.path.join(PROJECT_ROOT, "detection")
+if DETECTION_DIR not in sys.path:
+    sys.path.insert(0, DETECTION_DIR)
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+pytest.importorskip("pyarrow")
+
+import dataset_loader
+from dataset_loader import load_cicids_dataset
+
+CSV_HEADER = " Destination Port, Flow Bytes/s, Idle Mean, Label\n"
+
+
+def _write_csvs(data_dir):
+    data_dir.mkdir()
+    (data_dir / "monday.csv").write_text(
+        CSV_HEADER + "80,Infinity,1.5,BENIGN\n443,NaN,2.5,BENIGN\n22,10.0,,SSH-Patator\n"
+    )
+    (data_dir / "tuesday.csv").write_text(
+        CSV_HEADER + "21,bad-value,3.0,FTP-Patator\n80,5.0,4.0,DDoS\n"
+    )
+
+
+def test_loader_cleans_with_compact_dtypes(tmp_path):
+    data_dir = tmp_path / "CICIDS"
+    _write_csvs(data_dir)
+
+    df = load_cicids_dataset(str(data_dir), cache_dir=str(tmp_path / "cache"), chunksize=2)
+
+    assert len(df) == 5
+    assert list(df.columns) == ["Destination Port", "Flow Bytes/s", "Idle Mean", "Label"]
+    assert df["Destination Port"].dtype == np.int32
+    assert df["Flow Bytes/s"].dtype == np.float32
+    assert isinstance(df["Label"].dtype, pd.CategoricalDtype)
+    assert np.isfinite(df[["Flow Bytes/s", "Idle Mean"]].to_numpy()).all()
+    assert df["Flow Bytes/s"].tolist() == [0.0, 0.0, 10.0, 0.0, 5.0]
+
+
+def test_loader_reuses_parquet_cache(tmp_path, monkeypatch):
+    data_dir = tmp_path / "CICIDS"
+    _write_csvs(data_dir)
+    cache_dir = str(tmp_path / "cache")
+    first = load_cicids_dataset(str(data_dir), cache_dir=cache_dir)
+
+    def fail_if_called(*args, **kwargs):
+        raise AssertionError("CSV files should not be re-parsed when the cache is valid")
+
+    monkeypatch.setattr(dataset_loader, "_iter_clean_chunks", fail_if_called)
+    second = load_cicids_dataset(str(data_dir), cache_dir=cache_dir)
+    pd.testing.assert_frame_equal(first, second)
+
+
+def test_non_numeric_value_in_a_later_chunk_does_not_duplicate_rows(tmp_path):
+    data_dir = tmp_path / "CICIDS"
+    data_dir.mkdir()
+    rows = [f"{port},{port}.5,1.0,BENIGN\n" for port in range(10)] + ["99,oops,1.0,DDoS\n"]
+    (data_dir / "wednesday.csv").write_text(CSV_HEADER + "".join(rows))
+
+    df = load_cicids_dataset(str(data_dir), cache_dir=str(tmp_path / "cache"), chunksize=4)
+
+    assert df["Destination Port"].tolist() == list(range(10)) + [99]
+    assert df["Flow Bytes/s"].tolist()[-1] == 0.0
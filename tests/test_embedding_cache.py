@@ -0,0 +1,78 @@
+import os
+import sys
+
+import pytest
+
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+np = pytest.importorskip("numpy")
+
+from embedding_cache import EmbeddingCache
+from ingestion.templating import template_message
+
+
+def test_template_masks_variable_tokens():
+    assert template_message("Failed password for root from 10.0.0.7 port 51234 ssh2") == \
+        "Failed password for root from <IP> port <NUM> ssh<NUM>"
+    assert template_message("GET /api/item/550e8400-e29b-41d4-a716-446655440000 from fe80::1") == \
+        "GET /api/item/<UUID> from <IP>"
+    assert template_message("sshd[4242]: buffer at 0x7ffd3a pid 17") == "sshd[<NUM>]: buffer at <HEX> pid <NUM>"
+
+
+class CountingEncoder:
+    def __init__(self, dim):
+        self.dim = dim
+        self.encoded = []
+
+    def __call__(self, texts):
+        self.encoded.extend(texts)
+        return np.array([[len(text) + i for i in range(self.dim)] for text in texts], dtype=np.float32)
+
+
+def test_each_template_is_embedded_once_and_persisted(tmp_path):
+    encoder = CountingEncoder(dim=4)
+    cache = EmbeddingCache(str(tmp_path), dim=4, initial_capacity=2)
+    messages = [f"Connection from 192.168.1.{i} port {1000 + i}" for i in range(50)] + ["service restarted"] * 3
+
+    embeddings = cache.embed(messages, encoder)
+
+    assert embeddings.shape == (53, 4)
+    assert sorted(encoder.encoded) == ["Connection from <IP> port <NUM>", "service restarted"]
+    assert np.array_equal(embeddings[0], embeddings[49])
+
+    more_templates = [f"user{i} logged out" for i in range(5)]
+    cache.embed(more_templates, encoder)
+    assert len(cache) == 3
+
+    reopened = EmbeddingCache(str(tmp_path), dim=4)
+    assert len(reopened) == 3
+    second_encoder = CountingEncoder(dim=4)
+    again = reopened.embed(messages[:2], second_encoder)
+    assert second_encoder.encoded == []
+    assert np.array_equal(again, embeddings[:2])
+
+
+def test_cache_rejects_different_model(tmp_path):
+    EmbeddingCache(str(tmp_path), dim=4, model_name="model-a")
+    with pytest.raises(ValueError):
+        EmbeddingCache(str(tmp_path), dim=8, model_name="model-a")
+
+
+def test_caches_sharing_a_directory_never_hand_out_a_row_twice(tmp_path):
+    first = EmbeddingCache(str(tmp_path), dim=4, initial_capacity=2)
+    second = EmbeddingCache(str(tmp_path), dim=4, initial_capacity=2)  # e.g. the sequence scorer or a refit
+    first_encoder, second_encoder = CountingEncoder(dim=4), CountingEncoder(dim=4)
+
+    first.embed(["service restarted", "user1 logged out"], first_encoder)
+    shared = second.embed(["disk full on /dev/sda1", "user7 logged out", "cron job started"], second_encoder)
+    assert second_encoder.encoded == ["disk full on /dev/sda<NUM>", "cron job started"]  # picked up first's row
+    again = first.embed(["cron job started", "disk full on /dev/sda2", "service restarted"], first_encoder)
+    assert first_encoder.encoded == ["service restarted", "user<NUM> logged out"]
+
+    reopened = EmbeddingCache(str(tmp_path), dim=4)
+    assert len(reopened) == 4 and sorted(reopened.index.values()) == [0, 1, 2, 3]
+    assert np.array_equal(reopened.embed(["cron job started"], CountingEncoder(dim=4))[0], shared[2])
+    assert np.array_equal(again[1], shared[0])
@@ -0,0 +1,94 @@
+import os
+import sys
+from datetime import datetime
+
+import pytest
+
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+pytest.importorskip("numpy")
+
+from event_store import EventStore
+
+
+def event(i):
+    hours, rest = divmod(i * 10, 3600)
+    minutes, seconds = divmod(rest, 60)
+    log = {"@timestamp": f"2025-06-14T{hours:02d}:{minutes:02d}:{seconds:02d}", "source.ip": f"10.0.0.{i % 5}",
+           "url.original": f"/product/{i}", "message": f"event {i}"}
+    if i % 10 == 0:
+        log["user.name"] = "root"
+    return log
+
+
+def epoch(value):
+    return datetime.fromisoformat(value).timestamp()
+
+
+def fill(directory, n=2000, segment_max_events=300):
+    store = EventStore(directory, segment_max_events=segment_max_events)
+    for i in range(n):
+        store.append(event(i), "Suspicious 404 Patterns" if i % 100 == 0 else None)
+    return store
+
+
+def test_queries_by_ip_time_user_url_and_rule(tmp_path):
+    store = fill(str(tmp_path))
+    assert len(store.manifest["segments"]) == 6 and len(store.active) == 200
+
+    last_hour = store.query(source_ip="10.0.0.3", start=epoch("2025-06-14T04:00:00"), end=epoch("2025-06-14T05:00:00"))
+    assert [e["message"] for e in last_hour] == [f"event {i}" for i in range(1440, 1800) if i % 5 == 3]
+
+    assert len(store.query(user="root")) == 200
+    assert len(store.query(user="root", source_ip="10.0.0.0")) == 200
+    assert store.query(user="root", source_ip="10.0.0.1") == []
+    # URLs are matched by template
+    assert len(store.query(url="/product/999999")) == 2000
+    assert [e["message"] for e in store.query(rule="Suspicious 404 Patterns", limit=3)] == ["event 0", "event 100", "event 200"]
+    assert store.query(source_ip="192.0.2.1") == []
+    store.close()
+
+
+def test_reopen_reindexes_active_segment_and_drops_torn_line(tmp_path):
+    fill(str(tmp_path), n=1000).close()
+    active = os.path.join(str(tmp_path), "segment_000004.jsonl")
+    with open(active, "ab") as f:
+        f.write(b'{"@timestamp": "2025-06-14T')  # crash mid-write
+
+    store = EventStore(str(tmp_path), segment_max_events=300)
+    assert len(store) == 1000
+    store.append(event(1000))
+    assert [e["message"] for e in store.query(source_ip="10.0.0.0", start=epoch("2025-06-14T02:45:50"))] == \
+        ["event 995", "event 1000"]
+    store.close()
+
+
+def test_reopen_after_a_crash_between_sealing_and_saving_the_manifest(tmp_path):
+    directory = str(tmp_path)
+    store = fill(directory, n=600)
+    store.close()
+    # Roll back to the state of a crash after segment 2 was sealed but before the manifest listed it
+    store.manifest["segments"].pop()
+    store._save_manifest()
+    os.remove(os.path.join(directory, "segment_000003.jsonl"))
+    assert os.path.exists(os.path.join(directory, "segment_000002.index.npz"))
+
+    store = EventStore(directory, segment_max_events=300)
+    assert [s["id"] for s in store.manifest["segments"]] == [1, 2] and len(store.active) == 0
+    store.append(event(600))
+    assert len(store) == 601
+    assert [e["message"] for e in store.query(source_ip="10.0.0.0", start=epoch("2025-06-14T01:38:20"))] == \
+        ["event 590", "event 595", "event 600"]
+    store.close()
+
+
+def test_time_range_skips_segments(tmp_path):
+    store = fill(str(tmp_path))
+    start = epoch("2025-06-14T05:00:00")
+    segments = list(store._segments(start, None))
+    assert [s.segment_id for s in segments] == [7]  # segment 6 ends at 04:59:50
+    assert [e["message"] for e in store.query(start=start, limit=2)] == ["event 1800", "event 1801"]
+    store.close()
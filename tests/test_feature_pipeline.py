@@ -0,0 +1,61 @@
+import os
+import sys
+
+import pytest
+
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, ".."))
+DETECTION_DIR = os.path.join(PROJECT_ROOT, "detection")
+if DETECTION_DIR not in sys.path:
+    sys.path.insert(0, DETECTION_DIR)
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+pytest.importorskip("sklearn")
+
+import feature_pipeline
+from feature_pipeline import UNSWFeaturePipeline
+
+
+def _make_frame(n_rows, seed):
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame({
+        "proto": rng.choice(["tcp", "udp", "icmp"], size=n_rows),
+        "state": rng.choice(["FIN", "INT", "CON"], size=n_rows),
+        "sbytes": rng.integers(0, 10000, size=n_rows),
+        "dur": rng.random(n_rows) * 10,
+    })
+    y = ((X["proto"] == "udp") | (X["sbytes"] > 8000)).astype(int)
+    return X, y
+
+
+def test_pipeline_handles_unseen_categories_and_selects_k(tmp_path):
+    X_train, y_train = _make_frame(300, 0)
+    X_test, _ = _make_frame(50, 1)
+    X_test.loc[0, "proto"] = "sctp"
+
+    pipeline = UNSWFeaturePipeline(k=5, mi_sample_size=100, cache_dir=str(tmp_path))
+    train_matrix = pipeline.fit_transform(X_train, y_train)
+    test_matrix = pipeline.transform(X_test)
+
+    assert train_matrix.shape == (300, 5)
+    assert test_matrix.shape == (50, 5)
+    assert len(pipeline.selected_features_) == 5
+    assert "proto_udp" in pipeline.feature_names_
+
+    restored_path = str(tmp_path / "pipeline.joblib")
+    pipeline.save(restored_path)
+    restored = UNSWFeaturePipeline.load(restored_path)
+    assert np.allclose(restored.transform(X_test), test_matrix)
+
+
+def test_pipeline_reuses_cached_mutual_information(tmp_path, monkeypatch):
+    X_train, y_train = _make_frame(200, 2)
+    first = UNSWFeaturePipeline(k=4, cache_dir=str(tmp_path)).fit_transform(X_train, y_train)
+
+    def fail_if_called(*args, **kwargs):
+        raise AssertionError("mutual information should come from the cache")
+
+    monkeypatch.setattr(feature_pipeline.UNSWFeaturePipeline, "_mutual_information", fail_if_called)
+    second = UNSWFeaturePipeline(k=4, cache_dir=str(tmp_path)).fit_transform(X_train, y_train)
+    assert np.allclose(first, second)
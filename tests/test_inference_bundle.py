@@ -0,0 +1,46 @@
+import os
+import sys
+
+import pytest
+
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, ".."))
+DETECTION_DIR = os.path.join(PROJECT_ROOT, "detection")
+if DETECTION_DIR not in sys.path:
+    sys.path.insert(0, DETECTION_DIR)
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+xgboost = pytest.importorskip("xgboost")
+from sklearn.preprocessing import LabelEncoder
+
+from inference_bundle import CORE_FEATURES, load_inference_bundle, save_inference_bundle
+
+
+def _train_small_model():
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.random((120, len(CORE_FEATURES))), columns=CORE_FEATURES)
+    labels = np.where(X['Flow Bytes/s'] > 0.66, 'DDoS', np.where(X['Flow Bytes/s'] > 0.33, 'PortScan', 'BENIGN'))
+    le = LabelEncoder()
+    y = le.fit_transform(labels)
+    model = xgboost.XGBClassifier(n_estimators=5, max_depth=2)
+    model.fit(X, y)
+    return model, le, X
+
+
+def test_bundle_round_trip_matches_model(tmp_path):
+    model, le, X = _train_small_model()
+    save_inference_bundle(str(tmp_path), model, le, CORE_FEATURES)
+
+    bundle = load_inference_bundle(str(tmp_path))
+    labels, confidence = bundle.predict(X)
+
+    expected = le.inverse_transform(model.predict(X))
+    assert list(labels) == list(expected)
+    assert np.allclose(confidence, model.predict_proba(X).max(axis=1), atol=1e-5)
+
+
+def test_bundle_rejects_feature_mismatch(tmp_path):
+    model, le, _ = _train_small_model()
+    with pytest.raises(ValueError):
+        save_inference_bundle(str(tmp_path), model, le, CORE_FEATURES[:-1])
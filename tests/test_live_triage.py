@@ -0,0 +1,256 @@
+import json
+import os
+import sys
+from datetime import datetime, timezone
+
+import pytest
+
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from live_triage import LiveLogSource, SearchCursor, write_verdicts
+
+
+def epoch_millis(timestamp):
+    value = datetime.fromisoformat(timestamp)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp() * 1000)
+
+
+class FakeElasticsearch:
+    """In-process stand-in for the client calls of the live loop: point in time, search_after and bulk update."""
+
+    def __init__(self):
+        self.docs = []  # {"_index", "_id", "_source"} in indexing order
+        self.pits = {}
+        self.opened = 0
+        self.searches = 0
+        self.bulk_requests = 0
+
+    def add(self, source, index="unified-logs-2025.06.14"):
+        self.docs.append({"_index": index, "_id": f"doc-{len(self.docs)}", "_source": dict(source)})
+
+    def open_point_in_time(self, index, keep_alive):
+        self.opened += 1
+        pit_id = f"pit-{self.opened}"
+        self.pits[pit_id] = list(self.docs)  # snapshot: later documents are not visible
+        return {"id": pit_id}
+
+    def close_point_in_time(self, id):
+        del self.pits[id]
+        return {"succeeded": True, "num_freed": 1}
+
+    def search(self, pit, query, sort, size, search_after=None, track_total_hits=None):
+        self.searches += 1
+        filters = query["bool"]["filter"]
+        gte = next((f["range"]["@timestamp"]["gte"] for f in filters if "range" in f), None)
+        hits = []
+        for shard_doc, doc in enumerate(self.pits[pit["id"]]):
+            if "@timestamp" not in doc["_source"]:
+                continue
+            timestamp = epoch_millis(doc["_source"]["@timestamp"])
+            if gte is not None and timestamp < gte:
+                continue
+            hits.append({**doc, "sort": [timestamp, shard_doc]})
+        hits.sort(key=lambda hit: hit["sort"])
+        if search_after is not None:
+            hits = [hit for hit in hits if hit["sort"] > search_after]
+        return {"pit_id": pit["id"], "hits": {"hits": hits[:size]}}
+
+    def bulk(self, operations):
+        self.bulk_requests += 1
+        by_key = {(doc["_index"], doc["_id"]): doc for doc in self.docs}
+        items = []
+        for action, body in zip(operations[::2], operations[1::2]):
+            meta = action["update"]
+            doc = by_key.get((meta["_index"], meta["_id"]))
+            if doc is None:
+                items.append({"update": {"_id": meta["_id"], "status": 404, "error": {"type": "document_missing_exception"}}})
+                continue
+            doc["_source"].update(body["doc"])
+            items.append({"update": {"_id": meta["_id"], "status": 200, "result": "updated"}})
+        return {"errors": any(i["update"]["status"] >= 300 for i in items), "items": items}
+
+
+def event(second, message="session opened for user root"):
+    minutes, seconds = divmod(second, 60)
+    hours, minutes = divmod(minutes, 60)
+    return {"@timestamp": f"2025-06-14T{hours:02d}:{minutes:02d}:{seconds:02d}", "message": message}
+
+
+def drain(source, cursor):
+    triaged = []
+    for hits in source.poll():
+        triaged.extend(hit["_id"] for hit in hits)
+        cursor.advance(hits)
+        cursor.save()
+    return triaged
+
+
+def test_poll_pages_through_a_point_in_time_in_timestamp_order():
+    es = FakeElasticsearch()
+    for i in range(2500):
+        es.add(event(i // 3))  # three documents per second
+    es.add({"message": "no timestamp"})
+    cursor = SearchCursor()
+    source = LiveLogSource(es, "unified-logs", cursor, batch_size=1000)
+
+    batches = list(source.poll())
+    assert [len(batch) for batch in batches] == [1000, 1000, 500]
+    ids = [hit["_id"] for batch in batches for hit in batch]
+    assert ids == [f"doc-{i}" for i in range(2500)]
+    assert es.opened == 1 and es.pits == {}  # one snapshot per poll, closed afterwards
+
+
+def test_cursor_resumes_among_documents_sharing_the_last_timestamp(tmp_path):
+    es = FakeElasticsearch()
+    for i in range(10):
+        es.add(event(i // 3))
+    path = str(tmp_path / "cursor.json")
+    cursor = SearchCursor(path)
+    assert drain(LiveLogSource(es, "unified-logs", cursor, batch_size=4), cursor) == [f"doc-{i}" for i in range(10)]
+    assert cursor.timestamp == epoch_millis("2025-06-14T00:00:03") and cursor.ids == {"doc-9"}
+
+    es.add(event(3))  # same second as the last triaged document
+    es.add(event(4))
+    cursor = SearchCursor(path)  # restarted process
+    assert drain(LiveLogSource(es, "unified-logs", cursor, batch_size=4), cursor) == ["doc-10", "doc-11"]
+    assert drain(LiveLogSource(es, "unified-logs", cursor, batch_size=4), cursor) == []
+
+
+def test_verdicts_are_written_to_the_concrete_index():
+    es = FakeElasticsearch()
+    es.add(event(0), index="unified-logs-2025.06.14")
+    es.add(event(1), index="unified-logs-2025.06.15")
+    hits = next(LiveLogSource(es, "unified-logs", SearchCursor()).poll())
+    results = [({"classification": "THREAT", "rule_name": "SQL Injection", "confidence_score": 0.9},
+                {"confidence_score": 0.95, "llm_analysis": {"severity": "High"}}),
+               ({"classification": "BENIGN", "rule_name": "Health Check", "confidence_score": 0.1},
+                {"confidence_score": 0.1})]
+
+    assert write_verdicts(es, hits, results) == (2, [])
+    first, second = (doc["_source"] for doc in es.docs)
+    assert first["triage.classification"] == "THREAT" and first["triage.severity"] == "High"
+    assert second["triage.rule_name"] == "Health Check" and "triage.severity" not in second
+
+
+@pytest.fixture
+def live_orchestrator(tmp_path, monkeypatch):
+    pytest.importorskip("numpy")
+    pytest.importorskip("elasticsearch")
+    import orchestrator
+
+    monkeypatch.setenv("MAX_TIER3_ESCALATIONS", "0")
+    monkeypatch.setattr(orchestrator, "ROLLUP_DB_PATH", "")
+    monkeypatch.setattr(orchestrator, "BATCH_SIZE", 100)
+    monkeypatch.setattr(orchestrator, "LOOP_DELAY_SECONDS", 0)
+    monkeypatch.setattr(orchestrator, "LIVE_CURSOR_PATH", str(tmp_path / "cursor.json"))
+    monkeypatch.setattr(orchestrator, "REPORT_FILENAME", str(tmp_path / "report.md"))
+    monkeypatch.setattr(orchestrator, "REPORT_JSON_FILENAME", str(tmp_path / "report.json"))
+    return orchestrator
+
+
+def linux_logs(n):
+    with open(os.path.join(PROJECT_ROOT, "normalized_logs", "output_linux-2k.log_ecs.json")) as f:
+        return [json.loads(line) for line, _ in zip(f, range(n))]
+
+
+def test_live_main_triages_new_documents_once(tmp_path, live_orchestrator):
+    orchestrator = live_orchestrator
+    logs = linux_logs(400)
+    es = FakeElasticsearch()
+    for log in logs[:300]:
+        es.add(log)
+
+    orchestrator.live_main(es, max_polls=2)
+    assert all("triage.classification" in doc["_source"] for doc in es.docs)
+    (first_report,) = tmp_path.glob("report_*.json")
+    auth_failures = [doc["_source"] for doc in es.docs if doc["_source"].get("event.type") == "authentication_failure"]
+    # Failures keep their Tier 1 verdict until a brute-force campaign covers them
+    assert {(log["triage.classification"], log["triage.rule_name"]) for log in auth_failures} == \
+        {("UNCLASSIFIED", None), ("AGGREGATED", "SSH Brute Force")}
+    with open(first_report) as f:
+        assert json.load(f)["total_logs"] == 300
+
+    for log in logs[300:]:
+        es.add(log)
+    orchestrator.live_main(es, max_polls=1)
+    (second_report,) = set(tmp_path.glob("report_*.json")) - {first_report}  # the first period's report is kept
+    with open(second_report) as f:
+        assert json.load(f)["total_logs"] == 100
+    assert all("triage.classification" in doc["_source"] for doc in es.docs)
+
+
+def test_live_session_is_reported_and_reset_per_period(live_orchestrator, monkeypatch):
+    orchestrator = live_orchestrator
+    monkeypatch.setattr(orchestrator, "LIVE_MAX_REPORT_LOGS", 100)
+    reported = []
+    monkeypatch.setattr(orchestrator, "generate_security_report",
+                        lambda results, *args, builder, **files: reported.append((builder.logs, len(results))))
+    es = FakeElasticsearch()
+    for log in linux_logs(300):
+        es.add(log)
+
+    orchestrator.live_main(es, max_polls=2)
+    assert [logs for logs, _ in reported] == [100, 100, 100]  # nothing left for a final report
+    assert all(aggregates <= 100 for _, aggregates in reported)
+
+
+def test_verdicts_that_failed_to_send_are_retried_without_re_triage(live_orchestrator, monkeypatch):
+    from elastic_transport import ConnectionError as TransportConnectionError
+
+    orchestrator = live_orchestrator
+    reported = []
+    monkeypatch.setattr(orchestrator, "generate_security_report",
+                        lambda results, *args, builder, **files: reported.append(builder.logs))
+    es = FakeElasticsearch()
+    for log in linux_logs(300):
+        es.add(log)
+    bulk = es.bulk
+    failures = [TransportConnectionError("connection refused")]
+
+    def flaky_bulk(operations):
+        if failures:
+            raise failures.pop()
+        return bulk(operations)
+
+    es.bulk = flaky_bulk
+    orchestrator.live_main(es, max_polls=3)
+    assert reported == [300]
+    assert all("triage.classification" in doc["_source"] for doc in es.docs)
+
+
+def test_triage_errors_propagate_instead_of_retrying_the_batch(live_orchestrator, monkeypatch):
+    orchestrator = live_orchestrator
+    es = FakeElasticsearch()
+    for log in linux_logs(150):
+        es.add(log)
+    es.docs[120]["_source"]["message"] = "poison"
+    tier1_triage = orchestrator.tier1_triage
+
+    def failing_triage(log):
+        if log.get("message") == "poison":
+            raise RuntimeError("rule crashed")
+        return tier1_triage(log)
+
+    monkeypatch.setattr(orchestrator, "tier1_triage", failing_triage)
+    with pytest.raises(RuntimeError):
+        orchestrator.live_main(es, max_polls=5)
+    cursor = SearchCursor(orchestrator.LIVE_CURSOR_PATH)
+    assert cursor.ids <= {f"doc-{i}" for i in range(100)}  # only the first batch was committed
+
+
+def test_each_live_report_period_gets_its_own_files(tmp_path, live_orchestrator, monkeypatch):
+    orchestrator = live_orchestrator
+    monkeypatch.setattr(orchestrator, "LIVE_MAX_REPORT_LOGS", 100)
+    es = FakeElasticsearch()
+    for log in linux_logs(300):
+        es.add(log)
+
+    orchestrator.live_main(es, max_polls=2)
+    reports = sorted(tmp_path.glob("report_*.json"))
+    assert len(reports) == 3 and len(list(tmp_path.glob("report_*.md"))) == 3
+    assert [json.loads(path.read_text())["total_logs"] for path in reports] == [100, 100, 100]
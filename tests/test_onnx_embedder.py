@@ -0,0 +1,69 @@
+import os
+import sys
+
+import pytest
+
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+np = pytest.importorskip("numpy")
+onnx = pytest.importorskip("onnx")
+pytest.importorskip("onnxruntime")
+tokenizers = pytest.importorskip("tokenizers")
+
+from onnx import TensorProto, helper, numpy_helper
+
+from onnx_embedder import (FP32_FILENAME, INT8_FILENAME, TOKENIZER_FILENAME, OnnxSentenceEmbedder,
+                           quantize_onnx_model, validate_embedder)
+
+VOCAB = ["[PAD]", "[UNK]", "failed", "password", "for", "root", "from", "<ip>", "accepted", "session", "opened"]
+
+
+def build_toy_model(model_dir, dim=16):
+    """A token-embedding lookup with MiniLM's input/output signature, plus a word-level tokenizer."""
+    rng = np.random.default_rng(0)
+    table = numpy_helper.from_array(rng.normal(size=(len(VOCAB), dim)).astype(np.float32), "embeddings")
+    inputs = [helper.make_tensor_value_info(name, TensorProto.INT64, ["batch", "sequence"])
+              for name in ["input_ids", "attention_mask", "token_type_ids"]]
+    output = helper.make_tensor_value_info("last_hidden_state", TensorProto.FLOAT, ["batch", "sequence", dim])
+    graph = helper.make_graph([helper.make_node("Gather", ["embeddings", "input_ids"], ["last_hidden_state"])],
+                              "toy", inputs, [output], [table])
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 14)], ir_version=8)
+    onnx.save(model, os.path.join(model_dir, FP32_FILENAME))
+
+    tokenizer = tokenizers.Tokenizer(tokenizers.models.WordLevel({t: i for i, t in enumerate(VOCAB)}, unk_token="[UNK]"))
+    tokenizer.normalizer = tokenizers.normalizers.Lowercase()
+    tokenizer.pre_tokenizer = tokenizers.pre_tokenizers.WhitespaceSplit()
+    tokenizer.save(os.path.join(model_dir, TOKENIZER_FILENAME))
+    return table
+
+
+def test_mean_pooled_embeddings_ignore_padding(tmp_path):
+    table = numpy_helper.to_array(build_toy_model(str(tmp_path)))
+    embedder = OnnxSentenceEmbedder(str(tmp_path), quantized=False, intra_op_threads=2)
+
+    sentences = ["Failed password for root from <IP>", "session opened", "Accepted password"]
+    embeddings = embedder.encode(sentences, batch_size=2)
+
+    assert embeddings.shape == (3, 16) and embeddings.dtype == np.float32
+    expected = table[[VOCAB.index("session"), VOCAB.index("opened")]].mean(axis=0)
+    np.testing.assert_allclose(embeddings[1], expected / np.linalg.norm(expected), rtol=1e-5, atol=1e-6)
+    # Same result whether a sentence is padded inside a batch or encoded alone
+    np.testing.assert_allclose(embedder.encode([sentences[1]])[0], embeddings[1], rtol=1e-5, atol=1e-6)
+    assert embedder.get_sentence_embedding_dimension() == 16
+
+
+def test_quantized_model_stays_within_cosine_tolerance(tmp_path):
+    build_toy_model(str(tmp_path))
+    quantize_onnx_model(str(tmp_path / FP32_FILENAME), str(tmp_path / INT8_FILENAME))
+    int8 = OnnxSentenceEmbedder(str(tmp_path), quantized=True)
+    fp32 = OnnxSentenceEmbedder(str(tmp_path), quantized=False)
+
+    sentences = ["Failed password for root from <IP>", "session opened for root", "Accepted password for root"]
+    stats = validate_embedder(int8, fp32, sentences, min_cosine=0.99)
+    assert stats["sentences"] == 3 and stats["min_cosine"] >= 0.99
+
+    with pytest.raises(ValueError):
+        validate_embedder(int8, fp32, sentences, min_cosine=1.01)
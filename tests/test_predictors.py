@@ -0,0 +1,48 @@
+import os
+import sys
+
+import pytest
+
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, ".."))
+DETECTION_DIR = os.path.join(PROJECT_ROOT, "detection")
+if DETECTION_DIR not in sys.path:
+    sys.path.insert(0, DETECTION_DIR)
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+pytest.importorskip("onnxruntime")
+pytest.importorskip("skl2onnx")
+from sklearn.ensemble import RandomForestClassifier
+
+from predictors import NativePredictor, Predictor, OnnxPredictor, benchmark_predictors, export_model_to_onnx
+
+
+def test_onnx_predictor_matches_native_forest(tmp_path):
+    rng = np.random.default_rng(0)
+    feature_names = [f"feature_{i}" for i in range(6)]
+    X = rng.random((300, len(feature_names))).astype(np.float32)
+    y = (X[:, 0] + X[:, 3] > 1.0).astype(int)
+    model = RandomForestClassifier(n_estimators=10, max_depth=4, random_state=0).fit(X, y)
+
+    onnx_path = export_model_to_onnx(model, len(feature_names), str(tmp_path / "rf.onnx"))
+    native = NativePredictor(model, ["Normal", "Attack"], feature_names)
+    compiled = OnnxPredictor(onnx_path, ["Normal", "Attack"], feature_names)
+
+    assert np.allclose(native.predict_proba(X), compiled.predict_proba(X), atol=1e-5)
+
+    flows = pd.DataFrame(X, columns=feature_names)
+    native_labels, _ = native.predict(flows)
+    compiled_labels, _ = compiled.predict(flows)
+    assert list(native_labels) == list(compiled_labels)
+
+    results = benchmark_predictors({"native": native, "onnx": compiled}, X, single_row_iterations=5, batch_iterations=2)
+    assert [row["predictor"] for row in results] == ["native", "onnx"]
+
+
+def test_backend_without_predict_proba_fails_at_construction():
+    class IncompletePredictor(Predictor):
+        backend = "incomplete"
+
+    with pytest.raises(TypeError):
+        IncompletePredictor(["Normal", "Attack"], ["feature_0"])
@@ -0,0 +1,63 @@
+import json
+import os
+import sys
+
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from report_builder import ReportBuilder
+
+
+def aggregate(classification, count, rule=None, confidence=0.5, ip="203.0.113.9", **extra):
+    return {"classification": classification, "rule_name": rule, "confidence_score": confidence, "count": count,
+            "target_template": "/admin/<NUM>", "first_seen": "2025-06-14T00:00:00", "last_seen": "2025-06-14T00:10:00",
+            "log_context": {"source.ip": ip, "message": "GET /admin/1", "@timestamp": "2025-06-14T00:00:00"}, **extra}
+
+
+def sample_results():
+    results = [aggregate("THREAT", n, rule="Client Error (4xx)", confidence=0.9 if n % 2 else 0.3, ip=f"10.0.0.{n}")
+               for n in range(1, 51)]
+    results.append(aggregate("BENIGN", 400, rule="Normal Product Pages"))
+    results.append(aggregate("UNCLASSIFIED", 30, pre_filtered=True))
+    results.append(aggregate("UNCLASSIFIED", 7, tier2_anomaly=True, llm_analysis={
+        "classification": "Web Application Anomaly", "severity": "High", "hypothesis": "Probing",
+        "recommended_action": "Block"}))
+    results.append(aggregate("UNCLASSIFIED", 1, llm_analysis={"severity": "Low"}))
+    return results
+
+
+def test_single_pass_counters():
+    builder = ReportBuilder(top_aggregates=5).add_all(iter(sample_results()))  # a generator is enough
+
+    assert builder.logs == 1275 + 400 + 30 + 7 + 1 and builder.results == 54
+    assert builder.threats == 1275 and builder.threat_alerts == 50
+    assert builder.high_confidence_threats == sum(range(1, 51, 2))
+    assert builder.counts["BENIGN"] == 400 and builder.pre_filtered == 30 and builder.tier2_anomalies == 1
+    assert [r["count"] for r in builder.top_alert_groups()] == [50, 49, 48, 47, 46]
+    assert len(builder._top) == 5 and len(builder.llm_alerts) == 1
+
+
+def test_markdown_and_json_outputs(tmp_path):
+    builder = ReportBuilder(top_aggregates=3).add_all(sample_results())
+    campaigns = [{"rule_name": "SSH Brute Force", "entity_field": "source.ip", "entity": "198.51.100.3", "failures": 40,
+                  "users": {"root"}, "source_ips": {"198.51.100.3"}, "first_seen": "2025-06-14T01:00:00",
+                  "last_seen": "2025-06-14T01:05:00", "last_seen_ts": 0.0, "window_seconds": 600}]
+    builder.write_markdown(tmp_path / "report.md", brute_force_campaigns=campaigns)
+    builder.write_json(tmp_path / "report.json", brute_force_campaigns=campaigns)
+
+    report = (tmp_path / "report.md").read_text()
+    assert "**Total Logs Analyzed:** 1713 (54 aggregated results)" in report
+    assert "| Client Error (4xx)            | 1275  | 625       | 650      |" in report
+    assert "**Largest alert groups** (top 3 of 50)" in report
+    assert "### **Web Application Anomaly** (Severity: High)" in report
+    assert "- **Occurrences:** 7" in report
+    assert "| SSH Brute Force               | source.ip=198.51.100.3  | 40       |" in report
+
+    summary = json.loads((tmp_path / "report.json").read_text())
+    assert summary["threats"]["total"] == 1275 and summary["threats"]["by_rule"]["Client Error (4xx)"]["count"] == 1275
+    assert [g["count"] for g in summary["threats"]["top_alert_groups"]] == [50, 49, 48]
+    assert summary["llm_alerts"][0]["severity"] == "High" and summary["llm_alerts"][0]["count"] == 7
+    assert summary["brute_force_campaigns"][0]["users"] == ["root"]
+    assert "last_seen_ts" not in summary["brute_force_campaigns"][0]
@@ -0,0 +1,110 @@
+import os
+import sqlite3
+import sys
+from datetime import datetime
+
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from rollup_store import RollupStore, write_trend_report
+
+
+def access_log(minute, second=0, ip="203.0.113.9", status=404):
+    hours, minutes = divmod(minute, 60)
+    return {"@timestamp": f"2025-06-14T{hours:02d}:{minutes:02d}:{second:02d}", "log.source": "apache_access",
+            "source.ip": ip, "http.response.status_code": status}
+
+
+def fill(store, minutes=range(0, 120)):
+    for minute in minutes:
+        for second in range(0, 60, 10):
+            store.record(access_log(minute, second), "THREAT", "Client Error (4xx)")
+        store.record(access_log(minute, ip=f"10.0.0.{minute % 7}", status=200), "BENIGN", "Normal Product Pages")
+
+
+def test_rollups_accumulate_across_runs(tmp_path):
+    path = str(tmp_path / "rollups.db")
+    store = RollupStore(path, flush_every=100, source="access.log")  # several flushes within the run
+    fill(store)
+    store.close()
+    store = RollupStore(path, source="access.log")
+    fill(store, range(0, 180))  # the file grew: re-read in full, replaced rather than added
+    store.close()
+
+    store = RollupStore(path)
+    assert store.conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert store.totals("classification") == [("THREAT", 6 * 180), ("BENIGN", 180)]
+    assert store.totals("status_class") == [("4xx", 1080), ("2xx", 180)]
+    assert store.totals("source.ip", limit=1) == [("203.0.113.9", 1080)]
+    assert store.totals("rule", "2025-06-14T01:00:00", "2025-06-14T01:30:00") == \
+        [("Client Error (4xx)", 180), ("Normal Product Pages", 30)]
+
+    hour = datetime.fromisoformat("2025-06-14T00:00:00").timestamp()
+    assert store.timeseries(bucket_minutes=60) == [(hour, 7 * 60), (hour + 3600, 7 * 60), (hour + 7200, 7 * 60)]
+    store.close()
+
+
+def test_recording_the_same_source_again_leaves_totals_unchanged(tmp_path):
+    path = str(tmp_path / "rollups.db")
+    for _ in range(2):
+        store = RollupStore(path, flush_every=100, source="access.log")
+        fill(store, range(0, 30))
+        store.close()
+
+    store = RollupStore(path)
+    assert store.totals("total") == [("", 7 * 30)]
+    assert store.totals("classification") == [("THREAT", 6 * 30), ("BENIGN", 30)]
+    assert store.totals("source.ip", limit=1) == [("203.0.113.9", 6 * 30)]
+    store.close()
+
+
+def test_runs_sharing_a_minute_add_up(tmp_path):
+    path = str(tmp_path / "rollups.db")
+    # A restarted live run picks up in the middle of a minute
+    for seconds in (range(0, 30), range(30, 50)):
+        store = RollupStore(path)
+        for second in seconds:
+            store.record(access_log(0, second), "THREAT", "Client Error (4xx)")
+        store.close()
+    # Another input covering the same minute
+    store = RollupStore(path, source="other.log")
+    store.record(access_log(0, 55), "BENIGN")
+    store.close()
+
+    store = RollupStore(path)
+    assert store.totals("total") == [("", 51)]
+    assert store.totals("classification") == [("THREAT", 50), ("BENIGN", 1)]
+    store.close()
+
+
+def test_rollups_without_a_source_column_are_migrated(tmp_path):
+    path = str(tmp_path / "rollups.db")
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+    CREATE TABLE rollups (minute INTEGER NOT NULL, dimension TEXT NOT NULL, value TEXT NOT NULL,
+                          count INTEGER NOT NULL, PRIMARY KEY (minute, dimension, value)) WITHOUT ROWID;
+    INSERT INTO rollups VALUES (0, 'total', '', 7);
+    """)
+    conn.close()
+
+    store = RollupStore(path, source="access.log")
+    fill(store, range(0, 1))
+    store.close()
+    store = RollupStore(path)
+    assert store.totals("total") == [("", 14)]
+    store.close()
+
+
+def test_trend_report_from_rollups(tmp_path):
+    store = RollupStore(str(tmp_path / "rollups.db"))
+    fill(store)
+    store.flush()
+    write_trend_report(store, str(tmp_path / "trend.md"), start="2025-06-14T01:00:00")
+    store.close()
+
+    report = (tmp_path / "trend.md").read_text()
+    assert "**Total Logs:** 420" in report
+    assert "| Client Error (4xx)            | 360   |" in report
+    assert "| 2025-06-14 01:00 | 420   | 360     |" in report
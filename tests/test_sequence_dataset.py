@@ -0,0 +1,76 @@
+import os
+import sys
+
+import pytest
+
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+torch = pytest.importorskip("torch")
+
+from sequence_dataset import SequenceWindows, build_sequence_windows, make_dataloader
+
+WINDOW = 3
+
+
+def make_logs(n=60, dim=4, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "@timestamp": pd.Timestamp("2025-06-14") + pd.to_timedelta(rng.permutation(n), unit="s"),
+        "source.ip": rng.choice(["10.0.0.1", "10.0.0.2", "10.0.0.3", None], size=n),
+        "label": (rng.random(n) < 0.2).astype(int),
+    })
+    df = df.sort_values("@timestamp").reset_index(drop=True)
+    return df, rng.normal(size=(n, dim)).astype(np.float32)
+
+
+def notebook_sequences(df, embeddings):
+    """The original training2.ipynb construction: a copied (N, W, D) array."""
+    sequences, labels, end_times = [], [], []
+    for _, g in df.groupby("source.ip"):
+        idxs = g.index.values
+        for start in range(0, len(idxs) - WINDOW + 1):
+            window = idxs[start:start + WINDOW]
+            sequences.append(embeddings[window])
+            labels.append(int(df.loc[window, "label"].max()))
+            end_times.append(df.loc[window[-1], "@timestamp"])
+    return np.stack(sequences), np.array(labels), np.array(end_times, dtype="datetime64[ns]")
+
+
+def test_windows_match_copied_sequences_and_reload(tmp_path):
+    df, embeddings = make_logs()
+    windows = build_sequence_windows(embeddings, df["source.ip"].values, df["@timestamp"].values,
+                                     df["label"].values, str(tmp_path), window_size=WINDOW)
+    expected, expected_labels, expected_end = notebook_sequences(df, embeddings)
+
+    assert len(windows) == len(expected)
+    np.testing.assert_array_equal(windows.windows_view()[windows.starts], expected)
+    np.testing.assert_array_equal(windows.labels, expected_labels)
+    np.testing.assert_array_equal(windows.end_times, expected_end)
+    assert windows.windows_view().base is not None  # a view, not a copy
+
+    reloaded = SequenceWindows.load(str(tmp_path))
+    train_idx, val_idx = reloaded.split_by_time(0.8)
+    assert len(train_idx) + len(val_idx) == len(expected)
+    assert expected_end[train_idx].max() < expected_end[val_idx].min()
+
+    x, y = reloaded.dataset(val_idx)[0]
+    assert x.dtype == torch.float32 and x.shape == (WINDOW, embeddings.shape[1])
+    np.testing.assert_array_equal(x.numpy(), expected[val_idx[0]])
+    assert y.item() == expected_labels[val_idx[0]]
+
+
+def test_dataloader_workers_read_the_shared_memmap(tmp_path):
+    df, embeddings = make_logs()
+    windows = build_sequence_windows(embeddings, df["source.ip"].values, df["@timestamp"].values,
+                                     df["label"].values, str(tmp_path), window_size=WINDOW)
+    expected, expected_labels, _ = notebook_sequences(df, embeddings)
+
+    loader = make_dataloader(windows.dataset(), batch_size=8, num_workers=2)
+    xs, ys = zip(*loader)
+    np.testing.assert_array_equal(torch.cat(xs).numpy(), expected)
+    np.testing.assert_array_equal(torch.cat(ys).numpy(), expected_labels)
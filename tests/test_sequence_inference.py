@@ -0,0 +1,135 @@
+import json
+import os
+import sys
+
+import pytest
+
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+np = pytest.importorskip("numpy")
+torch = pytest.importorskip("torch")
+
+from sequence_inference import EntityRingBuffers, SequenceInferenceEngine, SequenceScorer
+from sequence_models import LSTMClassifier, TransformerSeqClassifier, export_torchscript
+
+WINDOW, DIM = 4, 8
+
+
+def test_ring_buffer_returns_windows_oldest_first_and_evicts_lru():
+    buffers = EntityRingBuffers(window_size=3, embed_dim=1, capacity=2)
+    windows = [buffers.push("a", [float(i)]) for i in range(5)]
+    assert windows[:2] == [None, None]
+    assert [w.ravel().tolist() for w in windows[2:]] == [[0, 1, 2], [1, 2, 3], [2, 3, 4]]
+
+    buffers.push("b", [9.0])
+    buffers.push("c", [7.0])  # evicts "a", the least recently seen
+    assert buffers.evictions == 1 and set(buffers.slots) == {"b", "c"}
+    assert buffers.push("a", [1.0]) is None  # starts over
+
+
+def test_ring_buffers_grow_on_demand_up_to_capacity():
+    buffers = EntityRingBuffers(window_size=2, embed_dim=1, capacity=10, initial_capacity=2)
+    assert len(buffers.buffers) == 2
+    for i in range(10):
+        buffers.push(f"ip{i}", [float(i)])
+    assert len(buffers.buffers) == 10 and buffers.evictions == 0
+    assert buffers.push("ip0", [100.0]).ravel().tolist() == [0.0, 100.0]  # survived the resizes
+
+    buffers.push("ip10", [1.0])
+    assert len(buffers.buffers) == 10 and buffers.evictions == 1 and "ip1" not in buffers.slots
+
+
+@pytest.mark.parametrize("model_cls", [LSTMClassifier, TransformerSeqClassifier])
+def test_engine_scores_match_direct_model_on_each_window(tmp_path, model_cls):
+    torch.manual_seed(0)
+    kwargs = {"nhead": 2} if model_cls is TransformerSeqClassifier else {}
+    model = model_cls(DIM, **kwargs).eval()
+    path = str(tmp_path / "seq.pt")
+    export_torchscript(model, path, window_size=WINDOW, embed_dim=DIM)
+    engine = SequenceInferenceEngine.from_path(path, window_size=WINDOW, embed_dim=DIM, max_entities=10)
+
+    rng = np.random.default_rng(0)
+    entities = ["10.0.0.1", "10.0.0.2"] * 6 + ["10.0.0.1"] * 3
+    embeddings = rng.normal(size=(len(entities), DIM)).astype(np.float32)
+    scores = np.concatenate([engine.score_batch(entities[:5], embeddings[:5]),
+                             engine.score_batch(entities[5:], embeddings[5:])])
+
+    history = {}
+    for i, entity in enumerate(entities):
+        history.setdefault(entity, []).append(embeddings[i])
+        if len(history[entity]) < WINDOW:
+            assert np.isnan(scores[i])
+            continue
+        window = torch.from_numpy(np.stack(history[entity][-WINDOW:])[None])
+        with torch.no_grad():
+            expected = torch.softmax(model(window), dim=1)[0, 1].item()
+        assert scores[i] == pytest.approx(expected, abs=1e-5)
+    assert engine.stats()["windows_scored"] == int((~np.isnan(scores)).sum())
+
+
+def test_scorer_embeds_and_scores_in_micro_batches():
+    class ConstantModel(torch.nn.Module):
+        def forward(self, x):
+            return torch.stack([torch.zeros(x.shape[0]), x[:, :, 0].sum(dim=1)], dim=1)
+
+    embed_calls = []
+
+    def embed(messages):
+        embed_calls.append(len(messages))
+        return np.ones((len(messages), DIM), dtype=np.float32)
+
+    engine = SequenceInferenceEngine(ConstantModel(), window_size=2, embed_dim=DIM)
+    scorer = SequenceScorer(engine, embed, micro_batch_size=3)
+    assert scorer.submit("ip", "m1", 1) == []
+    assert scorer.submit("ip", "m2", 2) == []
+    completed = scorer.submit("ip", "m3", 3)
+    assert [payload for payload, _ in completed] == [1, 2, 3]
+    assert completed[0][1] is None and completed[1][1] > 0.5
+    assert embed_calls == [3] and scorer.flush() == []
+
+
+class FakeSequenceScorer:
+    """Scores each log's window at once: 0.9 for messages containing 'probe', 0.1 otherwise."""
+
+    class engine:
+        @staticmethod
+        def stats():
+            return {}
+
+    def submit(self, source_ip, message, aggregate):
+        return [(aggregate, 0.9 if "probe" in message else 0.1)]
+
+    def flush(self):
+        return []
+
+
+def test_sequence_threats_are_escalated_and_reported(tmp_path, monkeypatch):
+    import orchestrator
+
+    monkeypatch.setenv("MAX_TIER3_ESCALATIONS", "5")
+    monkeypatch.setattr(orchestrator, "ROLLUP_DB_PATH", "")
+    monkeypatch.setattr(orchestrator, "REPORT_FILENAME", str(tmp_path / "report.md"))
+    monkeypatch.setattr(orchestrator, "REPORT_JSON_FILENAME", str(tmp_path / "report.json"))
+    escalated = []
+    monkeypatch.setattr(orchestrator, "analyze_log_with_llm", lambda log: escalated.append(log["message"]) or {
+        "classification": "Reconnaissance", "severity": "High", "hypothesis": "Scan", "recommended_action": "Block"})
+    monkeypatch.setattr(orchestrator, "should_escalate_to_llm", lambda log, novelty=None: False)
+    session = orchestrator.TriageSession()
+    session.sequence_scorer = FakeSequenceScorer()
+
+    for i, message in enumerate(["session opened", "probe 1", "probe 2", "session opened"]):
+        session.process({"@timestamp": f"2025-06-14T00:00:0{i}", "source.ip": "203.0.113.9", "message": message})
+    session.drain()
+    session.report()
+
+    assert escalated == ["probe 1"]  # once per source IP and report period
+    summary = json.loads((tmp_path / "report.json").read_text())
+    (threat,) = summary["sequence_threats"]
+    assert (threat["source.ip"], threat["windows"], threat["max_score"]) == ("203.0.113.9", 2, 0.9)
+    assert summary["llm_alerts"][0]["classification"] == "Reconnaissance"
+    report = (tmp_path / "report.md").read_text()
+    assert "## 🧬 Sequence Model Detections" in report
+    assert "| 203.0.113.9                   | 2       | 0.90      |" in report
@@ -0,0 +1,82 @@
+import os
+import pickle
+import sys
+
+import pytest
+
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+pytest.importorskip("numpy")
+
+from sketches import CountMinSketch, HyperLogLog, TrafficSketch
+
+
+def access_logs(n_background=20000, seed=0):
+    """Background traffic from many IPs plus three heavy hitters; one scans thousands of URLs."""
+    import random
+    rng = random.Random(seed)
+    logs = []
+    for i in range(n_background):
+        logs.append({"source.ip": f"10.0.{i % 200}.{i % 250}", "url.original": f"/page/{rng.randint(0, 99)}"})
+        if i % 10 == 0:
+            logs.append({"source.ip": "198.51.100.7", "url.original": f"/scan/{i}"})
+        if i % 20 == 0:
+            logs.append({"source.ip": "203.0.113.5", "url.original": "/login"})
+        if i % 40 == 0:
+            logs.append({"source.ip": "192.0.2.1", "url.original": "/"})
+    rng.shuffle(logs)
+    return logs
+
+
+def test_count_min_never_underestimates():
+    cms = CountMinSketch(width=256, depth=4)
+    for i in range(5000):
+        cms.add(f"key{i % 500}")
+    assert all(cms.estimate(f"key{i}") >= 10 for i in range(500))
+    assert cms.estimate("key0") <= 10 + 2.72 / 256 * 5000
+
+
+def test_hyperloglog_estimates_cardinality_and_merges():
+    a, b = HyperLogLog(), HyperLogLog()
+    for i in range(30000):
+        a.add(f"ip{i}")
+        b.add(f"ip{i + 20000}")
+    assert abs(a.count() - 30000) / 30000 < 0.03
+    assert abs(a.merge(b).count() - 50000) / 50000 < 0.03
+    with pytest.raises(ValueError):
+        a.merge(HyperLogLog(precision=10))
+
+
+def test_traffic_sketch_finds_top_talkers_and_url_scanners():
+    sketch = TrafficSketch(k=5)
+    for log in access_logs():
+        sketch.update(log)
+    summary = sketch.summary()
+
+    top = [source["source.ip"] for source in summary["top_sources"][:3]]
+    assert top == ["198.51.100.7", "203.0.113.5", "192.0.2.1"]
+    scanner = summary["top_sources"][0]
+    assert scanner["requests"] >= 2000 and scanner["distinct_urls"] > 1500
+    assert summary["top_sources"][1]["distinct_urls"] == 1
+    assert abs(summary["distinct_urls"] - 2102) / 2102 < 0.03
+    assert sketch.memory_bytes() < 2 * 1024 * 1024
+
+
+def test_merged_shards_match_a_single_sketch():
+    logs = access_logs()
+    whole = TrafficSketch(k=5)
+    shards = [TrafficSketch(k=5), TrafficSketch(k=5)]
+    for i, log in enumerate(logs):
+        whole.update(log)
+        shards[i % 2].update(log)
+    # Shards travel between worker processes pickled
+    merged = pickle.loads(pickle.dumps(shards[0])).merge(shards[1])
+
+    assert merged.source_counts.total == len(logs)
+    assert (merged.source_counts.counts == whole.source_counts.counts).all()
+    assert merged.summary()["distinct_source_ips"] == whole.summary()["distinct_source_ips"]
+    assert [s["source.ip"] for s in merged.summary()["top_sources"][:3]] == \
+        [s["source.ip"] for s in whole.summary()["top_sources"][:3]]
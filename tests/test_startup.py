@@ -0,0 +1,83 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from component_registry import ComponentRegistry
+
+# Startup budget for importing the orchestrator and the Tier 2/3 modules in a fresh interpreter
+STARTUP_BUDGET_SECONDS = float(os.getenv("STARTUP_BUDGET_SECONDS", "1.0"))
+HEAVY_MODULES = ["torch", "sentence_transformers", "hdbscan", "groq", "dotenv", "elasticsearch"]
+
+STARTUP_SCRIPT = f"""
+import sys, time
+start = time.perf_counter()
+import orchestrator, tier2, tier3_llm
+elapsed = time.perf_counter() - start
+print(elapsed)
+print(",".join(m for m in {HEAVY_MODULES!r} if m in sys.modules))
+"""
+
+
+def run_startup():
+    output = subprocess.run(
+        [sys.executable, "-c", STARTUP_SCRIPT], cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+    ).stdout.splitlines()
+    return float(output[0]), [m for m in output[1].split(",") if m]
+
+
+def test_startup_imports_no_heavy_dependencies_and_stays_within_budget():
+    pytest.importorskip("numpy")
+    timings = []
+    for _ in range(3):
+        seconds, heavy = run_startup()
+        assert heavy == [], f"Imported at startup: {heavy}"
+        timings.append(seconds)
+    assert min(timings) < STARTUP_BUDGET_SECONDS, f"Startup took {min(timings):.2f}s"
+
+
+def test_registry_builds_each_component_once_on_first_use():
+    registry = ComponentRegistry()
+    calls = []
+
+    def factory():
+        calls.append(1)
+        time.sleep(0.01)
+        return object()
+
+    registry.register("model", factory)
+    assert not registry.is_loaded("model") and calls == []
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.get("model"))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1 and all(result is results[0] for result in results)
+    assert set(registry.load_times()) == {"model"}
+    registry.reset("model")
+    assert registry.get("model") is not results[0] and len(calls) == 2
+    with pytest.raises(KeyError):
+        registry.get("missing")
+
+
+def test_llm_falls_back_when_client_unavailable():
+    import tier3_llm
+    from component_registry import registry
+
+    registry.register("groq_client", lambda: None)
+    try:
+        analysis = tier3_llm.analyze_log_with_llm({"message": "odd request", "http.response.status_code": 500})
+    finally:
+        registry.register("groq_client", tier3_llm._create_groq_client)
+    assert analysis["classification"] == "Unclassified (No LLM)"
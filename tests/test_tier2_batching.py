@@ -0,0 +1,47 @@
+import os
+import sys
+
+import pytest
+
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+pytest.importorskip("sentence_transformers")
+pytest.importorskip("hdbscan")
+
+from tier2 import DynamicBatcher
+
+
+class RecordingDetector:
+    """Flags messages containing 'attack' and records the batch sizes it was called with."""
+
+    def __init__(self):
+        self.batch_sizes = []
+
+    def predict_batch(self, log_messages):
+        self.batch_sizes.append(len(log_messages))
+        return ["attack" in message for message in log_messages]
+
+
+def test_batcher_flushes_when_full():
+    detector = RecordingDetector()
+    batcher = DynamicBatcher(detector, max_batch_size=3, max_wait_seconds=60)
+
+    assert batcher.submit("normal 1", 1) == []
+    assert batcher.submit("attack 2", 2) == []
+    completed = batcher.submit("normal 3", 3)
+
+    assert completed == [(1, False), (2, True), (3, False)]
+    assert detector.batch_sizes == [3]
+    assert len(batcher) == 0
+
+
+def test_batcher_flushes_after_deadline():
+    detector = RecordingDetector()
+    batcher = DynamicBatcher(detector, max_batch_size=100, max_wait_seconds=0)
+
+    assert batcher.submit("attack", "a") == [("a", True)]
+    assert batcher.poll() == []
+    assert batcher.flush() == []
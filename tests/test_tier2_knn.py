@@ -0,0 +1,49 @@
+import os
+import sys
+
+import pytest
+
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+np = pytest.importorskip("numpy")
+
+from tier2_knn import KnnNoveltyIndex, benchmark_queries
+
+
+def available_backends():
+    backends = []
+    for name in ["hnswlib", "faiss"]:
+        try:
+            __import__(name)
+            backends.append(name)
+        except ImportError:
+            pass
+    return backends
+
+
+def normal_exemplars(n_per_cluster=200, dim=32, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(5, dim))
+    return np.vstack([c + rng.normal(scale=0.1, size=(n_per_cluster, dim)) for c in centers]).astype(np.float32), rng
+
+
+@pytest.mark.parametrize("backend", available_backends() or [pytest.param("hnswlib", marks=pytest.mark.skip)])
+def test_knn_scores_separate_novel_logs_and_survive_reload(tmp_path, backend):
+    exemplars, rng = normal_exemplars()
+    index = KnnNoveltyIndex(exemplars.shape[1], k=5, backend=backend).fit(exemplars, quantile=0.99)
+    assert index.size == len(exemplars) and index.threshold > 0
+
+    known = exemplars[:50] + rng.normal(scale=0.01, size=(50, exemplars.shape[1])).astype(np.float32)
+    novel = rng.normal(size=(50, exemplars.shape[1])).astype(np.float32)
+    assert index.is_anomalous(index.score(known)).sum() == 0
+    assert index.is_anomalous(index.score(novel)).all()
+
+    index.save(str(tmp_path))
+    reloaded = KnnNoveltyIndex.load(str(tmp_path))
+    assert reloaded.threshold == index.threshold
+    np.testing.assert_allclose(reloaded.score(novel), index.score(novel), rtol=1e-5, atol=1e-6)
+    # Single-log queries are sub-millisecond
+    assert benchmark_queries(reloaded, novel) < 1000
@@ -0,0 +1,86 @@
+import os
+import sys
+
+import pytest
+
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+np = pytest.importorskip("numpy")
+hdbscan = pytest.importorskip("hdbscan")
+
+from ingestion.templating import template_key, template_message
+from tier2_refit import ModelVersionStore, TemplateReservoir, latest_model_path, refit_detector
+
+
+class TemplateEmbeddingDetector:
+    """Stand-in for BertAnomalyDetector: each template maps to a fixed point plus a little noise."""
+    embedding_backend = "torch"
+    embedding_model_name = "template-points"
+
+    def __init__(self):
+        self.clusterer = hdbscan.HDBSCAN(min_cluster_size=5)
+        self.rng = np.random.default_rng(0)
+
+    def embed(self, messages):
+        centers = np.array([np.random.default_rng(template_key(template_message(m)) % 2**32).normal(size=8)
+                            for m in messages])
+        return (centers * 10 + self.rng.normal(scale=0.05, size=centers.shape)).astype(np.float32)
+
+    def is_fitted(self):
+        return getattr(self.clusterer, "prediction_data_", None) is not None
+
+
+def normal_traffic(n_login, n_cron, n_rare):
+    return ([f"Accepted password for user{i % 7} from 10.0.0.{i % 250} port {4000 + i}" for i in range(n_login)]
+            + [f"CRON[{i}]: session opened for user root" for i in range(n_cron)]
+            + [f"kernel: usb {i}-1: new device number {i}" for i in range(n_rare)])
+
+
+def test_reservoir_is_stratified_by_template():
+    reservoir = TemplateReservoir(max_per_template=50).extend(normal_traffic(5000, 500, 3))
+
+    assert reservoir.stats() == {"templates": 3, "messages_seen": 5503, "dropped": 0}
+    sample = reservoir.sample(sample_size=100)
+    templates = [template_message(m) for m in sample]
+    # Frequent templates are capped by their reservoir, the rare one is still represented
+    assert templates.count(template_message("kernel: usb 1-1: new device number 1")) == 1
+    assert len(sample) <= 100
+    assert all(len(s["examples"]) <= 50 for s in reservoir.strata.values())
+
+
+def test_refit_versions_models_and_merges_exemplars(tmp_path):
+    detector = TemplateEmbeddingDetector()
+    store = ModelVersionStore(str(tmp_path), keep_versions=2)
+    reservoir = TemplateReservoir().extend(normal_traffic(300, 100, 0))
+
+    version, info = refit_detector(detector, reservoir, store, sample_size=200, merge_exemplars=True)
+    assert version == 1 and info["merged_exemplars"] == 0 and info["clusters"] == 2
+    assert detector.is_fitted()
+
+    reservoir.extend([f"sudo: user{i} : TTY=pts/{i % 3} ; COMMAND=/bin/ls" for i in range(100)])
+    version, info = refit_detector(detector, reservoir, store, sample_size=200, merge_exemplars=True)
+    assert version == 2 and info["merged_exemplars"] > 0 and info["clusters"] == 3
+
+    refit_detector(detector, reservoir, store, sample_size=200, merge_exemplars=False)
+    assert [v["version"] for v in store.versions()] == [2, 3]
+    assert not os.path.exists(tmp_path / "hdbscan_v0001.joblib")
+    assert latest_model_path(str(tmp_path)).endswith("hdbscan_v0003.joblib")
+    assert store.load().labels_.max() == 2
+
+
+def test_model_fitted_on_another_embedding_backend_is_not_loaded(tmp_path, monkeypatch):
+    import orchestrator
+
+    store = ModelVersionStore(str(tmp_path))
+    reservoir = TemplateReservoir().extend(normal_traffic(300, 100, 0))
+    version, info = refit_detector(TemplateEmbeddingDetector(), reservoir, store, sample_size=200)
+    assert store.versions()[-1]["embedding_backend"] == info["embedding_backend"] == "torch"
+    assert store.versions()[-1]["embedding_model"] == "template-points"
+
+    monkeypatch.setattr(orchestrator, "TIER2_MODE", "hdbscan")
+    monkeypatch.setattr(orchestrator, "TIER2_MODEL_DIR", str(tmp_path))
+    monkeypatch.setattr(orchestrator, "TIER2_EMBEDDING_BACKEND", "onnx")
+    assert orchestrator.load_tier2_detector() is None
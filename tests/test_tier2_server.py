@@ -0,0 +1,72 @@
+import os
+import sys
+import threading
+
+import pytest
+
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+if not hasattr(__import__("socket"), "AF_UNIX"):
+    pytest.skip("Unix sockets not available", allow_module_level=True)
+
+from tier2_server import Tier2Client, Tier2ModelServer
+
+
+class ScoringDetector:
+    """Scores a message by its length; anomalies contain 'attack'. Records batch sizes."""
+
+    anomaly_threshold = 0.5
+
+    def __init__(self):
+        self.batch_sizes = []
+
+    def predict_batch(self, log_messages, return_scores=False):
+        self.batch_sizes.append(len(log_messages))
+        return [("attack" in m, float(len(m))) for m in log_messages]
+
+
+@pytest.fixture
+def server(tmp_path):
+    detector = ScoringDetector()
+    srv = Tier2ModelServer(detector, str(tmp_path / "t2.sock"), max_batch_size=1000, max_wait_seconds=0.2)
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+def test_requests_from_many_workers_are_batched_together(server):
+    results = {}
+
+    def worker(worker_id):
+        client = Tier2Client(server.socket_path)
+        messages = [f"worker {worker_id} normal", f"worker {worker_id} attack!"]
+        results[worker_id] = client.predict_batch(messages, return_scores=True)
+        client.close()
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for worker_id, result in results.items():
+        assert result == [(False, float(len(f"worker {worker_id} normal"))),
+                          (True, float(len(f"worker {worker_id} attack!")))]
+    assert sum(server.detector.batch_sizes) == 12
+    assert len(server.detector.batch_sizes) < 6  # merged across workers
+
+
+def test_client_matches_detector_interface_and_degrades_gracefully(server):
+    client = Tier2Client(server.socket_path)
+    assert client.anomaly_threshold == 0.5
+    assert client.predict_batch(["attack", "fine"]) == [True, False]
+    assert client.predict_batch([]) == []
+    assert client.info()["stats"]["messages"] == 2
+
+    offline = Tier2Client(server.socket_path + ".missing", timeout=1)
+    assert offline.predict_batch(["attack"], return_scores=True) == [(False, 0.0)]
@@ -0,0 +1,81 @@
+import os
+import sys
+
+import pytest
+
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, ".."))
+DETECTION_DIR = os.path.join(PROJECT_ROOT, "detection")
+if DETECTION_DIR not in sys.path:
+    sys.path.insert(0, DETECTION_DIR)
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("sklearn")
+
+from tuning import AshaScheduler, TuningResultsStore, load_best_params, run_search
+
+
+def test_asha_promotes_top_fraction_of_each_rung():
+    scheduler = AshaScheduler(min_resource=100, max_resource=900, eta=3)
+    assert scheduler.resources == [100, 300, 900]
+
+    for trial_id, score in enumerate([0.5, 0.9, 0.7]):
+        scheduler.report(trial_id, 0, score)
+
+    assert scheduler.next_promotion() == (1, 1)
+    # Only one of three trials makes the cut until more results arrive
+    assert scheduler.next_promotion() is None
+
+
+def test_search_records_every_rung_and_best_params(tmp_path):
+    rng = np.random.default_rng(0)
+    X = rng.random((600, 5)).astype(np.float32)
+    y = (X[:, 0] + X[:, 1] > 1.0).astype(int)
+    results_path = str(tmp_path / "results.jsonl")
+
+    best = run_search(
+        X, y, model_names=("random_forest",), n_trials=4, n_workers=2, total_cores=2,
+        eta=2, min_rows=120, study="unit", dataset="synthetic",
+        results_path=results_path, cache_dir=str(tmp_path / "cache"),
+    )
+
+    records = TuningResultsStore(results_path).load()
+    assert len({r["trial_id"] for r in records}) == 4
+    assert max(r["rung"] for r in records) >= 1
+    assert best["random_forest"]["params"] == load_best_params("random_forest", "synthetic", results_path)
+
+
+@pytest.mark.parametrize("model_name", ["xgboost", "lightgbm"])
+def test_boosted_trials_record_the_early_stopped_tree_count(tmp_path, model_name):
+    pytest.importorskip(model_name)
+    rng = np.random.default_rng(0)
+    X = rng.random((800, 5)).astype(np.float32)
+    y = (X[:, 0] + X[:, 1] > 1.0).astype(int)
+    results_path = str(tmp_path / "results.jsonl")
+
+    run_search(X, y, model_names=(model_name,), n_trials=2, n_workers=1, total_cores=1, eta=2, min_rows=560,
+               study="unit", results_path=results_path, cache_dir=str(tmp_path / "cache"))
+
+    for r in TuningResultsStore(results_path).load():
+        assert r["params"]["n_estimators"] == r["best_iteration"]
+        assert r["best_iteration"] < 2000  # stopped well before the configured number of trees
+
+
+def record(study, feature_space, resource, score, n_estimators):
+    return {"study": study, "dataset": "unsw", "feature_space": feature_space, "model": "lightgbm",
+            "resource": resource, "score": score, "params": {"n_estimators": n_estimators}}
+
+
+def test_best_params_come_from_the_latest_study_of_the_requested_feature_space(tmp_path):
+    results_path = str(tmp_path / "results.jsonl")
+    store = TuningResultsStore(results_path)
+    store.append(record("old", "pipeline-k200", 10000, 0.99, 100))
+    store.append(record("new", "pipeline-k200", 5000, 0.90, 200))
+    store.append(record("raw", "label-encoded", 10000, 0.95, 300))
+
+    assert store.best("lightgbm")["params"] == {"n_estimators": 300}
+    assert store.best("lightgbm", feature_space="pipeline-k200")["params"] == {"n_estimators": 200}
+    assert store.best("lightgbm", feature_space="pipeline-k200", all_studies=True)["params"] == {"n_estimators": 100}
+    assert load_best_params("lightgbm", "unsw", results_path, feature_space="pipeline-k200") == {"n_estimators": 200}
+    # Parameters tuned on another feature space are refused rather than applied
+    assert load_best_params("lightgbm", "unsw", results_path, feature_space="pipeline-k100") is None
@@ -0,0 +1,338 @@
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+pytest.importorskip("elasticsearch")
+
+from elasticsearch import ApiError, Elasticsearch
+
+import uploader
+
+
+class StubElasticsearch(BaseHTTPRequestHandler):
+    """Just enough of the Elasticsearch REST API for the uploader: _bulk, _settings and _refresh."""
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("X-Elastic-Product", "Elasticsearch")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _body(self):
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def do_GET(self):
+        state = self.server.state
+        if self.path.split("?")[0].endswith("/_settings"):
+            self._reply(200, {"unified-logs": {"settings": {"index": dict(state["settings"])}}})
+        else:
+            self._reply(200, {"version": {"number": "8.19.0"}, "tagline": "You Know, for Search"})
+
+    def do_PUT(self):
+        path = self.path.split("?")[0]
+        if path.endswith("/_bulk"):
+            return self._bulk()
+        state = self.server.state
+        settings = json.loads(self._body())["index"]
+        with state["lock"]:
+            state["settings_history"].append(settings)
+            for key, value in settings.items():
+                if value is None:
+                    state["settings"].pop(key, None)
+                else:
+                    state["settings"][key] = str(value)
+        self._reply(200, {"acknowledged": True})
+
+    def do_POST(self):
+        path = self.path.split("?")[0]
+        if path.endswith("/_refresh"):
+            self.server.state["refreshes"] += 1
+            return self._reply(200, {"_shards": {"total": 1, "successful": 1, "failed": 0}})
+        return self._bulk()
+
+    def _bulk(self):
+        state = self.server.state
+        lines = self._body().decode("utf-8").splitlines()
+        with state["lock"]:
+            state["requests"] += 1
+            state["request_bytes"].append(sum(len(line) + 1 for line in lines))
+            if state["requests"] == state["fail_request"]:
+                return self._reply(500, {"error": {"type": "node_not_connected_exception"}, "status": 500})
+            if state["reject_requests"]:
+                state["reject_requests"] -= 1
+                return self._reply(429, {"error": {"type": "es_rejected_execution_exception"}, "status": 429})
+            items = []
+            for header, source in zip(lines[::2], lines[1::2]):
+                doc = json.loads(source)
+                state["ids"].append(json.loads(header)["index"].get("_id"))
+                attempts = state["attempts"].get(doc["n"], 0) + 1
+                state["attempts"][doc["n"]] = attempts
+                if doc["n"] % 7 == 0 and attempts <= 2:  # busy write queue: reject the first two tries
+                    items.append({"index": {"status": 429, "error": {"type": "es_rejected_execution_exception"}}})
+                elif doc.get("bad"):
+                    items.append({"index": {"status": 400, "error": {"type": "mapper_parsing_exception"}}})
+                else:
+                    state["docs"][doc["n"]] = doc
+                    items.append({"index": {"_index": json.loads(header)["index"]["_index"], "status": 201}})
+        self._reply(200, {"took": 1, "errors": any(i["index"]["status"] >= 300 for i in items), "items": items})
+
+
+@pytest.fixture
+def stub_es():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubElasticsearch)
+    server.state = {"lock": threading.Lock(), "docs": {}, "attempts": {}, "requests": 0, "request_bytes": [],
+                    "reject_requests": 0, "fail_request": None, "ids": [], "refreshes": 0, "settings_history": [],
+                    "settings": {"number_of_replicas": "1"}}
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    client = Elasticsearch(f"http://127.0.0.1:{server.server_address[1]}", request_timeout=10)
+    yield client, server.state
+    server.shutdown()
+    server.server_close()
+
+
+def actions(n, bad=()):
+    for i in range(n):
+        yield {"_index": "unified-logs", "_source": {"n": i, "message": f"GET /product/{i} " + "x" * 200, "bad": i in bad}}
+
+
+def test_parallel_upload_retries_rejected_items(stub_es):
+    client, state = stub_es
+    state["reject_requests"] = 1  # the first bulk request is rejected as a whole
+    sizer = uploader.AdaptiveChunkSizer(initial_bytes=32 * 1024, min_bytes=8 * 1024, max_bytes=64 * 1024)
+    stats = uploader.parallel_upload(client, actions(3000, bad={5}), threads=4, sizer=sizer, initial_backoff=0.001)
+
+    assert stats["indexed"] == 2999 and stats["failed"] == 1
+    assert stats["errors"][0]["error"]["type"] == "mapper_parsing_exception"
+    assert sorted(state["docs"]) == [i for i in range(3000) if i != 5]
+    assert all(state["attempts"][i] == 3 for i in range(0, 3000, 7))
+    assert stats["retried"] > 2 * (3000 // 7)
+    assert max(state["request_bytes"]) <= 64 * 1024
+
+
+def test_items_still_rejected_after_max_retries_are_reported(stub_es):
+    client, state = stub_es
+    stats = uploader.parallel_upload(client, actions(70), threads=2, max_retries=1, initial_backoff=0.001)
+    assert stats["indexed"] == 60 and stats["failed"] == 10
+    assert all(error["status"] == 429 for error in stats["errors"])
+
+
+def test_chunks_follow_the_adaptive_size():
+    sizer = uploader.AdaptiveChunkSizer(initial_bytes=10 * 1024, min_bytes=1024, max_bytes=1024 * 1024)
+    chunks = list(uploader.chunk_actions(actions(200), sizer, max_docs=1000))
+    assert sum(len(c) for c in chunks) == 200
+    assert all(sum(len(a) + len(s) + 2 for a, s in c) <= 10 * 1024 for c in chunks)
+
+    sizer.observe(10 * 1024, seconds=0.01)  # fast cluster: move halfway towards 1s worth of data
+    assert sizer.chunk_bytes == (10 * 1024 + 1024000) // 2
+    sizer.observe(100 * 1024, seconds=0.01)
+    assert sizer.chunk_bytes == 1024 * 1024  # capped at max_bytes
+    sizer.observe(1024 * 1024, seconds=0.5, throttled=True)
+    assert sizer.chunk_bytes == 512 * 1024
+
+
+def test_bulk_load_settings_are_restored(stub_es):
+    client, state = stub_es
+    with uploader.bulk_load_settings(client, "unified-logs") as previous:
+        assert state["settings"] == {"refresh_interval": "-1", "number_of_replicas": "0"}
+        assert previous == {"unified-logs": {"refresh_interval": None, "number_of_replicas": "1"}}
+    assert state["settings"] == {"number_of_replicas": "1"}
+    assert state["refreshes"] == 1
+
+
+def test_index_template_maps_every_normalized_field():
+    from ingestion.normalizer import LogNormalizer
+    from ingestion.parser import LogParser
+
+    lines = [
+        '192.168.1.5 - - [10/Oct/2023:13:55:36 +0000] "GET /index.php?id=1 HTTP/1.1" 404 512 "http://ref/" "curl/8.0"',
+        '[Sun Dec 04 04:47:44 2005] [error] mod_jk child workerEnv in error state 6',
+        'Jun 14 15:16:01 combo sshd(pam_unix)[19939]: authentication failure; logname= uid=0 euid=0 '
+        'tty=NODEVssh ruser= rhost=218.188.2.4  user=root',
+    ]
+    logs = LogNormalizer().normalize_logs_to_ecs(LogParser()._parse_log_lines(lines, "mixed.log"))
+    properties = uploader.ECS_INDEX_TEMPLATE["template"]["mappings"]["properties"]
+    for log in logs:
+        assert set(log) <= set(properties), set(log) - set(properties)
+
+    assert properties["raw"]["index"] is False
+    assert properties["source.ip"]["type"] == "ip"
+    assert properties["http.response.status_code"]["type"] == "short"
+    assert properties["@timestamp"]["type"] == "date"
+
+
+class FakeIndices:
+    def __init__(self, concrete=()):
+        self.concrete = set(concrete)
+        self.aliases = {}  # alias -> write index
+        self.index_age_days = 0
+        self.primary_shard_gb = 0
+        self.calls = []
+
+    def exists_alias(self, name):
+        return name in self.aliases
+
+    def exists(self, index):
+        return index in self.concrete
+
+    def create(self, index, aliases):
+        self.calls.append(("create", index))
+        name = "unified-logs-2024.05.01-000001"
+        self.concrete.add(name)
+        for alias in aliases:
+            self.aliases[alias] = name
+        return {"acknowledged": True, "index": name}
+
+    def rollover(self, alias, conditions):
+        """Date math is re-resolved and the sequence suffix incremented, as Elasticsearch does."""
+        self.calls.append(("rollover", conditions))
+        old = self.aliases[alias]
+        sequence = int(old.rsplit("-", 1)[1]) + 1
+        new = f"unified-logs-2024.05.{1 + self.index_age_days:02d}-{sequence:06d}"
+        if self.index_age_days < 1 and self.primary_shard_gb < 50:
+            return {"rolled_over": False, "old_index": old, "new_index": new}
+        assert new not in self.concrete, "resource_already_exists_exception"
+        self.concrete.add(new)
+        self.aliases[alias] = new
+        self.index_age_days = self.primary_shard_gb = 0
+        return {"rolled_over": True, "old_index": old, "new_index": new}
+
+
+class FakeClient:
+    def __init__(self, indices):
+        self.indices = indices
+
+
+def test_write_alias_is_created_then_rolled_over_daily():
+    indices = FakeIndices()
+    client = FakeClient(indices)
+
+    assert uploader.ensure_write_alias(client) == "unified-logs-2024.05.01-000001"
+    assert indices.calls == [("create", uploader.DAILY_INDEX)]
+    assert indices.aliases == {"unified-logs": "unified-logs-2024.05.01-000001"}
+
+    # Same day: rollover is attempted but the conditions are not met
+    assert uploader.ensure_write_alias(client) == "unified-logs-2024.05.01-000001"
+    assert indices.calls[-1] == ("rollover", uploader.ROLLOVER_CONDITIONS)
+
+    # Shard size limit: a second index on the same day gets the next sequence number
+    indices.primary_shard_gb = 50
+    assert uploader.ensure_write_alias(client) == "unified-logs-2024.05.01-000002"
+
+    indices.index_age_days = 1
+    assert uploader.ensure_write_alias(client) == "unified-logs-2024.05.02-000003"
+    assert indices.aliases["unified-logs"] == "unified-logs-2024.05.02-000003"
+
+
+def test_legacy_concrete_index_is_not_silently_shadowed():
+    client = FakeClient(FakeIndices(concrete=["unified-logs"]))
+    with pytest.raises(RuntimeError):
+        uploader.ensure_write_alias(client)
+
+
+def test_interrupted_upload_resumes_into_its_index_before_rolling_over(tmp_path):
+    indices = FakeIndices()
+    client = FakeClient(indices)
+    checkpoint_path = str(tmp_path / "checkpoint.json")
+    checkpoint = uploader.UploadCheckpoint(checkpoint_path)
+    write_index, target = uploader.upload_target(client, checkpoint)
+    assert (write_index, target) == ("unified-logs-2024.05.01-000001", "unified-logs")
+    checkpoint.begin(write_index)  # ... and the upload is interrupted
+
+    indices.index_age_days = 1  # due for a rollover, which would split the resumed documents off
+    checkpoint = uploader.UploadCheckpoint(checkpoint_path)
+    assert uploader.upload_target(client, checkpoint) == (write_index, write_index)
+    assert indices.aliases["unified-logs"] == write_index
+    checkpoint.finish()
+
+    assert uploader.UploadCheckpoint(checkpoint_path).index is None
+    assert uploader.upload_target(client, checkpoint) == ("unified-logs-2024.05.02-000002", "unified-logs")
+
+
+def write_jsonl(path, numbers):
+    with open(path, "w") as f:
+        for i in numbers:
+            f.write(json.dumps({"n": i, "message": f"Failed password for root from 10.0.0.{i % 250}"}) + "\n")
+            if i % 50 == 0:
+                f.write("\n")  # blank lines are skipped but still covered by the checkpoint
+
+
+def test_document_ids_are_deterministic(tmp_path):
+    path = tmp_path / "logs.json"
+    write_jsonl(path, range(1, 101))
+    first = [a["_id"] for a in uploader.generate_actions([str(path)])]
+    second = [a["_id"] for a in uploader.generate_actions([str(path)])]
+    assert first == second and len(set(first)) == 100
+
+
+def test_checkpoint_advances_over_contiguous_acknowledgements(tmp_path):
+    path = tmp_path / "logs.json"
+    write_jsonl(path, range(1, 11))
+    checkpoint = uploader.UploadCheckpoint(str(tmp_path / "checkpoint.json"))
+    ranges = [a["_checkpoint"] for a in uploader.generate_actions([str(path)], checkpoint)]
+
+    checkpoint.acknowledge(*ranges[1])
+    assert checkpoint.offset(str(path)) == 0  # document 0 is still in flight
+    checkpoint.acknowledge(*ranges[0])
+    assert checkpoint.offset(str(path)) == ranges[1][2]
+    for byte_range in ranges[2:]:
+        checkpoint.acknowledge(*byte_range)
+    assert checkpoint.offset(str(path)) == os.path.getsize(path)
+
+    checkpoint.save()
+    assert uploader.UploadCheckpoint(checkpoint.path).start_offset(str(path)) == os.path.getsize(path)
+    write_jsonl(path, range(100, 110))  # regenerated file: uploaded again from the start
+    assert uploader.UploadCheckpoint(checkpoint.path).start_offset(str(path)) == 0
+
+
+def test_interrupted_upload_resumes_without_resending(stub_es, tmp_path):
+    client, state = stub_es
+    path = tmp_path / "logs.json"
+    write_jsonl(path, [i for i in range(1, 600) if i % 7][:500])  # no items rejected with 429
+    checkpoint_path = str(tmp_path / "checkpoint.json")
+
+    state["fail_request"] = 3  # the node goes away during the third bulk request
+    checkpoint = uploader.UploadCheckpoint(checkpoint_path)
+    with pytest.raises(ApiError):
+        uploader.sequential_upload(client, uploader.generate_actions([str(path)], checkpoint), chunk_size=100,
+                                   checkpoint=checkpoint)
+    checkpoint.save()
+    assert len(state["docs"]) == 200
+
+    sent_before = len(state["ids"])
+    checkpoint = uploader.UploadCheckpoint(checkpoint_path)
+    indexed, failed = uploader.sequential_upload(client, uploader.generate_actions([str(path)], checkpoint),
+                                                 chunk_size=100, checkpoint=checkpoint)
+    assert (indexed, failed) == (300, 0)
+    assert len(state["ids"]) - sent_before == 300
+    assert len(state["docs"]) == 500 and len(set(state["ids"])) == 500
+    assert uploader.UploadCheckpoint(checkpoint_path).offset(str(path)) == os.path.getsize(path)
+
+
+def test_items_rejected_after_retries_hold_the_checkpoint_back(stub_es, tmp_path):
+    client, state = stub_es
+    path = tmp_path / "logs.json"
+    write_jsonl(path, range(1, 71))
+    checkpoint = uploader.UploadCheckpoint(str(tmp_path / "checkpoint.json"))
+    ranges = {a["_source"]["n"]: a["_checkpoint"] for a in uploader.generate_actions([str(path)])}
+
+    stats = uploader.parallel_upload(client, uploader.generate_actions([str(path)], checkpoint), threads=2,
+                                     max_retries=1, initial_backoff=0.001, checkpoint=checkpoint)
+    assert stats["failed"] == 10
+    # n=7 was never indexed: a re-run starts from it
+    assert uploader.UploadCheckpoint(checkpoint.path).offset(str(path)) == ranges[7][1]
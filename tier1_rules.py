@@ -41,5 +41,22 @@ THREAT_RULES = {
     "Password Changed": r"(?i)password changed for",
 
     "Suspicious 404 Patterns": r"\"\s+404\s+.*(admin|wp-admin|phpmyadmin|\.env|config|backup)",
-    "High-Volume 4xx Errors": r"\"\s+4\d{2}\s+.*(from same IP in short time)",  # Requires correlation
+    # "High-Volume 4xx Errors" needs per-IP counting: see CORRELATION_RULES
+}
+
+# Volumetric rules evaluated by correlation.CorrelationEngine. A rule fires when one entity
+# produces `threshold` events whose `field` matches `pattern` within `window_seconds`.
+CORRELATION_RULES = {
+    "High-Volume 4xx Errors": {
+        "entity": "source.ip", "field": "http.response.status_code", "pattern": r"^4\d{2}$",
+        "threshold": 20, "window_seconds": 60,
+    },
+    "Server Error Burst": {
+        "entity": "source.ip", "field": "http.response.status_code", "pattern": r"^5\d{2}$",
+        "threshold": 10, "window_seconds": 60,
+    },
+    "Authentication Failure Burst on Host": {
+        "entity": "host.name", "field": "event.type", "pattern": r"^authentication_failure$",
+        "threshold": 30, "window_seconds": 300,
+    },
 }
\ No newline at end of file
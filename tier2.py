@@ -1,21 +1,72 @@
-# In a new file, e.g., tier2_detector.py
-from sentence_transformers import SentenceTransformer
-import hdbscan
 import joblib
+import time
+
+from component_registry import registry
+from embedding_cache import EmbeddingCache
+
+EMBEDDING_MODEL_NAME = 'all-MiniLM-L6-v2'
+
+
+def _load_sentence_transformer():
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(EMBEDDING_MODEL_NAME)
+
+
+# Imported/loaded on first use and shared by every detector in the process
+registry.register_module("hdbscan")
+registry.register("sentence_transformer", _load_sentence_transformer)
 
 class BertAnomalyDetector:
-    def __init__(self, model_path=None):
-        self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+    def __init__(self, model_path=None, embedding_cache_dir=None, embedding_backend="torch",
+                 onnx_model_dir=None, intra_op_threads=1, knn_index_dir=None):
+        # "onnx" runs an int8-quantized export of the same model on ONNX Runtime (see onnx_embedder.py)
+        cache_model_name = EMBEDDING_MODEL_NAME
+        if embedding_backend == "onnx":
+            from onnx_embedder import DEFAULT_MODEL_DIR, OnnxSentenceEmbedder
+            self.embedding_model = OnnxSentenceEmbedder(
+                onnx_model_dir or DEFAULT_MODEL_DIR, quantized=True, intra_op_threads=intra_op_threads
+            )
+            cache_model_name = f"{EMBEDDING_MODEL_NAME}-onnx-int8"
+        elif embedding_backend == "torch":
+            self.embedding_model = registry.get("sentence_transformer")
+        else:
+            raise ValueError(f"Unknown embedding backend '{embedding_backend}' (expected 'torch' or 'onnx')")
+        # Recorded with refitted models: a clusterer only fits embeddings from the same backend and model
+        self.embedding_backend = embedding_backend
+        self.embedding_model_name = cache_model_name
+        # Optional on-disk cache: each distinct message template is embedded only once
+        self.embedding_cache = None
+        if embedding_cache_dir:
+            self.embedding_cache = EmbeddingCache(
+                embedding_cache_dir,
+                dim=self.embedding_model.get_sentence_embedding_dimension(),
+                model_name=cache_model_name,
+            )
         if model_path:
             self.clusterer = joblib.load(model_path)
         else:
             # Min cluster size is a key parameter to tune
-            self.clusterer = hdbscan.HDBSCAN(min_cluster_size=15, prediction_data=True)
+            self.clusterer = registry.get("hdbscan").HDBSCAN(min_cluster_size=15, prediction_data=True)
+        # k-NN novelty mode: score by distance to exemplars of normal traffic instead of HDBSCAN membership
+        self.knn_index = None
+        if knn_index_dir:
+            from tier2_knn import KnnNoveltyIndex
+            self.knn_index = KnnNoveltyIndex.load(knn_index_dir)
+
+    def embed(self, log_messages, batch_size=64, show_progress_bar=False):
+        """Embeds messages, going through the template cache when one is configured."""
+        def encode(texts):
+            return self.embedding_model.encode(
+                list(texts), batch_size=batch_size, show_progress_bar=show_progress_bar, convert_to_numpy=True
+            )
+        if self.embedding_cache is not None:
+            return self.embedding_cache.embed(log_messages, encode)
+        return encode(log_messages)
 
     def fit(self, log_messages):
         """Train the clusterer on a large batch of 'normal' logs."""
         print("Generating embeddings for fitting...")
-        embeddings = self.embedding_model.encode(log_messages, show_progress_bar=True)
+        embeddings = self.embed(log_messages, show_progress_bar=True)
         print("Fitting HDBSCAN clusterer...")
         self.clusterer.fit(embeddings)
         joblib.dump(self.clusterer, "hdbscan_model.joblib")
@@ -25,15 +76,104 @@ class BertAnomalyDetector:
         """Predict if a single log is an anomaly."""
         try:
             # Check if the model has been fitted
-            if not hasattr(self.clusterer, 'clusterer_') or self.clusterer.clusterer_ is None:
+            if not self.is_fitted():
                 # Model not trained yet, return False (not anomaly) for now
                 return False
             
-            embedding = self.embedding_model.encode([log_message])
-            cluster_label, _ = hdbscan.approximate_predict(self.clusterer, embedding)
-            # HDBSCAN labels outliers as -1. This is the magic!
-            is_anomaly = True if cluster_label[0] == -1 else False
-            return is_anomaly
+            embedding = self.embed([log_message])
+            # HDBSCAN labels outliers as -1 (or the k-NN score crosses its threshold)
+            is_anomaly, _ = self._score_embeddings(embedding)
+            return bool(is_anomaly[0])
         except Exception as e:
             print(f"Error in anomaly prediction: {e}")
-            return False
\ No newline at end of file
+            return False
+
+    def is_fitted(self):
+        if self.knn_index is not None:
+            return True
+        return hasattr(self.clusterer, 'prediction_data_') and self.clusterer.prediction_data_ is not None
+
+    @property
+    def anomaly_threshold(self):
+        """Scores at or above this are anomalies (HDBSCAN outliers have zero membership strength, i.e. score 1)."""
+        return self.knn_index.threshold if self.knn_index is not None else 1.0
+
+    def _score_embeddings(self, embeddings):
+        """Returns (is_anomaly, score) arrays; higher scores are more novel."""
+        if self.knn_index is not None:
+            scores = self.knn_index.score(embeddings)
+            return self.knn_index.is_anomalous(scores), scores
+        cluster_labels, strengths = registry.get("hdbscan").approximate_predict(self.clusterer, embeddings)
+        return cluster_labels == -1, 1.0 - strengths
+
+    def predict_batch(self, log_messages, batch_size=64, return_scores=False):
+        """
+        Predict anomalies for a batch of logs in one pass.
+        Messages are encoded in a single call so SentenceTransformer's length sorting buckets
+        similar-length messages together (minimal padding); with an embedding cache only unseen
+        templates reach the model. Every embedding is then scored
+        with one vectorized approximate_predict call.
+        Returns a list of booleans aligned with log_messages, or (is_anomaly, score)
+        pairs with return_scores.
+        """
+        if not log_messages:
+            return []
+        default = [(False, 0.0) if return_scores else False] * len(log_messages)
+        try:
+            if not self.is_fitted():
+                return default
+
+            embeddings = self.embed(log_messages, batch_size=batch_size)
+            is_anomaly, scores = self._score_embeddings(embeddings)
+            if return_scores:
+                return [(bool(flag), float(score)) for flag, score in zip(is_anomaly, scores)]
+            return [bool(flag) for flag in is_anomaly]
+        except Exception as e:
+            print(f"Error in batch anomaly prediction: {e}")
+            return default
+
+
+class DynamicBatcher:
+    """
+    Accumulates Tier 2 requests and scores them together once the batch is full
+    or the oldest request has waited max_wait_seconds.
+    With return_scores, completed results are (payload, (is_anomaly, score)).
+    """
+    def __init__(self, detector, max_batch_size=256, max_wait_seconds=0.5, return_scores=False):
+        self.detector = detector
+        self.return_scores = return_scores
+        self.max_batch_size = max_batch_size
+        self.max_wait_seconds = max_wait_seconds
+        self.messages = []
+        self.payloads = []
+        self.oldest_time = None
+
+    def __len__(self):
+        return len(self.messages)
+
+    def submit(self, log_message, payload):
+        """Queue a message; returns completed (payload, is_anomaly) pairs if a batch was flushed."""
+        if not self.messages:
+            self.oldest_time = time.monotonic()
+        self.messages.append(log_message)
+        self.payloads.append(payload)
+        if len(self.messages) >= self.max_batch_size:
+            return self.flush()
+        return self.poll()
+
+    def poll(self):
+        """Flush if the oldest queued message has exceeded the deadline."""
+        if self.messages and time.monotonic() - self.oldest_time >= self.max_wait_seconds:
+            return self.flush()
+        return []
+
+    def flush(self):
+        if not self.messages:
+            return []
+        if self.return_scores:
+            results = self.detector.predict_batch(self.messages, return_scores=True)
+        else:
+            results = self.detector.predict_batch(self.messages)
+        completed = list(zip(self.payloads, results))
+        self.messages, self.payloads, self.oldest_time = [], [], None
+        return completed
@@ -0,0 +1,175 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+DEFAULT_INDEX_DIR = os.getenv("TIER2_KNN_INDEX_DIR", "models/tier2_knn")
+INDEX_FILENAME = "exemplars.index"
+META_FILENAME = "meta.json"
+DEFAULT_K = 5
+# Threshold = this quantile of k-NN scores of held-out normal exemplars
+DEFAULT_QUANTILE = 0.99
+
+
+def _available_backend():
+    try:
+        import hnswlib  # noqa: F401
+        return "hnswlib"
+    except ImportError:
+        pass
+    try:
+        import faiss  # noqa: F401
+        return "faiss"
+    except ImportError:
+        raise ImportError("k-NN novelty scoring needs hnswlib or faiss-cpu (pip install hnswlib)")
+
+
+class KnnNoveltyIndex:
+    """
+    HNSW index over embeddings of normal traffic. A log's anomaly score is the mean cosine
+    distance to its k nearest exemplars: low for known templates, growing as it drifts away
+    from everything seen before. Uses hnswlib, or FAISS when hnswlib is not installed.
+    """
+
+    def __init__(self, dim, k=DEFAULT_K, M=16, ef_construction=200, ef_search=64, backend=None):
+        self.dim = dim
+        self.k = k
+        self.M = M
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.backend = backend or _available_backend()
+        self.threshold = None
+        self.size = 0
+        self.index = None
+
+    @staticmethod
+    def _normalize(embeddings):
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        return embeddings / np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+
+    def build(self, exemplars):
+        exemplars = self._normalize(exemplars)
+        if self.backend == "hnswlib":
+            import hnswlib
+            self.index = hnswlib.Index(space="cosine", dim=self.dim)
+            self.index.init_index(max_elements=len(exemplars), ef_construction=self.ef_construction, M=self.M)
+            self.index.add_items(exemplars, np.arange(len(exemplars)))
+            self.index.set_ef(self.ef_search)
+            self.index.set_num_threads(1)
+        else:
+            import faiss
+            self.index = faiss.IndexHNSWFlat(self.dim, self.M, faiss.METRIC_INNER_PRODUCT)
+            self.index.hnsw.efConstruction = self.ef_construction
+            self.index.add(exemplars)
+            self.index.hnsw.efSearch = self.ef_search
+        self.size = len(exemplars)
+        return self
+
+    def score(self, embeddings):
+        """Mean cosine distance to the k nearest exemplars, one float per row."""
+        if self.index is None:
+            raise ValueError("KnnNoveltyIndex must be built before scoring")
+        embeddings = self._normalize(embeddings)
+        k = min(self.k, self.size)
+        if self.backend == "hnswlib":
+            _, distances = self.index.knn_query(embeddings, k=k)
+        else:
+            similarities, _ = self.index.search(embeddings, k)
+            distances = 1.0 - similarities
+        return np.clip(distances.mean(axis=1), 0.0, None)
+
+    def fit(self, exemplars, holdout_fraction=0.1, quantile=DEFAULT_QUANTILE, seed=42):
+        """
+        Builds the index on most exemplars and sets the threshold from the scores of the
+        held-out rest, i.e. how far unseen-but-normal traffic sits from the index.
+        """
+        exemplars = np.asarray(exemplars, dtype=np.float32)
+        order = np.random.default_rng(seed).permutation(len(exemplars))
+        n_holdout = int(len(exemplars) * holdout_fraction)
+        if n_holdout == 0 or n_holdout == len(exemplars):
+            raise ValueError(f"Need more exemplars to hold out {holdout_fraction:.0%} for calibration")
+        self.build(exemplars[order[n_holdout:]])
+        self.threshold = float(np.quantile(self.score(exemplars[order[:n_holdout]]), quantile))
+        # Calibration done; index the held-out exemplars too
+        return self.build(exemplars)
+
+    def is_anomalous(self, scores):
+        return np.asarray(scores) >= self.threshold
+
+    def save(self, index_dir=DEFAULT_INDEX_DIR):
+        os.makedirs(index_dir, exist_ok=True)
+        index_path = os.path.join(index_dir, INDEX_FILENAME)
+        if self.backend == "hnswlib":
+            self.index.save_index(index_path)
+        else:
+            import faiss
+            faiss.write_index(self.index, index_path)
+        meta = {key: getattr(self, key) for key in
+                ["dim", "k", "M", "ef_construction", "ef_search", "backend", "threshold", "size"]}
+        with open(os.path.join(index_dir, META_FILENAME), "w") as f:
+            json.dump(meta, f, indent=2)
+        print(f"k-NN novelty index ({self.size} exemplars, threshold {self.threshold:.4f}) saved to '{index_dir}'")
+
+    @classmethod
+    def load(cls, index_dir=DEFAULT_INDEX_DIR):
+        with open(os.path.join(index_dir, META_FILENAME), "r") as f:
+            meta = json.load(f)
+        obj = cls(meta["dim"], k=meta["k"], M=meta["M"], ef_construction=meta["ef_construction"],
+                  ef_search=meta["ef_search"], backend=meta["backend"])
+        obj.threshold = meta["threshold"]
+        obj.size = meta["size"]
+        index_path = os.path.join(index_dir, INDEX_FILENAME)
+        if obj.backend == "hnswlib":
+            import hnswlib
+            obj.index = hnswlib.Index(space="cosine", dim=obj.dim)
+            obj.index.load_index(index_path, max_elements=obj.size)
+            obj.index.set_ef(obj.ef_search)
+            obj.index.set_num_threads(1)
+        else:
+            import faiss
+            obj.index = faiss.read_index(index_path)
+            obj.index.hnsw.efSearch = obj.ef_search
+        return obj
+
+
+def benchmark_queries(index, embeddings, repeats=3):
+    """Per-log query latency in microseconds (single-row queries, best of repeats)."""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for row in embeddings:
+            index.score(row[None, :])
+        best = min(best, time.perf_counter() - start)
+    return best / len(embeddings) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the Tier 2 k-NN novelty index from normal traffic")
+    parser.add_argument("logs", nargs="+", help="ECS JSON-lines files of normal traffic")
+    parser.add_argument("--index-dir", default=DEFAULT_INDEX_DIR)
+    parser.add_argument("--k", type=int, default=DEFAULT_K)
+    parser.add_argument("--quantile", type=float, default=DEFAULT_QUANTILE)
+    parser.add_argument("--embedding-backend", default=os.getenv("TIER2_EMBEDDING_BACKEND", "torch"))
+    parser.add_argument("--embedding-cache-dir", default=os.getenv("TIER2_EMBEDDING_CACHE_DIR", "embedding_cache"))
+    args = parser.parse_args()
+
+    from tier2 import BertAnomalyDetector
+    from tier2_refit import TemplateReservoir, iter_log_messages
+
+    # One exemplar per template: duplicates add nothing to a nearest-neighbour index
+    reservoir = TemplateReservoir(max_per_template=1).extend(iter_log_messages(args.logs))
+    exemplar_messages = [stratum["examples"][0] for stratum in reservoir.strata.values()]
+    print(f"Embedding {len(exemplar_messages)} template exemplars...")
+
+    detector = BertAnomalyDetector(embedding_cache_dir=args.embedding_cache_dir,
+                                   embedding_backend=args.embedding_backend)
+    embeddings = detector.embed(exemplar_messages, show_progress_bar=True)
+    index = KnnNoveltyIndex(embeddings.shape[1], k=args.k).fit(embeddings, quantile=args.quantile)
+    index.save(args.index_dir)
+    print(f"Query latency: {benchmark_queries(index, embeddings[:1000]):.1f} us/log ({index.backend})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+import argparse
+import json
+import os
+import random
+import time
+from datetime import datetime, timezone
+
+import joblib
+import numpy as np
+
+from ingestion.templating import template_key, template_message
+
+DEFAULT_MODEL_DIR = os.getenv("TIER2_MODEL_DIR", "models/tier2")
+MANIFEST_FILENAME = "manifest.json"
+RESERVOIR_FILENAME = "reservoir.joblib"
+TRAIN_EMBEDDINGS_FILENAME = "train_embeddings.f32"
+DEFAULT_SAMPLE_SIZE = 50000
+MAX_PER_TEMPLATE = 100
+MAX_TEMPLATES = 200000
+KEEP_VERSIONS = 7
+
+
+class TemplateReservoir:
+    """
+    Streaming sample of log messages stratified by template.
+
+    Each template keeps its total count and a uniform reservoir (Algorithm R) of up to
+    max_per_template example messages, so a week of logs costs memory proportional to the number
+    of distinct templates, not the number of lines. Pickle it to carry the sample between refits.
+    """
+
+    def __init__(self, max_per_template=MAX_PER_TEMPLATE, max_templates=MAX_TEMPLATES, seed=42):
+        self.max_per_template = max_per_template
+        self.max_templates = max_templates
+        self.rng = random.Random(seed)
+        self.strata = {}  # template key -> {"template", "count", "examples"}
+        self.total = 0
+        self.dropped = 0  # messages whose template arrived after max_templates was reached
+
+    def __len__(self):
+        return len(self.strata)
+
+    def add(self, message):
+        template = template_message(message)
+        key = template_key(template)
+        stratum = self.strata.get(key)
+        if stratum is None:
+            if len(self.strata) >= self.max_templates:
+                self.dropped += 1
+                return
+            stratum = self.strata[key] = {"template": template, "count": 0, "examples": []}
+        stratum["count"] += 1
+        self.total += 1
+        examples = stratum["examples"]
+        if len(examples) < self.max_per_template:
+            examples.append(message)
+        else:
+            slot = self.rng.randrange(stratum["count"])
+            if slot < self.max_per_template:
+                examples[slot] = message
+
+    def extend(self, messages):
+        for message in messages:
+            if message:
+                self.add(message)
+        return self
+
+    def sample(self, sample_size=DEFAULT_SAMPLE_SIZE):
+        """
+        About sample_size messages allocated proportionally to template frequency,
+        with at least one message from every template so rare-but-normal behaviour is kept.
+        """
+        if not self.total:
+            return []
+        messages = []
+        for stratum in self.strata.values():
+            share = max(1, round(sample_size * stratum["count"] / self.total))
+            messages.extend(stratum["examples"][:share])
+        return messages
+
+    def stats(self):
+        return {"templates": len(self.strata), "messages_seen": self.total, "dropped": self.dropped}
+
+
+class ModelVersionStore:
+    """
+    Versioned Tier 2 clusterers: hdbscan_v0001.joblib, hdbscan_v0002.joblib, ...
+    plus manifest.json recording when and on what each version was trained.
+    """
+
+    def __init__(self, model_dir=DEFAULT_MODEL_DIR, keep_versions=KEEP_VERSIONS):
+        self.model_dir = model_dir
+        self.keep_versions = keep_versions
+        self.manifest_path = os.path.join(model_dir, MANIFEST_FILENAME)
+
+    def versions(self):
+        if not os.path.exists(self.manifest_path):
+            return []
+        with open(self.manifest_path, "r") as f:
+            return json.load(f)["versions"]
+
+    def latest(self):
+        """Manifest entry of the newest version, or None if there is none."""
+        versions = self.versions()
+        return versions[-1] if versions else None
+
+    def latest_path(self):
+        entry = self.latest()
+        return os.path.join(self.model_dir, entry["file"]) if entry else None
+
+    def save(self, clusterer, info):
+        os.makedirs(self.model_dir, exist_ok=True)
+        versions = self.versions()
+        version = versions[-1]["version"] + 1 if versions else 1
+        filename = f"hdbscan_v{version:04d}.joblib"
+        joblib.dump(clusterer, os.path.join(self.model_dir, filename))
+
+        versions.append({
+            "version": version,
+            "file": filename,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            **info,
+        })
+        for old in versions[:-self.keep_versions] if self.keep_versions else []:
+            old_path = os.path.join(self.model_dir, old["file"])
+            if os.path.exists(old_path):
+                os.remove(old_path)
+        versions = versions[-self.keep_versions:] if self.keep_versions else versions
+
+        # Write-then-rename so a reader never sees a half-written manifest
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"versions": versions}, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+        print(f"Tier 2 model version {version} saved to '{os.path.join(self.model_dir, filename)}'")
+        return version
+
+    def load(self, version=None):
+        versions = self.versions()
+        if not versions:
+            raise FileNotFoundError(f"No Tier 2 model versions in '{self.model_dir}'")
+        entry = versions[-1] if version is None else next(v for v in versions if v["version"] == version)
+        return joblib.load(os.path.join(self.model_dir, entry["file"]))
+
+
+def latest_model_path(model_dir=DEFAULT_MODEL_DIR):
+    """Path of the newest versioned model in model_dir, or None if there is none."""
+    return ModelVersionStore(model_dir).latest_path()
+
+
+def latest_model_entry(model_dir=DEFAULT_MODEL_DIR):
+    """Manifest entry (file, embedding backend, ...) of the newest versioned model, or None."""
+    return ModelVersionStore(model_dir).latest()
+
+
+def embed_to_memmap(detector, messages, path, extra_rows=None, chunk_size=4096):
+    """
+    Embeds messages chunk by chunk into a float32 memmap at path, followed by extra_rows
+    (e.g. exemplars of the previous model), so the full matrix never has to be built in memory.
+    """
+    n_extra = 0 if extra_rows is None else len(extra_rows)
+    first = np.asarray(detector.embed(messages[:chunk_size]), dtype=np.float32)
+    matrix = np.memmap(path, dtype=np.float32, mode="w+", shape=(len(messages) + n_extra, first.shape[1]))
+    matrix[:len(first)] = first
+    for start in range(chunk_size, len(messages), chunk_size):
+        matrix[start:start + chunk_size] = detector.embed(messages[start:start + chunk_size])
+    if n_extra:
+        matrix[len(messages):] = extra_rows
+    matrix.flush()
+    return matrix
+
+
+def cluster_exemplars(clusterer):
+    """Exemplar points of every cluster of a fitted HDBSCAN model (empty if it has none)."""
+    try:
+        exemplars = clusterer.exemplars_
+    except (AttributeError, ValueError):
+        return None
+    return np.vstack(exemplars).astype(np.float32) if exemplars else None
+
+
+def refit_detector(detector, reservoir, store, sample_size=DEFAULT_SAMPLE_SIZE, merge_exemplars=True):
+    """
+    Fits a fresh clusterer (same parameters as detector.clusterer) on a stratified sample
+    from the reservoir. With merge_exemplars, the previous model's cluster exemplars are
+    added to the training set so established clusters survive even if today's sample is thin.
+    The new model is saved as the next version and swapped into the detector.
+    """
+    import hdbscan
+    from sklearn.base import clone
+
+    start = time.perf_counter()
+    messages = reservoir.sample(sample_size)
+    if not messages:
+        raise ValueError("Template reservoir is empty; nothing to refit on")
+
+    exemplars = cluster_exemplars(detector.clusterer) if merge_exemplars and detector.is_fitted() else None
+    os.makedirs(store.model_dir, exist_ok=True)
+    print(f"Embedding {len(messages)} sampled messages from {len(reservoir)} templates...")
+    embeddings = embed_to_memmap(
+        detector, messages, os.path.join(store.model_dir, TRAIN_EMBEDDINGS_FILENAME), extra_rows=exemplars
+    )
+
+    clusterer = clone(detector.clusterer) if isinstance(detector.clusterer, hdbscan.HDBSCAN) else hdbscan.HDBSCAN()
+    clusterer.set_params(prediction_data=True)
+    print(f"Fitting HDBSCAN on {len(embeddings)} points...")
+    clusterer.fit(embeddings)
+
+    labels = np.asarray(clusterer.labels_)
+    info = {
+        "sampled_messages": len(messages),
+        "merged_exemplars": 0 if exemplars is None else len(exemplars),
+        "clusters": int(labels.max() + 1) if len(labels) else 0,
+        "noise_fraction": round(float((labels == -1).mean()), 4),
+        "fit_seconds": round(time.perf_counter() - start, 2),
+        "embedding_backend": detector.embedding_backend,
+        "embedding_model": detector.embedding_model_name,
+        **reservoir.stats(),
+    }
+    version = store.save(clusterer, info)
+    detector.clusterer = clusterer
+    return version, info
+
+
+def iter_log_messages(paths):
+    """Messages from ECS JSON-lines files (the text Tier 2 embeds)."""
+    for path in paths:
+        with open(path, "r") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                log = json.loads(line)
+                yield log.get("message") or log.get("raw", "")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Nightly Tier 2 clusterer refit on a stratified template sample")
+    parser.add_argument("logs", nargs="+", help="ECS JSON-lines files of normal traffic")
+    parser.add_argument("--model-dir", default=DEFAULT_MODEL_DIR)
+    parser.add_argument("--sample-size", type=int, default=DEFAULT_SAMPLE_SIZE)
+    parser.add_argument("--incremental", action="store_true",
+                        help="Add to the saved reservoir and merge the latest model's exemplars instead of starting over")
+    parser.add_argument("--embedding-backend", default=os.getenv("TIER2_EMBEDDING_BACKEND", "torch"))
+    parser.add_argument("--embedding-cache-dir", default=os.getenv("TIER2_EMBEDDING_CACHE_DIR"),
+                        help="default: embedding_cache_onnx for the onnx backend, embedding_cache otherwise")
+    args = parser.parse_args()
+    if args.embedding_cache_dir is None:
+        # Same per-backend default as the orchestrator: each cache is tied to its embedding model
+        args.embedding_cache_dir = "embedding_cache_onnx" if args.embedding_backend == "onnx" else "embedding_cache"
+
+    from tier2 import BertAnomalyDetector
+
+    store = ModelVersionStore(args.model_dir)
+    reservoir_path = os.path.join(args.model_dir, RESERVOIR_FILENAME)
+    latest = store.latest_path() if args.incremental else None
+    reservoir = joblib.load(reservoir_path) if args.incremental and os.path.exists(reservoir_path) else TemplateReservoir()
+
+    detector = BertAnomalyDetector(
+        model_path=latest, embedding_cache_dir=args.embedding_cache_dir, embedding_backend=args.embedding_backend
+    )
+    reservoir.extend(iter_log_messages(args.logs))
+    print(f"Reservoir: {reservoir.stats()}")
+
+    version, info = refit_detector(detector, reservoir, store, sample_size=args.sample_size,
+                                   merge_exemplars=args.incremental)
+    joblib.dump(reservoir, reservoir_path)
+    print(f"Refit complete (version {version}): {info}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+import argparse
+import json
+import os
+import queue
+import socket
+import socketserver
+import struct
+import threading
+import time
+
+SOCKET_PATH = os.getenv("TIER2_SERVER_SOCKET", "/tmp/tier2.sock")
+# Requests from all workers are merged into batches of up to this many messages
+SERVER_MAX_BATCH_SIZE = int(os.getenv("TIER2_SERVER_MAX_BATCH_SIZE", "1024"))
+SERVER_MAX_WAIT_SECONDS = float(os.getenv("TIER2_SERVER_MAX_WAIT_SECONDS", "0.01"))
+HEADER = struct.Struct("!I")  # 4-byte big-endian length before every JSON frame
+
+
+def send_frame(sock, obj):
+    data = json.dumps(obj).encode("utf-8")
+    sock.sendall(HEADER.pack(len(data)) + data)
+
+
+def _recv_exact(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def recv_frame(sock):
+    """Next JSON frame from sock, or None once the peer has closed the connection."""
+    header = _recv_exact(sock, HEADER.size)
+    if header is None:
+        return None
+    body = _recv_exact(sock, HEADER.unpack(header)[0])
+    return None if body is None else json.loads(body)
+
+
+class _PendingRequest:
+    def __init__(self, messages):
+        self.messages = messages
+        self.results = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class _Tier2RequestHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        while True:
+            try:
+                request = recv_frame(self.request)
+            except (OSError, ValueError):
+                return
+            if request is None:
+                return
+            send_frame(self.request, self.server.handle_request_frame(request))
+
+
+class Tier2ModelServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Hosts one Tier 2 detector (embedder + clusterer or k-NN index) for every orchestrator
+    worker on the machine. Each connection gets a thread that only parses frames; a single
+    batching thread merges the queued requests of all workers into one predict_batch call.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, detector, socket_path=SOCKET_PATH, max_batch_size=SERVER_MAX_BATCH_SIZE,
+                 max_wait_seconds=SERVER_MAX_WAIT_SECONDS):
+        self.detector = detector
+        self.socket_path = socket_path
+        self.max_batch_size = max_batch_size
+        self.max_wait_seconds = max_wait_seconds
+        self.requests = queue.Queue()
+        self.stats = {"requests": 0, "messages": 0, "batches": 0}
+        self._stopped = threading.Event()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)  # stale socket from a previous run
+        super().__init__(socket_path, _Tier2RequestHandler)
+        self._batch_thread = threading.Thread(target=self._batch_loop, name="tier2-batcher", daemon=True)
+        self._batch_thread.start()
+
+    def handle_request_frame(self, request):
+        op = request.get("op", "predict")
+        if op == "info":
+            return {"threshold": self.detector.anomaly_threshold, "pid": os.getpid(), "stats": dict(self.stats)}
+        if op != "predict":
+            return {"error": f"Unknown op '{op}'"}
+        pending = _PendingRequest(list(request.get("messages", [])))
+        if not pending.messages:
+            return {"results": []}
+        self.requests.put(pending)
+        pending.done.wait()
+        return {"error": pending.error} if pending.error else {"results": pending.results}
+
+    def _batch_loop(self):
+        while not self._stopped.is_set():
+            try:
+                first = self.requests.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            batch, total = [first], len(first.messages)
+            deadline = time.monotonic() + self.max_wait_seconds
+            while total < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    pending = self.requests.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(pending)
+                total += len(pending.messages)
+            self._score(batch)
+
+    def _score(self, batch):
+        messages = [message for pending in batch for message in pending.messages]
+        try:
+            results = self.detector.predict_batch(messages, return_scores=True)
+            offset = 0
+            for pending in batch:
+                pending.results = results[offset:offset + len(pending.messages)]
+                offset += len(pending.messages)
+        except Exception as e:
+            for pending in batch:
+                pending.error = str(e)
+        finally:
+            self.stats["requests"] += len(batch)
+            self.stats["messages"] += len(messages)
+            self.stats["batches"] += 1
+            for pending in batch:
+                pending.done.set()
+
+    def server_close(self):
+        self._stopped.set()
+        super().server_close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+
+class Tier2Client:
+    """
+    Talks to a Tier2ModelServer; exposes the parts of BertAnomalyDetector the orchestrator uses,
+    so it can sit behind a DynamicBatcher in place of a local model.
+    """
+
+    embedding_cache = None  # lives in the server process
+
+    def __init__(self, socket_path=SOCKET_PATH, timeout=30.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.sock = None
+        self._threshold = None
+
+    def _connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        self.sock = sock
+
+    def _request(self, payload):
+        # One reconnect attempt, e.g. after the server was restarted
+        for attempt in range(2):
+            try:
+                if self.sock is None:
+                    self._connect()
+                send_frame(self.sock, payload)
+                response = recv_frame(self.sock)
+                if response is None:
+                    raise ConnectionError("Tier 2 server closed the connection")
+                return response
+            except OSError:
+                self.close()
+                if attempt:
+                    raise
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+    def is_fitted(self):
+        return True
+
+    def info(self):
+        return self._request({"op": "info"})
+
+    @property
+    def anomaly_threshold(self):
+        if self._threshold is None:
+            self._threshold = self.info()["threshold"]
+        return self._threshold
+
+    def predict_batch(self, log_messages, batch_size=64, return_scores=False):
+        """Same contract as BertAnomalyDetector.predict_batch; the server does the batching."""
+        if not log_messages:
+            return []
+        try:
+            response = self._request({"op": "predict", "messages": list(log_messages)})
+            if "error" in response:
+                raise RuntimeError(response["error"])
+            results = [(bool(flag), float(score)) for flag, score in response["results"]]
+        except Exception as e:
+            print(f"Error in Tier 2 server request: {e}")
+            results = [(False, 0.0)] * len(log_messages)
+        return results if return_scores else [flag for flag, _ in results]
+
+    def predict(self, log_message):
+        return self.predict_batch([log_message])[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the Tier 2 detector to orchestrator workers over a Unix socket")
+    parser.add_argument("--socket", default=SOCKET_PATH)
+    parser.add_argument("--max-batch-size", type=int, default=SERVER_MAX_BATCH_SIZE)
+    parser.add_argument("--max-wait-seconds", type=float, default=SERVER_MAX_WAIT_SECONDS)
+    args = parser.parse_args()
+
+    # Same model resolution and settings (TIER2_* variables) as an in-process orchestrator
+    from orchestrator import load_tier2_detector
+
+    detector = load_tier2_detector()
+    if detector is None:
+        raise SystemExit("No Tier 2 model available to serve")
+    server = Tier2ModelServer(detector, args.socket, args.max_batch_size, args.max_wait_seconds)
+    print(f"Tier 2 model server listening on {args.socket} (pid {os.getpid()})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"Tier 2 model server stopped: {server.stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,26 @@
 import os
 import json
 import re
-from groq import Groq
-from dotenv import load_dotenv
 
-# Load environment variables from your .env file
-load_dotenv()
+from component_registry import registry
 
-groq_client = None
-try:
-    # Initialize the Groq client. It will automatically find the API key.
-    groq_client = Groq()
-except Exception:
-    # Defer hard failure; we will provide a graceful fallback in analyze_log_with_llm
-    groq_client = None
+
+def _create_groq_client():
+    """Built on the first LLM call, so importing this module stays cheap."""
+    from groq import Groq
+    from dotenv import load_dotenv
+
+    # Load environment variables from your .env file
+    load_dotenv()
+    try:
+        # Initialize the Groq client. It will automatically find the API key.
+        return Groq()
+    except Exception:
+        # Defer hard failure; we will provide a graceful fallback in analyze_log_with_llm
+        return None
+
+
+registry.register("groq_client", _create_groq_client)
 
 # Known legitimate bot patterns
 LEGITIMATE_BOTS = [
@@ -22,6 +29,9 @@ LEGITIMATE_BOTS = [
     'whatsapp', 'telegrambot', 'uptimerobot', 'semrushbot'
 ]
 
+# Weight of the Tier 2 novelty score in calculate_confidence_score
+NOVELTY_WEIGHT = 0.3
+
 # Normal web request patterns
 NORMAL_WEB_PATTERNS = [
     r'/image/\d+/product(Model|Type)/\d+x\d+',
@@ -62,8 +72,11 @@ def is_normal_web_request(log: dict) -> bool:
         
     return False
 
-def calculate_confidence_score(log: dict) -> float:
-    """Calculate confidence score for whether this log needs LLM analysis."""
+def calculate_confidence_score(log: dict, novelty: float = None) -> float:
+    """
+    Calculate confidence score for whether this log needs LLM analysis.
+    novelty is the Tier 2 anomaly score divided by its threshold (1.0 = on the threshold), when available.
+    """
     score = 1.0  # Start with high confidence (low priority for LLM)
     
     # Reduce confidence if it's a known bot
@@ -101,12 +114,16 @@ def calculate_confidence_score(log: dict) -> float:
     # Special handling for SSRF rule - since it now only scans url.original, it's more reliable
     if any(ssrf_pattern in url.lower() for ssrf_pattern in ['http://', 'https://', 'ftp://', 'file://']):
         score += 0.3  # Boost confidence for SSRF patterns in actual URL
+
+    # Tier 2 novelty: up to +0.3 for logs far from normal traffic, down to -0.3 for well-known patterns
+    if novelty is not None:
+        score += NOVELTY_WEIGHT * (min(max(novelty, 0.0), 2.0) - 1.0)
     
     return max(0.0, min(1.0, score))  # Clamp between 0 and 1
 
-def should_escalate_to_llm(log: dict, confidence_threshold: float = 0.5) -> bool:
+def should_escalate_to_llm(log: dict, confidence_threshold: float = 0.5, novelty: float = None) -> bool:
     """Determine if a log should be escalated to LLM analysis."""
-    confidence = calculate_confidence_score(log)
+    confidence = calculate_confidence_score(log, novelty=novelty)
     return confidence >= confidence_threshold
 
 def analyze_log_with_llm(log_context: dict):
@@ -158,6 +175,7 @@ def analyze_log_with_llm(log_context: dict):
     - "confidence_assessment": Your confidence in this analysis ("Low", "Medium", "High").
     """
 
+    groq_client = registry.get("groq_client")
     if groq_client is None:
         # Graceful fallback when no API key/client available
         return {
@@ -1,64 +1,488 @@
 import os
 import json
-from elasticsearch import Elasticsearch
-from elasticsearch.helpers import bulk
+import time
+import hashlib
+import argparse
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from elasticsearch import ApiError, Elasticsearch
+from elasticsearch.helpers import streaming_bulk
 
 # --- Configuration ---
 ELASTICSEARCH_HOST = "http://localhost:9200"
-INDEX_NAME = "unified-logs"
+INDEX_NAME = "unified-logs"  # write alias; documents live in daily indices unified-logs-YYYY.MM.DD-NNNNNN
+# Date math resolved by Elasticsearch (UTC). Rollover re-resolves the date and increments the
+# sequence suffix, so a size-triggered second rollover on the same day gets a new name
+DAILY_INDEX = "<unified-logs-{now/d{yyyy.MM.dd}}-000001>"
+ROLLOVER_CONDITIONS = {"max_age": "1d", "max_primary_shard_size": "50gb"}
 # List of your normalized JSON files to upload (from normalized_logs directory)
 FILES_TO_UPLOAD = [
     "normalized_logs/output_access-10k.log_ecs.json",
     "normalized_logs/output_apache-10k.log_ecs.json",
     "normalized_logs/output_linux-2k.log_ecs.json"
 ]
+# Parallel mode (--parallel): bulk requests sized by bytes, sent from several threads
+UPLOAD_THREADS = int(os.getenv("UPLOAD_THREADS", "4"))
+UPLOAD_MAX_CHUNK_DOCS = int(os.getenv("UPLOAD_MAX_CHUNK_DOCS", "10000"))
+UPLOAD_INITIAL_CHUNK_BYTES = 1024 * 1024
+UPLOAD_MIN_CHUNK_BYTES = 64 * 1024
+UPLOAD_MAX_CHUNK_BYTES = int(os.getenv("UPLOAD_MAX_CHUNK_BYTES", str(16 * 1024 * 1024)))
+UPLOAD_TARGET_SECONDS = float(os.getenv("UPLOAD_TARGET_SECONDS", "1.0"))  # desired duration of one bulk request
+UPLOAD_MAX_RETRIES = int(os.getenv("UPLOAD_MAX_RETRIES", "5"))  # retries of items rejected with 429
+UPLOAD_INITIAL_BACKOFF = float(os.getenv("UPLOAD_INITIAL_BACKOFF", "0.5"))
+UPLOAD_MAX_BACKOFF = 30.0
+# Byte offset up to which each file has been acknowledged by Elasticsearch; re-runs resume there
+UPLOAD_CHECKPOINT_PATH = os.getenv("UPLOAD_CHECKPOINT_PATH", "upload_checkpoint.json")
+CHECKPOINT_HEAD_BYTES = 1024  # fingerprint of a file's beginning, to notice it was regenerated
+
+# Explicit mapping for the ECS fields produced by ingestion/normalizer.py. Without it dynamic
+# mapping indexes every string as text + keyword; here identifiers are keyword only, the message
+# is text only and the raw line is kept in _source but not indexed at all.
+ECS_INDEX_TEMPLATE = {
+    "index_patterns": [f"{INDEX_NAME}-*"],
+    "priority": 200,
+    "template": {
+        "settings": {
+            "number_of_shards": 1,
+            "codec": "best_compression",
+        },
+        "mappings": {
+            "dynamic_templates": [
+                {"strings_as_keyword": {"match_mapping_type": "string",
+                                        "mapping": {"type": "keyword", "ignore_above": 1024}}},
+            ],
+            "properties": {
+                "@timestamp": {"type": "date"},
+                "message": {"type": "text", "norms": False},
+                "raw": {"type": "keyword", "index": False, "doc_values": False},
+                "log.source": {"type": "keyword"},
+                "log.level": {"type": "keyword"},
+                "event.category": {"type": "keyword"},
+                "event.type": {"type": "keyword"},
+                "event.action": {"type": "keyword"},
+                "event.outcome": {"type": "keyword"},
+                "host.name": {"type": "keyword"},
+                "process.name": {"type": "keyword"},
+                "process.pid": {"type": "keyword"},
+                "user.name": {"type": "keyword"},
+                # Hostnames from sshd rhost= stay in _source but are not indexed as IPs
+                "source.ip": {"type": "ip", "ignore_malformed": True},
+                "http.request.method": {"type": "keyword"},
+                "http.request.referrer": {"type": "keyword", "ignore_above": 2048},
+                "http.response.status_code": {"type": "short"},
+                "http.response.body.bytes": {"type": "long"},
+                "http.version": {"type": "keyword"},
+                "url.original": {"type": "keyword", "ignore_above": 2048},
+                "url.query": {"type": "keyword", "ignore_above": 2048},
+                "user_agent.original": {"type": "keyword", "ignore_above": 1024},
+                "security.flags": {"type": "keyword"},
+                "rule.name": {"type": "keyword"},
+                # Verdicts written back by the orchestrator's live mode
+                "triage.classification": {"type": "keyword"},
+                "triage.rule_name": {"type": "keyword"},
+                "triage.confidence_score": {"type": "float"},
+                "triage.severity": {"type": "keyword"},
+                "triage.tier2_anomaly": {"type": "boolean"},
+            },
+        },
+    },
+}
 
 
 # --- Main Script ---
-def generate_actions(files):
+def document_id(file_path, offset, line):
+    """
+    Deterministic _id of the line starting at byte `offset` of a file, so re-sent documents
+    overwrite themselves. Only within one concrete index: a document re-sent after the alias
+    rolled over lands in the new index next to its first copy (see UploadCheckpoint.index).
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{os.path.basename(file_path)}:{offset}:".encode("utf-8"))
+    digest.update(line)
+    return digest.hexdigest()
+
+
+class UploadCheckpoint:
+    """
+    Per-file byte offset up to which every document has been acknowledged (indexed, or
+    rejected for good) by Elasticsearch. Acknowledgements may arrive out of order from parallel
+    bulk requests; the offset only advances over a contiguous acknowledged prefix. A file whose
+    first bytes changed since the checkpoint was written is uploaded again from the start.
+
+    While an upload runs, index records the concrete index it writes into; it is cleared once
+    the upload finished. Documents sent after the last save may already be indexed, so an
+    interrupted upload must be resumed into that same index for their _ids to deduplicate them
+    (a checkpoint discarded with --restart loses this, and everything is sent again).
+    """
+
+    def __init__(self, path=UPLOAD_CHECKPOINT_PATH):
+        self.path = path
+        self.files = {}  # file path -> {"offset", "head"}
+        self.index = None
+        if path and os.path.exists(path):
+            with open(path, "r") as f:
+                state = json.load(f)
+            if "files" in state:
+                self.files, self.index = state["files"], state.get("index")
+            else:
+                self.files = state  # written before the index was recorded
+        self._acked = {}  # file path -> {start offset: end offset} acknowledged beyond the offset
+        self._dirty = False
+
+    @staticmethod
+    def _head(file_path):
+        with open(file_path, "rb") as f:
+            return hashlib.blake2b(f.read(CHECKPOINT_HEAD_BYTES), digest_size=16).hexdigest()
+
+    def start_offset(self, file_path):
+        """Offset to resume file_path from (0 if it is new, shorter than the offset or rewritten)."""
+        head = self._head(file_path)
+        entry = self.files.get(file_path)
+        if entry is None or entry["head"] != head or entry["offset"] > os.path.getsize(file_path):
+            entry = self.files[file_path] = {"offset": 0, "head": head}
+            self._dirty = True
+        self._acked[file_path] = {}
+        return entry["offset"]
+
+    def acknowledge(self, file_path, start, end):
+        """Marks the document stored at bytes [start, end) of file_path as acknowledged."""
+        entry = self.files[file_path]
+        acked = self._acked[file_path]
+        acked[start] = end
+        while entry["offset"] in acked:
+            entry["offset"] = acked.pop(entry["offset"])
+            self._dirty = True
+
+    def offset(self, file_path):
+        entry = self.files.get(file_path)
+        return entry["offset"] if entry else 0
+
+    def begin(self, index):
+        """Records the concrete index an upload is about to write into."""
+        self.index = index
+        self._dirty = True
+        self.save()
+
+    def finish(self):
+        """Marks the upload as complete: the next one may write into a newer index."""
+        self.index = None
+        self._dirty = True
+        self.save()
+
+    def save(self):
+        if not self._dirty or not self.path:
+            return
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"index": self.index, "files": self.files}, f, indent=2)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+
+
+def generate_actions(files, checkpoint=None, index=INDEX_NAME):
     """
-    Reads line-delimited JSON files and yields documents in the format required for bulk upload.
+    Reads line-delimited JSON files and yields documents for bulk upload into index.
+    Each document gets a deterministic _id and, under "_checkpoint", the (file, start, end) byte
+    range it was read from. With a checkpoint, each file is read from its acknowledged offset.
     """
     total_docs = 0
     for file_path in files:
         if not os.path.exists(file_path):
             print(f"Warning: File not found, skipping: {file_path}")
             continue
-            
-        print(f"Reading documents from {file_path}...")
+
+        offset = checkpoint.start_offset(file_path) if checkpoint else 0
+        if offset:
+            print(f"Resuming {file_path} at byte {offset:,} of {os.path.getsize(file_path):,}...")
+        else:
+            print(f"Reading documents from {file_path}...")
         file_docs = 0
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                for line_num, line in enumerate(f, 1):
-                    line = line.strip()
+            with open(file_path, 'rb') as f:
+                f.seek(offset)
+                # A document's range starts after the previous document, so skipped lines are covered too
+                start = position = offset
+                for raw_line in f:
+                    line_start, position = position, position + len(raw_line)
+                    line = raw_line.strip()
                     if not line:  # Skip empty lines
                         continue
-                    
+
                     try:
                         log_entry = json.loads(line)
-                        # Ensure the document has the required fields for bulk indexing
-                        yield {
-                            "_index": INDEX_NAME,
-                            "_source": log_entry
-                        }
-                        total_docs += 1
-                        file_docs += 1
-                    except json.JSONDecodeError as e:
-                        print(f"Warning: Invalid JSON on line {line_num} in {file_path}: {e}")
+                    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+                        print(f"Warning: Invalid JSON at byte {line_start} in {file_path}: {e}")
                         continue
-                        
+                    # Ensure the document has the required fields for bulk indexing
+                    yield {
+                        "_index": index,
+                        "_id": document_id(file_path, line_start, line),
+                        "_source": log_entry,
+                        "_checkpoint": (file_path, start, position),
+                    }
+                    start = position
+                    total_docs += 1
+                    file_docs += 1
+
             print(f"  Processed {file_docs} documents from {file_path}")
-            
+
         except Exception as e:
             print(f"Error reading file {file_path}: {e}")
             continue
-            
+
     print(f"\nTotal documents to be uploaded: {total_docs}")
 
+class AdaptiveChunkSizer:
+    """
+    Bulk request size in bytes, adjusted after every response: it moves towards what the
+    cluster ingests in target_seconds, and halves whenever the cluster pushes back with 429s.
+    """
+
+    def __init__(self, initial_bytes=UPLOAD_INITIAL_CHUNK_BYTES, min_bytes=UPLOAD_MIN_CHUNK_BYTES,
+                 max_bytes=UPLOAD_MAX_CHUNK_BYTES, target_seconds=UPLOAD_TARGET_SECONDS):
+        self.min_bytes = min_bytes
+        self.max_bytes = max_bytes
+        self.target_seconds = target_seconds
+        self.chunk_bytes = max(min_bytes, min(initial_bytes, max_bytes))
+        self._lock = threading.Lock()
+
+    def observe(self, nbytes, seconds, throttled=False):
+        with self._lock:
+            if throttled:
+                size = self.chunk_bytes / 2
+            else:
+                rate = nbytes / max(seconds, 1e-3)
+                size = (self.chunk_bytes + rate * self.target_seconds) / 2
+            self.chunk_bytes = int(max(self.min_bytes, min(size, self.max_bytes)))
+
+
+def serialize_action(action):
+    """(action line, source line) of a bulk index action as produced by generate_actions."""
+    meta = {"_index": action["_index"]}
+    if action.get("_id") is not None:
+        meta["_id"] = action["_id"]
+    return json.dumps({"index": meta}), json.dumps(action["_source"])
+
+
+def chunk_actions(actions, sizer, max_docs=UPLOAD_MAX_CHUNK_DOCS):
+    """Groups serialized actions into chunks of at most sizer.chunk_bytes bytes (read as each chunk starts)."""
+    chunk, chunk_bytes, limit = [], 0, sizer.chunk_bytes
+    for action in actions:
+        pair = serialize_action(action)
+        size = len(pair[0]) + len(pair[1]) + 2
+        if chunk and (chunk_bytes + size > limit or len(chunk) >= max_docs):
+            yield chunk
+            chunk, chunk_bytes, limit = [], 0, sizer.chunk_bytes
+        chunk.append(pair)
+        chunk_bytes += size
+    if chunk:
+        yield chunk
+
+
+def send_bulk_chunk(es_client, chunk, sizer, max_retries=UPLOAD_MAX_RETRIES, initial_backoff=UPLOAD_INITIAL_BACKOFF,
+                    require_alias=True):
+    """
+    Sends one chunk; items rejected with 429 (or the whole request, if it is rejected) are
+    re-sent with exponential backoff. require_alias is lifted only for writes into a concrete
+    index that already exists (a resumed upload). Returns (indexed, errors, retried items, positions in the
+    chunk of the items still rejected with 429 after the last retry).
+    """
+    pending, indexed, errors, retried = list(enumerate(chunk)), 0, [], 0
+    throttled = []
+    for attempt in range(max_retries + 1):
+        body = [line for _, pair in pending for line in pair]
+        nbytes = sum(len(line) + 1 for line in body)
+        started = time.perf_counter()
+        try:
+            # require_alias: never let a missing alias auto-create an unmapped concrete index
+            response = es_client.bulk(operations=body, require_alias=require_alias)
+        except ApiError as e:
+            if getattr(e, "status_code", None) != 429 or attempt == max_retries:
+                raise
+            sizer.observe(nbytes, time.perf_counter() - started, throttled=True)
+            retried += len(pending)
+            time.sleep(min(UPLOAD_MAX_BACKOFF, initial_backoff * 2 ** attempt))
+            continue
+
+        rejected = []
+        for entry, item in zip(pending, response["items"]):
+            result = next(iter(item.values()))
+            status = result.get("status", 500)
+            if 200 <= status < 300:
+                indexed += 1
+            elif status == 429:
+                rejected.append(entry)
+            else:
+                errors.append(result)
+        sizer.observe(nbytes, time.perf_counter() - started, throttled=bool(rejected))
+        if not rejected:
+            break
+        if attempt == max_retries:
+            errors.extend({"status": 429, "error": "rejected after retries"} for _ in rejected)
+            throttled = [position for position, _ in rejected]
+            break
+        retried += len(rejected)
+        time.sleep(min(UPLOAD_MAX_BACKOFF, initial_backoff * 2 ** attempt))
+        pending = rejected
+    return indexed, errors, retried, throttled
+
+
+def _tracked(actions, ranges):
+    """Passes actions through, queueing each one's checkpoint range in the order they are consumed."""
+    for action in actions:
+        ranges.append(action.get("_checkpoint"))
+        yield action
+
+
+def _acknowledge(checkpoint, byte_range):
+    if checkpoint is not None and byte_range is not None:
+        checkpoint.acknowledge(*byte_range)
+
+
+def parallel_upload(es_client, actions, threads=UPLOAD_THREADS, sizer=None, max_docs=UPLOAD_MAX_CHUNK_DOCS,
+                    max_retries=UPLOAD_MAX_RETRIES, initial_backoff=UPLOAD_INITIAL_BACKOFF, checkpoint=None,
+                    require_alias=True):
+    """
+    Uploads actions with `threads` concurrent bulk requests. At most 2 * threads chunks are
+    serialized ahead of the senders, so memory stays bounded for any input size. With a
+    checkpoint, documents are acknowledged as their chunk completes and it is saved after each.
+    """
+    sizer = sizer or AdaptiveChunkSizer()
+    stats = {"indexed": 0, "failed": 0, "retried": 0, "requests": 0, "errors": []}
+    ranges = deque()
+    chunk_ranges = {}  # future -> checkpoint ranges of its chunk
+
+    def collect(done):
+        for future in done:
+            indexed, errors, retried, throttled = future.result()
+            stats["indexed"] += indexed
+            stats["failed"] += len(errors)
+            stats["retried"] += retried
+            stats["errors"].extend(errors[:10 - len(stats["errors"])])
+            throttled = set(throttled)
+            for position, byte_range in enumerate(chunk_ranges.pop(future)):
+                if position not in throttled:
+                    _acknowledge(checkpoint, byte_range)
+        if checkpoint is not None:
+            checkpoint.save()
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        in_flight = set()
+        for chunk in chunk_actions(_tracked(actions, ranges), sizer, max_docs):
+            if len(in_flight) >= 2 * threads:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                collect(done)
+            future = pool.submit(send_bulk_chunk, es_client, chunk, sizer, max_retries, initial_backoff, require_alias)
+            # chunk_actions has read at most one action past this chunk, so its ranges are at the front
+            chunk_ranges[future] = [ranges.popleft() for _ in chunk]
+            in_flight.add(future)
+            stats["requests"] += 1
+        collect(wait(in_flight)[0])
+    stats["final_chunk_bytes"] = sizer.chunk_bytes
+    return stats
+
+
+def sequential_upload(es_client, actions, chunk_size=1000, checkpoint=None, require_alias=True):
+    """
+    Uploads actions one bulk request at a time. Returns (indexed, failed); with a checkpoint,
+    every acknowledged document advances it and it is saved after each request.
+    """
+    ranges = deque()
+    indexed = failed = 0
+    for ok, item in streaming_bulk(es_client, _tracked(actions, ranges), chunk_size=chunk_size,
+                                   raise_on_error=False, require_alias=require_alias):
+        byte_range = ranges.popleft()
+        if ok:
+            indexed += 1
+        else:
+            failed += 1
+        # Items rejected with 429 are left unacknowledged so that a re-run sends them again
+        if next(iter(item.values())).get("status") != 429:
+            _acknowledge(checkpoint, byte_range)
+        if checkpoint is not None and (indexed + failed) % chunk_size == 0:
+            checkpoint.save()
+    if checkpoint is not None:
+        checkpoint.save()
+    return indexed, failed
+
+
+@contextmanager
+def bulk_load_settings(es_client, index):
+    """
+    Disables refresh and replicas on the index for the duration of a bulk load, then restores
+    the previous values (unset ones go back to the cluster default) and refreshes once. Pass the
+    concrete write index: on the alias this would also drop replicas of every older index.
+    """
+    current = es_client.indices.get_settings(index=index)
+    previous = {}
+    for name, body in current.items():
+        settings = body.get("settings", {}).get("index", {})
+        previous[name] = {"refresh_interval": settings.get("refresh_interval"),
+                          "number_of_replicas": settings.get("number_of_replicas")}
+    es_client.indices.put_settings(index=index, settings={"index": {"refresh_interval": "-1", "number_of_replicas": 0}})
+    try:
+        yield previous
+    finally:
+        for name, settings in previous.items():
+            es_client.indices.put_settings(index=name, settings={"index": settings})
+        es_client.indices.refresh(index=index)
+
+
+def install_index_template(es_client):
+    """Installs (or updates) the ECS index template applied to every daily index."""
+    es_client.indices.put_index_template(name=INDEX_NAME, **ECS_INDEX_TEMPLATE)
+
+
+def ensure_write_alias(es_client):
+    """
+    Makes INDEX_NAME a write alias over daily indices: creates today's index behind the alias
+    on first use, otherwise rolls the alias over to a new index once the current one is a day
+    old or its primary shard is too large. Returns the name of the index that receives writes.
+    """
+    if es_client.indices.exists_alias(name=INDEX_NAME):
+        response = es_client.indices.rollover(alias=INDEX_NAME, conditions=ROLLOVER_CONDITIONS)
+        if response.get("rolled_over"):
+            print(f"✓ Rolled '{INDEX_NAME}' over from {response['old_index']} to {response['new_index']}")
+            return response["new_index"]
+        return response["old_index"]
+    if es_client.indices.exists(index=INDEX_NAME):
+        raise RuntimeError(f"'{INDEX_NAME}' is a concrete index from an older upload; reindex it into "
+                           f"'{INDEX_NAME}-*' or delete it so '{INDEX_NAME}' can become the write alias")
+    response = es_client.indices.create(index=DAILY_INDEX, aliases={INDEX_NAME: {"is_write_index": True}})
+    print(f"✓ Created index '{response['index']}' behind write alias '{INDEX_NAME}'")
+    return response["index"]
+
+
+def upload_target(es_client, checkpoint):
+    """
+    (concrete write index, index or alias to send documents to) for an upload. An interrupted
+    upload resumes into the index it was writing, without a rollover: documents it sent after
+    its last checkpoint save may already be there, and their _ids only overwrite them in that
+    index. The caller rolls the alias over once the resumed upload finished.
+    """
+    if checkpoint.index and es_client.indices.exists(index=checkpoint.index):
+        print(f"✓ Resuming the interrupted upload into '{checkpoint.index}'")
+        return checkpoint.index, checkpoint.index
+    write_index = ensure_write_alias(es_client)
+    print(f"✓ Writing through alias '{INDEX_NAME}' into '{write_index}'")
+    return write_index, INDEX_NAME
+
+
 def main():
     """
     Connects to Elasticsearch and performs the bulk upload.
     """
+    parser = argparse.ArgumentParser(description="Upload normalized logs to Elasticsearch")
+    parser.add_argument("--parallel", action="store_true",
+                        help="parallel bulk requests with adaptive sizing, 429 retries and load-time index settings")
+    parser.add_argument("--threads", type=int, default=UPLOAD_THREADS)
+    parser.add_argument("--checkpoint", default=UPLOAD_CHECKPOINT_PATH,
+                        help="file recording the acknowledged byte offset of each input file")
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint and upload every file again")
+    args = parser.parse_args()
+
     print("=" * 60)
     print("Elasticsearch Log Uploader")
     print("=" * 60)
@@ -86,17 +510,42 @@ def main():
             raise ConnectionError("Could not connect to Elasticsearch.")
         print("✓ Connection successful!")
 
-        # Check if index exists, create if it doesn't
-        if not es_client.indices.exists(index=INDEX_NAME):
-            print(f"Creating index '{INDEX_NAME}'...")
-            es_client.indices.create(index=INDEX_NAME)
-            print(f"✓ Index '{INDEX_NAME}' created successfully!")
+        # Explicit ECS mapping and a write alias over daily indices
+        install_index_template(es_client)
 
-        print(f"\nUploading logs to index '{INDEX_NAME}'...")
+        if args.restart and os.path.exists(args.checkpoint):
+            os.remove(args.checkpoint)
+        checkpoint = UploadCheckpoint(args.checkpoint)
+
+        write_index, target = upload_target(es_client, checkpoint)
+        checkpoint.begin(write_index)
+        actions = generate_actions(existing_files, checkpoint, index=target)
+        require_alias = target == INDEX_NAME
+
+        print(f"\nUploading logs to index '{write_index}'...")
         print("-" * 40)
-        
-        success, failed = bulk(es_client, generate_actions(existing_files), chunk_size=1000)
-        
+
+        # The checkpoint is saved as requests complete, and once more if the upload is interrupted
+        try:
+            if args.parallel:
+                with bulk_load_settings(es_client, write_index):
+                    stats = parallel_upload(es_client, actions, threads=args.threads, checkpoint=checkpoint,
+                                            require_alias=require_alias)
+                success, failed = stats["indexed"], stats["failed"]
+                print(f"  {stats['requests']} bulk requests from {args.threads} threads, {stats['retried']} items "
+                      f"retried after 429, final chunk size {stats['final_chunk_bytes']:,} bytes")
+                if failed:
+                    print(f"  First errors: {stats['errors'][:3]}")
+            else:
+                success, failed = sequential_upload(es_client, actions, checkpoint=checkpoint,
+                                                    require_alias=require_alias)
+        finally:
+            checkpoint.save()
+            print(f"  Checkpoint saved to {args.checkpoint}")
+        checkpoint.finish()
+        if target != INDEX_NAME:
+            print(f"✓ Resumed upload complete; '{INDEX_NAME}' now writes into '{ensure_write_alias(es_client)}'")
+
         print("-" * 40)
         print("Upload complete!")
         print(f"✓ Successfully indexed documents: {success}")
@@ -107,9 +556,8 @@ def main():
             
         # Show index stats
         try:
-            stats = es_client.indices.stats(index=INDEX_NAME)
-            doc_count = stats['indices'][INDEX_NAME]['total']['docs']['count']
-            print(f"\nIndex '{INDEX_NAME}' now contains {doc_count:,} documents")
+            doc_count = es_client.count(index=INDEX_NAME)['count']
+            print(f"\nAlias '{INDEX_NAME}' now covers {doc_count:,} documents")
         except Exception as e:
             print(f"Could not retrieve index stats: {e}")
 